@@ -1,13 +1,21 @@
-from flask import Flask, jsonify, render_template, redirect, url_for, request, flash, session
+from flask import Flask, Response, jsonify, render_template, redirect, url_for, request, flash, session
 from flask_cors import CORS
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 import psycopg2
 import psycopg2.extras
 from datetime import datetime
+import json
 import os
+import re
 from urllib.parse import urlparse
-from models import User, get_db_connection, validate_email, validate_password, get_business_types
+from models import User, get_db_connection, validate_email, validate_password, get_business_types, BUSINESS_TYPE_INDUSTRIES
+from details import get_details
+from documents import BlobReader, contract_documents, stored_document
+import documents
+import document_text
+from sinks import OPEN_STATUS_SQL
 from werkzeug.security import check_password_hash
+from werkzeug.wsgi import wrap_file
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend requests
@@ -169,101 +177,224 @@ def catch_all(path):
     # For other unknown paths, serve the main template and let client-side routing handle it
     return render_template('index.html')
 
+# Columns of contract_opportunities served by the contract endpoints
+CONTRACT_SELECT = """
+    SELECT 
+        "Contract ID" as id,
+        "Title" as title,
+        "Department" as department,
+        "Industry" as industry,
+        "Estimated Value" as estimated_value,
+        "Release Date_Display" as release_date,
+        "Due Date_Display" as due_date,
+        "Instructions" as instructions,
+        "City" as city,
+        "Source Type" as source_type,
+        "Source URL" as source_url,
+        "Status" as status,
+        "Sources" as sources
+    FROM contract_opportunities
+"""
+
+def format_contract(contract):
+    """Format a contract row for the frontend"""
+    # Format estimated value
+    estimated_value = contract['estimated_value']
+    if estimated_value:
+        try:
+            value_float = float(estimated_value)
+            if value_float > 0:
+                estimated_value_display = f"${value_float:,.0f}"
+            else:
+                estimated_value_display = "Open Pricing"
+        except (ValueError, TypeError):
+            estimated_value_display = "Open Pricing"
+    else:
+        estimated_value_display = "Open Pricing"
+    
+    # Format dates for display
+    due_date_display = contract['due_date'] if contract['due_date'] else "TBD"
+    release_date_display = contract['release_date'] if contract['release_date'] else "TBD"
+    
+    # Determine urgency (days until due date)
+    urgency = "low"
+    days_until_due = None
+    if contract['due_date'] and contract['due_date'] != "TBD":
+        try:
+            # Parse different date formats
+            due_date_str = str(contract['due_date'])
+            if ' ' in due_date_str:  # Has time component
+                due_date = datetime.strptime(due_date_str.split(' ')[0], '%Y-%m-%d')
+            else:  # Date only
+                due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
+            
+            days_until_due = (due_date - datetime.now()).days
+            if days_until_due <= 7:
+                urgency = "high"
+            elif days_until_due <= 30:
+                urgency = "medium"
+        except (ValueError, TypeError):
+            pass
+    
+    return {
+        'id': contract['id'],
+        'title': contract['title'],
+        'department': contract['department'],
+        'industry': contract['industry'] or 'Other',
+        'estimated_value': estimated_value_display,
+        'release_date': release_date_display,
+        'due_date': due_date_display,
+        'instructions': contract['instructions'],
+        'city': contract['city'],
+        'source_type': contract['source_type'],
+        'source_url': contract['source_url'],
+        'status': contract['status'] or 'Open',
+        'sources': json.loads(contract['sources']) if contract['sources'] else [],
+        'urgency': urgency,
+        'days_until_due': days_until_due
+    }
+
 @app.route('/api/contracts')
 def get_contracts():
-    """API endpoint to get all contracts"""
+    """
+    API endpoint to get the open and upcoming contracts. Closed contracts are
+    archived; pass include_history=true to get them too. q=... keeps the
+    contracts matching a keyword search of their text and their bid documents.
+    """
+    include_history = request.args.get('include_history', '').lower() in ('1', 'true', 'yes')
+    query = request.args.get('q', '').strip()
     try:
         conn = get_db_connection()
         cur = conn.cursor()
         
-        # Get all contracts with formatted data
-        cur.execute("""
-            SELECT 
-                "Title" as title,
-                "Department" as department,
-                "Industry" as industry,
-                "Estimated Value" as estimated_value,
-                "Release Date_Display" as release_date,
-                "Due Date_Display" as due_date,
-                "Instructions" as instructions,
-                "City" as city,
-                "Source Type" as source_type,
-                "Source URL" as source_url,
-                "Status" as status
-            FROM contract_opportunities
+        # Only the current partition is read unless history is asked for
+        conditions = [] if include_history else [OPEN_STATUS_SQL]
+        params = []
+        if query:
+            # Catalog checks only, unless the document tables are missing
+            documents.ensure_table(conn)
+            document_text.ensure_table(conn)
+            conditions.append(document_text.CONTRACT_SEARCH_SQL)
+            params += [query, query]
+        where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+        cur.execute(CONTRACT_SELECT + where + """
             ORDER BY "Due Date_Display" ASC, "Release Date_Display" DESC
-        """)
+        """, params or None)
         
         contracts = cur.fetchall()
         
         # Format the data for frontend
-        formatted_contracts = []
-        for contract in contracts:
-            # Format estimated value
-            estimated_value = contract['estimated_value']
-            if estimated_value:
-                try:
-                    value_float = float(estimated_value)
-                    if value_float > 0:
-                        estimated_value_display = f"${value_float:,.0f}"
-                    else:
-                        estimated_value_display = "Open Pricing"
-                except (ValueError, TypeError):
-                    estimated_value_display = "Open Pricing"
-            else:
-                estimated_value_display = "Open Pricing"
-            
-            # Format dates for display
-            due_date_display = contract['due_date'] if contract['due_date'] else "TBD"
-            release_date_display = contract['release_date'] if contract['release_date'] else "TBD"
-            
-            # Determine urgency (days until due date)
-            urgency = "low"
-            days_until_due = None
-            if contract['due_date'] and contract['due_date'] != "TBD":
-                try:
-                    # Parse different date formats
-                    due_date_str = str(contract['due_date'])
-                    if ' ' in due_date_str:  # Has time component
-                        due_date = datetime.strptime(due_date_str.split(' ')[0], '%Y-%m-%d')
-                    else:  # Date only
-                        due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
-                    
-                    days_until_due = (due_date - datetime.now()).days
-                    if days_until_due <= 7:
-                        urgency = "high"
-                    elif days_until_due <= 30:
-                        urgency = "medium"
-                except (ValueError, TypeError):
-                    pass
-            
-            formatted_contracts.append({
-                'title': contract['title'],
-                'department': contract['department'],
-                'industry': contract['industry'] or 'Other',
-                'estimated_value': estimated_value_display,
-                'release_date': release_date_display,
-                'due_date': due_date_display,
-                'instructions': contract['instructions'],
-                'city': contract['city'],
-                'source_type': contract['source_type'],
-                'source_url': contract['source_url'],
-                'status': contract['status'] or 'Open',
-                'urgency': urgency,
-                'days_until_due': days_until_due
-            })
+        formatted_contracts = [format_contract(contract) for contract in contracts]
         
         cur.close()
         conn.close()
         
         return jsonify({
             'contracts': formatted_contracts,
-            'total': len(formatted_contracts)
+            'total': len(formatted_contracts),
+            'include_history': include_history,
+            'q': query or None
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/contracts/<contract_id>')
+def get_contract(contract_id):
+    """API endpoint to get a single contract by its id, open or archived (a key lookup in each partition)"""
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute(CONTRACT_SELECT + 'WHERE "Contract ID" = %s', (contract_id,))
+        contract = cur.fetchone()
+        cur.close()
+        conn.close()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    if contract is None:
+        return jsonify({'error': 'Contract not found'}), 404
+    return jsonify({'contract': format_contract(contract)})
+
+@app.route('/api/contracts/<contract_id>/details')
+def get_contract_details(contract_id):
+    """API endpoint to get a contract's bid-page details, fetched on first request and cached"""
+    try:
+        conn = get_db_connection()
+        try:
+            result = get_details(conn, contract_id)
+        finally:
+            conn.close()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 502
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    if result is None:
+        return jsonify({'error': 'Contract not found'}), 404
+    return jsonify({
+        'id': contract_id,
+        'details': {key.lower().replace(' ', '_'): value for key, value in result['details'].items()},
+        'fetched_at': result['fetched_at'].isoformat(),
+        'cached': result['cached']
+    })
+
+@app.route('/api/contracts/<contract_id>/documents')
+def get_contract_documents(contract_id):
+    """API endpoint to list a contract's bid documents, with download links for the stored ones"""
+    try:
+        conn = get_db_connection()
+        try:
+            documents = contract_documents(conn, contract_id)
+        finally:
+            conn.close()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({
+        'id': contract_id,
+        'documents': [{
+            'name': document['name'],
+            'source_url': document['url'],
+            'sha256': document['sha256'],
+            'size': document['size'],
+            'content_type': document['content_type'],
+            'download_url': url_for('get_document', sha256=document['sha256']) if document['sha256'] else None
+        } for document in documents]
+    })
+
+@app.route('/api/documents/<sha256>')
+def get_document(sha256):
+    """Serve a stored bid document by its SHA-256, streamed from the database (supports range requests)"""
+    if not re.fullmatch(r'[0-9a-f]{64}', sha256):
+        return jsonify({'error': 'Document not found'}), 404
+    try:
+        conn = get_db_connection()
+        try:
+            document = stored_document(conn, sha256)
+        except Exception:
+            conn.close()
+            raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    if document is None:
+        conn.close()
+        return jsonify({'error': 'Document not found'}), 404
+    # The reader keeps the connection until the response has been sent, then closes it
+    reader = BlobReader(conn, sha256, document['size'])
+    response = Response(wrap_file(request.environ, reader, buffer_size=documents.READ_CHUNK_SIZE),
+                        mimetype=document['content_type'] or 'application/octet-stream', direct_passthrough=True)
+    response.content_length = document['size']
+    response.headers.set('Content-Disposition', 'inline', filename=document['name'])
+    # Content-addressed, so the file behind a hash never changes
+    response.set_etag(sha256)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    return response.make_conditional(request, accept_ranges=True, complete_length=document['size'])
+
 @app.route('/api/filters')
 def get_filters():
     """API endpoint to get available filter options"""
@@ -312,6 +443,79 @@ def api_user_profile():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Feed page size bounds
+FEED_PAGE_SIZE = 20
+MAX_FEED_PAGE_SIZE = 100
+
+# The current user's open and upcoming contracts matching their preferences:
+# city and industry in the preferred lists and the estimated value in the
+# preferred range (contracts without a value estimate are kept). Preferred
+# business types are widened to the contract industries they cover (see
+# models.BUSINESS_TYPE_INDUSTRIES). An empty or missing preference matches
+# everything. The preferences are read once (the latest row, should a user
+# have more than one) and compared against the indexed columns of the
+# current partition.
+FEED_SQL = f"""
+    WITH prefs AS (
+        SELECT NULLIF(preferred_cities, '{{}}') AS cities,
+               NULLIF(ARRAY(
+                   SELECT unnest(preferred_industries)
+                   UNION
+                   SELECT m.industry
+                   FROM unnest(%(business_types)s::text[], %(industries)s::text[]) AS m (business_type, industry)
+                   WHERE m.business_type = ANY(preferred_industries)
+               ), '{{}}') AS industries,
+               min_contract_value AS min_value, max_contract_value AS max_value
+        FROM user_preferences WHERE user_id = %(user_id)s
+        ORDER BY updated_at DESC NULLS LAST, id DESC
+        LIMIT 1
+    )
+    {CONTRACT_SELECT}
+    LEFT JOIN prefs ON true
+    WHERE {OPEN_STATUS_SQL}
+      AND (prefs.cities IS NULL OR "City" = ANY(prefs.cities))
+      AND (prefs.industries IS NULL OR "Industry" = ANY(prefs.industries))
+      AND ("Estimated Value_Amount" IS NULL OR prefs.min_value IS NULL OR "Estimated Value_Amount" >= prefs.min_value)
+      AND ("Estimated Value_Amount" IS NULL OR prefs.max_value IS NULL OR "Estimated Value_Amount" <= prefs.max_value)
+    ORDER BY "Due Date_Display" ASC, "Contract ID"
+    LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+# models.BUSINESS_TYPE_INDUSTRIES as parallel arrays for FEED_SQL
+FEED_INDUSTRY_MAP = {
+    'business_types': [business_type for business_type, industries in BUSINESS_TYPE_INDUSTRIES.items() for _ in industries],
+    'industries': [industry for industries in BUSINESS_TYPE_INDUSTRIES.values() for industry in industries],
+}
+
+@app.route('/api/user/feed')
+@login_required
+def api_user_feed():
+    """API endpoint to get a page of the current user's personalized contract feed"""
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', FEED_PAGE_SIZE)), 1), MAX_FEED_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        # One row more than the page tells whether there is a next page
+        cur.execute(FEED_SQL, {'user_id': current_user.id, 'limit': per_page + 1, 'offset': (page - 1) * per_page,
+                               **FEED_INDUSTRY_MAP})
+        contracts = cur.fetchall()
+        cur.close()
+        conn.close()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({
+        'contracts': [format_contract(contract) for contract in contracts[:per_page]],
+        'page': page,
+        'per_page': per_page,
+        'has_more': len(contracts) > per_page
+    })
+
 @app.route('/api/admin/stats')
 @login_required
 def api_admin_stats():
@@ -0,0 +1,149 @@
+"""
+Global time budget for a crawl run (orchestrator.py --budget-minutes).
+
+With a budget, each city in FAN_OUT_SCRAPERS is crawled in priority order:
+first all of its listing pages, then the bid pages of bids not seen before,
+then the bid pages of known bids that are due soonest, then re-checks of the
+remaining known bids. Once the deadline passes no more bid pages are fetched:
+known bids keep the details stored by an earlier run and new bids go out with
+their listing data, so the city still lands as a complete, consistent set of
+rows. The other cities are crawled as usual and are reported as timed out
+(keeping their previous rows) if they are still running at the deadline.
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+from pipeline import BudgetExpired, standardize_date_for_display
+from sinks import OPEN_STATUS_SQL
+
+# Known bids due within this many days are re-checked ahead of the others
+DUE_SOON_DAYS = 7
+
+# Stored columns restored into listing rows whose bid page was skipped, as
+# (stored column, scraped field). Status is left out: the listing row's own
+# status is computed from today's date.
+STORED_FIELDS = [
+    ("Department", "Department"), ("Industry", "Industry"), ("Estimated Value", "Estimated Value"),
+    ("Release Date_Raw", "Release Date"), ("Due Date_Raw", "Due Date"),
+    ("Instructions", "Instructions"), ("Bid Deposit", "Bid Deposit"), ("Addendum", "Addendum"),
+    ("Comments", "Comments"), ("Standard_Forms", "Standard_Forms"), ("Bid_Forms", "Bid_Forms"),
+    ("Bid Number", "Bid Number"), ("Document_PDF", "Document_PDF"), ("Document_URLs", "Document_URLs"),
+]
+
+
+class CrawlBudget:
+    """
+    Deadline for a crawl run, starting when the budget is created.
+    """
+
+    def __init__(self, minutes):
+        self.minutes = minutes
+        self.deadline = time.monotonic() + minutes * 60
+
+    def remaining(self):
+        """Seconds left before the deadline (negative once it has passed)."""
+        return self.deadline - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+def known_rows(conn, cities):
+    """
+    Stored open and upcoming rows of the given cities from contract_opportunities,
+    as city -> {Source URL: row}. Empty if the table doesn't exist yet.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('contract_opportunities') IS NOT NULL AS present")
+        if not cur.fetchone()["present"]:
+            return {}
+        cur.execute(
+            f'SELECT * FROM contract_opportunities WHERE "City" = ANY(%s) AND {OPEN_STATUS_SQL}', (list(cities),)
+        )
+        known = {}
+        for row in cur.fetchall():
+            known.setdefault(row["City"], {})[row["Source URL"]] = dict(row)
+    conn.commit()
+    return known
+
+
+def due_date(row_data, stored=None):
+    """A bid's due date, from the stored display date or else the listing row; None if unknown."""
+    display = (stored or {}).get("Due Date_Display") or standardize_date_for_display(row_data.get("Due Date"))
+    try:
+        return datetime.strptime(str(display)[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def detail_priority(rows, known):
+    """
+    Rows with a bid page in the order their pages should be fetched: new bids in
+    listing order, then known bids due within DUE_SOON_DAYS (soonest first), then
+    the other known bids by due date, those without one last.
+    """
+    today = date.today()
+    due_soon = today + timedelta(days=DUE_SOON_DAYS)
+
+    def priority(indexed):
+        position, row_data = indexed
+        stored = known.get(row_data["Source URL"])
+        if stored is None:
+            return (0, date.min, position)
+        due = due_date(row_data, stored)
+        if due is not None and today <= due <= due_soon:
+            return (1, due, position)
+        return (2, due or date.max, position)
+
+    return [row_data for _, row_data in sorted(enumerate(rows), key=priority)]
+
+
+def fill_from_stored(row_data, stored):
+    """Fill the fields a skipped bid page would have supplied from the bid's stored row."""
+    for column, field in STORED_FIELDS:
+        if row_data.get(field) is None and stored.get(column) is not None:
+            row_data[field] = stored[column]
+
+
+def budgeted_records(city, scraper, budget, known, checkpoint=None):
+    """
+    Yield a fan-out city's records within the crawl budget. scraper is the
+    city's module (see pipeline.FAN_OUT_SCRAPERS) and known its stored rows by
+    Source URL. Bid pages restored from the checkpoint are merged even after
+    the deadline, since they cost no request.
+    """
+    rows = scraper.listing_rows(checkpoint=checkpoint)
+    with_pages = []
+    for row_data in rows:
+        if scraper.has_detail_page(row_data):
+            with_pages.append(row_data)
+        else:
+            yield row_data
+
+    skipped = restored = 0
+    for row_data in detail_priority(with_pages, known):
+        bid_url = row_data["Source URL"]
+        if not budget.expired() or (checkpoint and checkpoint.remembered("detail", bid_url) is not None):
+            scraper.enrich_row(row_data, checkpoint)
+        else:
+            skipped += 1
+            if bid_url in known:
+                fill_from_stored(row_data, known[bid_url])
+                restored += 1
+        yield row_data
+
+    if skipped:
+        print(f"   ⏱️ {city}: crawl budget ran out with {skipped} of {len(with_pages)} bid pages unfetched "
+              f"({restored} kept their stored details, {skipped - restored} new bids have listing data only)")
+
+
+def limited_records(iter_records, budget, checkpoint=None):
+    """
+    Yield a city's records as usual, raising BudgetExpired if the deadline
+    passes before the city has finished (its previous rows are then kept).
+    """
+    for record in iter_records(checkpoint=checkpoint):
+        if budget.expired():
+            raise BudgetExpired(f"crawl budget of {budget.minutes:g} minutes ran out")
+        yield record
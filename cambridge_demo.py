@@ -0,0 +1,207 @@
+"""
+Run the Cambridge OpenGov scraper (scrapers/cambridge_api.py) against a
+local stand-in for the procurements API, serving the recorded pages in
+fixtures/ (no access to OpenGov needed).
+
+    python cambridge_demo.py                           # 0.2s per response
+    python cambridge_demo.py --latency 0.5
+
+The scraper keeps its sync cursor and the Cambridge set in scraper_state, so
+the demo needs the database (DATABASE_URL, as for the scraper itself); it
+uses its own state name and removes it afterwards. CAMBRIDGE_API_URL points
+the scraper at the stand-in, which answers the open-procurements query with
+fixtures/cambridge_procurements_open_page<N>.json and an updated_since query
+with fixtures/cambridge_procurements_updated.json (one amended, one closed
+and one new procurement). The demo runs a full sync, checks every page was
+read and that pages 2..N were requested concurrently, then runs again and
+checks that only the changes were requested and merged into the stored set.
+It exits non-zero on any problem.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import psycopg2
+
+from models import get_db_connection
+from scrapers import fetch, state
+
+FIXTURES = Path(__file__).parent / "fixtures"
+STATE_NAME = "cambridge_api_demo"
+
+
+class OpenGovStandIn(ThreadingHTTPServer):
+    """Local stand-in for the OpenGov procurements API, logging every request it answers."""
+
+    daemon_threads = True
+
+    def __init__(self, latency):
+        super().__init__(("127.0.0.1", 0), OpenGovHandler)
+        self.latency = latency
+        self.requests = []
+        self.lock = threading.Lock()
+        self.host = f"127.0.0.1:{self.server_port}"
+        self.url = f"http://{self.host}/api/procurements"
+        # The stand-in's latency is simulated, so there is no need to space requests to it
+        fetch.MIN_INTERVAL = 0.001
+        fetch.HOST_LIMITS[self.host] = (4, fetch.MIN_INTERVAL)
+
+    def page(self, query):
+        """The recorded response for a query, or None for a query the API wouldn't get from the scraper."""
+        if query.get("portal_slug") != "cambridgema":
+            return None
+        page = int(query.get("page", 1))
+        if "updated_since" in query:
+            path = FIXTURES / "cambridge_procurements_updated.json"
+        elif query.get("status") == "open":
+            path = FIXTURES / f"cambridge_procurements_open_page{page}.json"
+        else:
+            return None
+        if not path.exists() or (page > 1 and "updated_since" in query):
+            return {"data": [], "meta": {"page": page}, "links": {"next": None}}
+        return json.loads(path.read_text())
+
+
+class OpenGovHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        started = time.monotonic()
+        time.sleep(self.server.latency)
+        body = self.server.page(query)
+        with self.server.lock:
+            self.server.requests.append((query, started, time.monotonic()))
+        if body is None:
+            self.send_response(400)
+            self.end_headers()
+            return
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+def recorded(name):
+    """Procurements of the recorded responses matching name, by id."""
+    items = {}
+    for path in sorted(FIXTURES.glob(name)):
+        for item in json.loads(path.read_text())["data"]:
+            items[item["id"]] = item["attributes"]
+    return items
+
+
+def compare_records(records, expected, cambridge_api):
+    """Problems with the scraped records against the expected procurements' records."""
+    wanted = {record["Source URL"]: record for record in map(cambridge_api.procurement_record, expected.values())}
+    found = {record["Source URL"]: record for record in records}
+    problems = [f"missing {url}" for url in wanted if url not in found]
+    problems += [f"unexpected {url}" for url in found if url not in wanted]
+    problems += [f"{url} differs" for url in wanted if url in found and found[url] != wanted[url]]
+    if len(records) != len(found):
+        problems.append(f"{len(records) - len(found)} repeated records")
+    return problems
+
+
+def overlapping(requests):
+    """Largest number of the given requests the stand-in was answering at once."""
+    events = sorted([(started, 1) for _, started, _ in requests] + [(ended, -1) for _, _, ended in requests])
+    most = current = 0
+    for _, change in events:
+        current += change
+        most = max(most, current)
+    return most
+
+
+def run(label, server, cambridge_api):
+    """Scrape once, returning the records, the requests made and the seconds taken."""
+    server.requests.clear()
+    started = time.perf_counter()
+    records = list(cambridge_api.iter_records())
+    elapsed = time.perf_counter() - started
+    requests = sorted(server.requests, key=lambda request: int(request[0].get("page", 1)))
+    print(f"   {label:<18} {len(records):>8,} {len(requests):>9,} {overlapping(requests[1:]):>12,} {elapsed:>8.2f}s")
+    return records, requests
+
+
+def reset_state():
+    with get_db_connection() as conn:
+        state.ensure_table(conn)
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM scraper_state WHERE name = %s", (STATE_NAME,))
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Cambridge OpenGov scraper against recorded API pages.")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds the stand-in takes per response")
+    args = parser.parse_args()
+
+    try:
+        reset_state()
+    except psycopg2.Error as e:
+        print(f"❌ The scraper state needs the database: {e}")
+        sys.exit(2)
+
+    server = OpenGovStandIn(args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["CAMBRIDGE_API_URL"] = server.url
+    from scrapers import cambridge_api
+    cambridge_api.STATE_NAME = STATE_NAME
+
+    open_items = recorded("cambridge_procurements_open_page*.json")
+    updates = recorded("cambridge_procurements_updated.json")
+    after_update = dict(open_items)
+    for item_id, attributes in updates.items():
+        if attributes["status"] == "open":
+            after_update[item_id] = attributes
+        else:
+            after_update.pop(item_id, None)
+
+    problems = []
+    print(f"📊 Stand-in OpenGov API at {server.url}, {args.latency}s per response")
+    print(f"   {'':<18} {'records':>8} {'requests':>9} {'overlapping':>12} {'time':>9}")
+    try:
+        records, requests = run("Full sync", server, cambridge_api)
+        problems += [f"full sync: {problem}" for problem in compare_records(records, open_items, cambridge_api)]
+        pages = [int(query.get("page", 1)) for query, _, _ in requests]
+        if sorted(pages) != list(range(1, len(pages) + 1)) or len(pages) < 3:
+            problems.append(f"full sync: requested pages {pages}")
+        if any(query.get("status") != "open" for query, _, _ in requests):
+            problems.append("full sync: a request without status=open")
+        if len(requests) > 2 and overlapping(requests[1:]) < 2:
+            problems.append("full sync: pages 2..N were requested one at a time")
+
+        cursor = (state.load_state(STATE_NAME) or {}).get("synced_at")
+        records, requests = run("Updated since", server, cambridge_api)
+        problems += [f"updated since: {problem}" for problem in compare_records(records, after_update, cambridge_api)]
+        if [query.get("updated_since") for query, _, _ in requests] != [cursor]:
+            problems.append(f"updated since: expected one request from the saved cursor {cursor}, "
+                            f"got {[query for query, _, _ in requests]}")
+        added = [item_id for item_id in updates if item_id not in open_items]
+        removed = [item_id for item_id in open_items if item_id not in after_update]
+        print(f"   {len(updates)} changed procurements: {len(added)} added, {len(removed)} removed, "
+              f"{len(updates) - len(added) - len(removed)} updated")
+    finally:
+        reset_state()
+        server.shutdown()
+
+    print(f"\n📄 Scraped records: {'ok' if not problems else f'{len(problems)} problems'}")
+    for problem in problems:
+        print(f"   ⚠️ {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
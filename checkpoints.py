@@ -0,0 +1,101 @@
+"""
+Crawl checkpoints in PostgreSQL.
+
+While a city is crawled, its scraper saves each listing page it has read and
+each bid page it has parsed to crawl_checkpoints as it goes. If the run dies
+part-way (an exception on page 7, a dyno restart), the next run restores
+those results instead of fetching them again, as long as they were saved
+within the freshness window (CHECKPOINT_FRESHNESS_MINUTES). A city's
+checkpoints are cleared once its crawl has landed in the sinks.
+"""
+
+import json
+import os
+import threading
+
+FRESHNESS_MINUTES = float(os.getenv('CHECKPOINT_FRESHNESS_MINUTES', 360))
+
+CHECKPOINT_DDL = """
+    CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+        city TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        result JSONB NOT NULL,
+        saved_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (city, kind, key)
+    )
+"""
+
+
+def ensure_table(conn):
+    """Create crawl_checkpoints if it doesn't exist yet."""
+    with conn.cursor() as cur:
+        cur.execute(CHECKPOINT_DDL)
+    conn.commit()
+
+
+class Checkpoint:
+    """
+    One city's checkpoint. kind is "listing" (key: listing page) or "detail"
+    (key: bid page URL). Fresh results are loaded once up front; every
+    remember() is written straight to the database. Safe to share between threads.
+    """
+
+    # Checkpoints of every city share one connection, so they share one lock too
+    _lock = threading.Lock()
+
+    def __init__(self, conn, city, freshness_minutes=FRESHNESS_MINUTES):
+        self.conn = conn
+        self.city = city
+        with self._lock, conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT kind, key, result FROM crawl_checkpoints
+                WHERE city = %s AND saved_at > now() - make_interval(secs => %s)
+                """,
+                (city, freshness_minutes * 60),
+            )
+            self._results = {(row["kind"], row["key"]): row["result"] for row in cur.fetchall()}
+            conn.commit()
+        if self._results:
+            print(f"   ♻️ Resuming {city} from checkpoint: {len(self._results)} saved pages")
+
+    def remembered(self, kind, key):
+        """The saved result for a page, or None if there isn't a fresh one."""
+        return self._results.get((kind, str(key)))
+
+    def remember(self, kind, key, result):
+        """Save a page's result."""
+        key = str(key)
+        with self._lock, self.conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO crawl_checkpoints (city, kind, key, result) VALUES (%s, %s, %s, %s)
+                ON CONFLICT (city, kind, key) DO UPDATE SET result = EXCLUDED.result, saved_at = now()
+                """,
+                (self.city, kind, key, json.dumps(result, default=str)),
+            )
+            self.conn.commit()
+        self._results[(kind, key)] = result
+
+    def clear(self):
+        """Drop the city's checkpoint once its crawl has landed."""
+        with self._lock, self.conn.cursor() as cur:
+            cur.execute("DELETE FROM crawl_checkpoints WHERE city = %s", (self.city,))
+            self.conn.commit()
+        self._results = {}
+
+
+def checkpoint_factory(conn):
+    """
+    Function making a Checkpoint per city on a shared connection, for
+    pipeline.run_pipeline. Stale checkpoints are purged first.
+    """
+    ensure_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(
+            "DELETE FROM crawl_checkpoints WHERE saved_at <= now() - make_interval(secs => %s)",
+            (FRESHNESS_MINUTES * 60,),
+        )
+    conn.commit()
+    return lambda city: Checkpoint(conn, city)
@@ -0,0 +1,260 @@
+"""
+Crawl worker for the Postgres job queue (see job_queue.py).
+
+    python crawl_worker.py enqueue [--cities boston,quincy] [--due-only]   # start a crawl run
+    python crawl_worker.py work [--exit-when-idle]                         # run queued jobs
+
+Any number of `work` processes can run at once, on one dyno or many. Boston,
+Worcester and Quincy are split into listing jobs that fan out to one detail
+job per bid page; the other cities are crawled as a single job each. Requests
+are spaced per host across all workers through host_rate_limits. Whichever
+worker finishes a run's last job aggregates the run: it streams every stored
+record through the usual batch normalization into the output sinks, replacing
+only the cities that crawled cleanly.
+"""
+
+import argparse
+import os
+import socket
+import time
+
+import dedupe
+import digest
+import job_queue
+import scheduler
+from models import get_db_connection
+from pipeline import (BATCH_SIZE, FAN_OUT_SCRAPERS, SCRAPERS, normalize_batch, print_scraper_report,
+                      select_scrapers, text_value, update_fingerprints)
+from scrapers import boston, fetch
+from sinks import SinkWriter, configured_sinks, print_sink_report
+
+# Seconds an idle worker waits before polling the queue again
+POLL_SECONDS = 5
+
+
+def json_record(record):
+    """Record with every value as text (or None), ready to store as JSON."""
+    return {key: text_value(value) for key, value in record.items()}
+
+
+def initial_jobs(cities):
+    """First job for each city of a new run."""
+    return [("listing" if city in FAN_OUT_SCRAPERS else "city", city, {}) for city in cities]
+
+
+def run_city_job(job):
+    """Crawl a whole city in one job."""
+    records = [json_record(record) for record in SCRAPERS[job["city"]]()]
+    return {"records": records}, []
+
+
+def boston_listing_rows(payload):
+    """
+    Rows of one Boston listing page plus the listing jobs it leads to. The first
+    page (no "page" in the payload) queues every later page named by the pager,
+    or probes one page at a time if there is no last-page link. A page that
+    can't be fetched raises, so the job is retried and, failing that, fails the
+    city instead of passing for an empty page.
+    """
+    page = payload.get("page")
+    page_url = boston.MAIN_URL if page is None else f"{boston.MAIN_URL}?page={page}"
+    soup = boston.fetch_listing_page(page_url)
+    if soup is None:
+        raise RuntimeError(f"could not fetch the Boston listing page {page_url}")
+    rows = boston.parse_listing_page(soup, page_url)
+    if page is None:
+        last_page = boston.find_last_page(soup)
+        if last_page is not None:
+            return rows, [("listing", {"page": p}) for p in range(1, last_page + 1)]
+        return rows, [("listing", {"page": 1, "probe": True})] if rows else []
+
+    if payload.get("probe") and rows:
+        return rows, [("listing", {"page": page + 1, "probe": True})]
+    return rows, []
+
+
+def run_listing_job(job):
+    """
+    Fetch a listing page and fan out one detail job per bid page it links to.
+    The cities in FAN_OUT_SCRAPERS are crawled this way; the rest run as one job per city.
+    """
+    scraper = FAN_OUT_SCRAPERS[job["city"]]
+    if job["city"] == "Boston":
+        rows, follow_up = boston_listing_rows(job["payload"])
+    else:
+        rows, follow_up = scraper.fetch_listing_rows(), []
+
+    # Rows without a page of their own are finished records already
+    records = [json_record(row) for row in rows if not scraper.has_detail_page(row)]
+    follow_up += [("detail", {"row": json_record(row)}) for row in rows if scraper.has_detail_page(row)]
+    return {"records": records, "listed": len(rows)}, follow_up
+
+
+def run_detail_job(job):
+    """Merge one bid page into its listing row (the listing data is kept if the page fails)."""
+    row = job["payload"]["row"]
+    FAN_OUT_SCRAPERS[job["city"]].enrich_row(row)
+    return {"records": [json_record(row)]}, []
+
+
+JOB_HANDLERS = {
+    "city": run_city_job,
+    "listing": run_listing_job,
+    "detail": run_detail_job,
+}
+
+
+def aggregate_run(conn, run_id):
+    """
+    Stream a finished run's records into the output sinks and report on it.
+    The run is finished (done, or failed if aggregating it raised) whatever
+    happens, so it never stays stuck in aggregating.
+    """
+    print(f"\n📦 Aggregating crawl run {run_id}...")
+    status = "failed"
+    try:
+        scraper_report, sink_report = load_run(conn, run_id)
+        print_scraper_report(scraper_report)
+        print_sink_report(sink_report)
+        if any(entry["sink"] == "postgres" and entry["status"] == "ok" for entry in sink_report):
+            try:
+                print(f"\n🧹 Deduplication: {dedupe.dedupe_contracts(conn)}")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️ Could not deduplicate contracts: {e}")
+            try:
+                print(f"📬 Digests: {digest.run_digests(conn)}")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️ Could not send digests: {e}")
+        print("\n🗓️ Crawl schedule:")
+        scheduler.record_crawls(conn, scraper_report)
+        status = "done"
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️ Could not aggregate crawl run {run_id}: {e}")
+    finally:
+        job_queue.finish_run(conn, run_id, status)
+
+
+def load_run(conn, run_id):
+    """
+    Load a finished run's records into the output sinks. Returns
+    (scraper_report, sink_report). A city with any failed job (a listing page
+    or a bid page) counts as failed, so it keeps its previous rows instead of
+    losing, or archiving, the bids the failed jobs would have yielded.
+    """
+    summary = job_queue.job_summary(conn, run_id)
+    writers = [SinkWriter(sink) for sink in configured_sinks()]
+    for writer in writers:
+        writer.start()
+
+    counts = {}
+    fingerprints = {}
+    batch = []
+    for record in job_queue.iter_run_records(conn, run_id):
+        counts[record.get("City")] = counts.get(record.get("City"), 0) + 1
+        batch.append(record)
+        if len(batch) >= BATCH_SIZE:
+            df = normalize_batch(batch)
+            update_fingerprints(fingerprints, df)
+            for writer in writers:
+                writer.submit(df)
+            batch = []
+    if batch:
+        df = normalize_batch(batch)
+        update_fingerprints(fingerprints, df)
+        for writer in writers:
+            writer.submit(df)
+    conn.commit()
+
+    scraper_report = []
+    for city, jobs in sorted(summary.items()):
+        seconds = 0.0
+        if jobs["started_at"] and jobs["finished_at"]:
+            seconds = (jobs["finished_at"] - jobs["started_at"]).total_seconds()
+        detail = None
+        if jobs["failed"]:
+            detail = jobs["listing_error"] or f"{jobs['failed']} failed jobs ({jobs['error']})"
+        scraper_report.append({
+            "city": city,
+            "status": "failed" if jobs["failed"] else "ok",
+            "rows": counts.get(city, 0),
+            "seconds": round(seconds, 2),
+            "detail": detail,
+            "fingerprint": format(fingerprints.get(city, 0), "x"),
+        })
+    return scraper_report, [writer.close(scraper_report) for writer in writers]
+
+
+def work(exit_when_idle=False):
+    """Claim and run jobs until stopped (or until the queue is empty with exit_when_idle)."""
+    conn = get_db_connection()
+    job_queue.ensure_tables(conn)
+
+    # Host spacing is shared with every other worker through host_rate_limits
+    limiter_conn = get_db_connection()
+    fetch.set_shared_limiter(lambda host, interval: job_queue.reserve_host_slot(limiter_conn, host, interval))
+
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"👷 Crawl worker {worker_id} started")
+    while True:
+        # A run whose last job just ran out of attempts is aggregated here
+        for run_id in job_queue.fail_expired_jobs(conn):
+            if job_queue.claim_finished_run(conn, run_id):
+                aggregate_run(conn, run_id)
+
+        job = job_queue.claim_job(conn, worker_id)
+        if job is None:
+            if exit_when_idle:
+                print("✅ Queue is empty - exiting")
+                return
+            time.sleep(POLL_SECONDS)
+            continue
+
+        print(f"🔧 Run {job['run_id']}: {job['kind']} job {job['id']} for {job['city']} (attempt {job['attempts']})")
+        try:
+            result, follow_up = JOB_HANDLERS[job["kind"]](job)
+            job_queue.complete_job(conn, job, result, follow_up)
+        except Exception as e:
+            print(f"⚠️ Job {job['id']} failed: {e}")
+            job_queue.fail_job(conn, job, str(e))
+
+        if job_queue.claim_finished_run(conn, job["run_id"]):
+            aggregate_run(conn, job["run_id"])
+
+
+def enqueue(cities, due_only=False):
+    """Start a crawl run for the given cities (only those due by the crawl schedule with due_only)."""
+    conn = get_db_connection()
+    job_queue.ensure_tables(conn)
+    if due_only:
+        cities = scheduler.due_cities(conn, cities)
+        if not cities:
+            conn.close()
+            print("🗓️ No cities are due for a crawl.")
+            return None
+    run_id = job_queue.create_run(conn, initial_jobs(cities))
+    conn.close()
+    print(f"🚀 Queued crawl run {run_id}: {', '.join(cities)}")
+    return run_id
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run crawl jobs from the Postgres job queue.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    enqueue_parser = subcommands.add_parser("enqueue", help="start a crawl run")
+    enqueue_parser.add_argument("--cities", help=f"comma-separated cities (default: all of {', '.join(SCRAPERS)})")
+    enqueue_parser.add_argument("--due-only", action="store_true", help="only cities due by the crawl schedule")
+    work_parser = subcommands.add_parser("work", help="run queued jobs")
+    work_parser.add_argument("--exit-when-idle", action="store_true", help="stop once the queue is empty")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        try:
+            selected = select_scrapers(args.cities)
+        except ValueError as e:
+            parser.error(str(e))
+        enqueue(list(selected), due_only=args.due_only)
+    else:
+        work(exit_when_idle=args.exit_when_idle)
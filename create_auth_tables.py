@@ -70,10 +70,33 @@ def create_auth_tables():
         notification_frequency VARCHAR(20) DEFAULT 'daily' CHECK (notification_frequency IN ('immediate', 'daily', 'weekly', 'never')),
         urgency_alerts BOOLEAN DEFAULT true,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id)
     );
     """
     
+    # SQL to give existing user_preferences tables one row per user: keep each
+    # user's latest row, then add the constraint the table is now created with
+    unique_user_preferences = [
+        """
+        DELETE FROM user_preferences p
+        USING user_preferences newer
+        WHERE newer.user_id = p.user_id
+          AND (COALESCE(newer.updated_at, '-infinity'), newer.id) > (COALESCE(p.updated_at, '-infinity'), p.id);
+        """,
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint
+                WHERE conrelid = 'user_preferences'::regclass AND contype = 'u'
+            ) THEN
+                ALTER TABLE user_preferences ADD CONSTRAINT user_preferences_user_id_key UNIQUE (user_id);
+            END IF;
+        END $$;
+        """
+    ]
+    
     # SQL to create user sessions table for better session management
     create_user_sessions_table = """
     CREATE TABLE IF NOT EXISTS user_sessions (
@@ -110,7 +133,9 @@ def create_auth_tables():
         print("  ✓ Created users table")
         
         cur.execute(create_user_preferences_table)
-        print("  ✓ Created user_preferences table")
+        for unique_sql in unique_user_preferences:
+            cur.execute(unique_sql)
+        print("  ✓ Created user_preferences table (one row per user)")
         
         cur.execute(create_user_sessions_table)
         print("  ✓ Created user_sessions table")
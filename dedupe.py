@@ -0,0 +1,331 @@
+"""
+Cross-source deduplication of contracts.
+
+The same procurement is often listed twice: Somerville shows it in its web
+table and in the upcoming-bids workbook, and cooperative purchases are posted
+by several cities, each time with a slightly different title. After each load
+the orchestrator runs dedupe_contracts over the open and upcoming rows of
+contract_opportunities (closed contracts in the archive are left alone):
+
+1. Titles are normalized and cut into character shingles, and each title gets
+   a MinHash signature (NUM_PERM hash functions, computed with numpy).
+2. Locality-sensitive hashing splits the signatures into BANDS bands; titles
+   sharing any band become candidate pairs, so only near-duplicates are
+   compared instead of every pair of contracts.
+3. A candidate pair is confirmed on the shingles' exact Jaccard similarity,
+   the due dates and the estimated values.
+
+Duplicates within one city that come from different listings and share a due
+date or estimated value are merged into a single row (the most complete one,
+gaps filled from the others) whose "Sources" lists every listing. Other
+matches are linked, not merged: within a city because a similar title alone
+("... Ward 1", "... Ward 2") doesn't prove two rows are one bid, and across
+cities because each city's rows are refreshed on their own. Every row in a
+linked match gets the same "Sources" list.
+"""
+
+import json
+import re
+import zlib
+
+import numpy as np
+
+from sinks import OPEN_STATUS_SQL
+
+# MinHash functions, split into BANDS bands of NUM_PERM // BANDS rows. Titles
+# with Jaccard similarity s share a band with probability 1 - (1 - s^5)^16,
+# which rises steeply around 0.6.
+NUM_PERM = 80
+BANDS = 16
+SHINGLE_SIZE = 4
+
+# Exact shingle similarity a candidate pair needs to count as the same contract
+SIMILARITY_THRESHOLD = 0.6
+
+# Candidates whose signatures agree on less than this share are dropped before
+# the exact comparison (the MinHash estimate of their similarity is too low)
+ESTIMATE_MARGIN = 0.1
+
+# Estimated values within this fraction of each other match
+VALUE_TOLERANCE = 0.01
+
+# Within a bucket, titles are paired with at most this many neighbours, so a
+# very generic title can't make the candidates quadratic
+MAX_BUCKET = 50
+
+# Signatures are computed for about this many shingles at a time to bound memory
+SHINGLE_CHUNK = 500_000
+
+# Universal hashing (a*x + b) mod p with a, b, x < p, so a*x + b fits in 64 bits
+MERSENNE_PRIME = (1 << 31) - 1
+
+# Filled from the other rows of a merged group where the kept row has no value
+MERGE_FILL_COLUMNS = [
+    "Department", "Industry", "Estimated Value", "Release Date_Raw", "Release Date_Display",
+    "Due Date_Raw", "Due Date_Display", "Instructions", "Bid Deposit", "Addendum", "Comments",
+    "Standard_Forms", "Bid_Forms", "Bid Number", "Document_PDF", "Document_URLs",
+]
+
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+# Odd multipliers folding a band's rows into one bucket key
+_BAND_MIXERS = _rng.integers(1, 1 << 62, size=NUM_PERM // BANDS, dtype=np.uint64) | np.uint64(1)
+
+
+def normalize_title(title):
+    """Lowercase, punctuation-free, single-spaced title."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(title or "").lower()).split())
+
+
+def shingles(title):
+    """Set of SHINGLE_SIZE-character shingles of a normalized title."""
+    if len(title) <= SHINGLE_SIZE:
+        return {title} if title else set()
+    return {title[i:i + SHINGLE_SIZE] for i in range(len(title) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signatures(shingle_sets):
+    """
+    MinHash signature of every shingle set, as an (n, NUM_PERM) uint32 array.
+    Empty sets get all-max signatures, which are never paired with anything.
+    """
+    # Titles share most of their shingles, so each distinct one is hashed and permuted once
+    vocabulary = {}
+    shingle_ids = np.fromiter(
+        (vocabulary.setdefault(shingle, len(vocabulary)) for s in shingle_sets for shingle in s),
+        dtype=np.int32, count=sum(len(s) for s in shingle_sets),
+    )
+    hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingle in vocabulary), dtype=np.uint64,
+                         count=len(vocabulary)) % MERSENNE_PRIME
+    permuted = ((_PERM_A[:, None] * hashes + _PERM_B[:, None]) % MERSENNE_PRIME).astype(np.uint32)
+
+    # Pad every set to the longest one with a shingle that permutes to the maximum,
+    # then take the minimum over each record's row a chunk of records at a time
+    permuted = np.hstack([permuted, np.full((NUM_PERM, 1), np.iinfo(np.uint32).max, dtype=np.uint32)]).T.copy()
+    counts = np.array([len(s) for s in shingle_sets], dtype=np.int64)
+    width = max(int(counts.max(initial=0)), 1)
+    padded = np.full((len(shingle_sets), width), len(vocabulary), dtype=np.int32)
+    padded[np.arange(width) < counts[:, None]] = shingle_ids
+    signatures = np.empty((len(shingle_sets), NUM_PERM), dtype=np.uint32)
+    step = max(SHINGLE_CHUNK // width, 1)
+    for start in range(0, len(shingle_sets), step):
+        signatures[start:start + step] = permuted[padded[start:start + step]].min(axis=1)
+    return signatures
+
+
+def candidate_pairs(signatures):
+    """
+    Index pairs (i < j) whose signatures agree on at least one LSH band and on
+    enough of their rows overall, as an (m, 2) array.
+    """
+    rows_per_band = NUM_PERM // BANDS
+    empty = np.all(signatures == np.iinfo(np.uint32).max, axis=1)
+    found = []
+    for band in range(BANDS):
+        # One 64-bit key per band (wrapping arithmetic is fine for bucketing)
+        keys = signatures[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64) @ _BAND_MIXERS
+        keys[empty] = np.arange(int(empty.sum()), dtype=np.uint64) + band * len(keys)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        for step in range(1, MAX_BUCKET):
+            same = np.flatnonzero(sorted_keys[step:] == sorted_keys[:-step])
+            if not len(same):
+                break
+            found.append(np.stack([order[same], order[same + step]], axis=1))
+    if not found:
+        return np.empty((0, 2), dtype=np.int64)
+
+    pairs = np.sort(np.concatenate(found), axis=1).astype(np.int64)
+    pairs = np.sort(pairs[:, 0] * len(signatures) + pairs[:, 1])
+    pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]
+    pairs = np.stack([pairs // len(signatures), pairs % len(signatures)], axis=1)
+    agreement = np.empty(len(pairs))
+    for start in range(0, len(pairs), SHINGLE_CHUNK // NUM_PERM):
+        chunk = pairs[start:start + SHINGLE_CHUNK // NUM_PERM]
+        agreement[start:start + len(chunk)] = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+    return pairs[agreement >= SIMILARITY_THRESHOLD - ESTIMATE_MARGIN]
+
+
+def jaccard(a, b):
+    """Exact Jaccard similarity of two shingle sets."""
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def parse_value(value):
+    """Estimated value as a number, or None."""
+    digits = re.sub(r"[^\d.]", "", str(value or ""))
+    try:
+        return float(digits) if digits else None
+    except ValueError:
+        return None
+
+
+def due_date(record):
+    """The due date part of a record's due date, or "" if it has none."""
+    return str(record.get("Due Date_Display") or "")[:10]
+
+
+def compare_details(a, b):
+    """
+    Compare two similar-titled contracts' due dates and estimated values:
+    False if a detail known on both sides differs, True if one known on both
+    sides matches, None if neither is known on both sides.
+    """
+    matched = None
+    due_a, due_b = due_date(a), due_date(b)
+    if due_a and due_b:
+        if due_a != due_b:
+            return False
+        matched = True
+    value_a, value_b = parse_value(a.get("Estimated Value")), parse_value(b.get("Estimated Value"))
+    if value_a and value_b:
+        if abs(value_a - value_b) > VALUE_TOLERANCE * max(value_a, value_b):
+            return False
+        matched = True
+    return matched
+
+
+def mergeable(a, b):
+    """
+    Whether two rows of one city may end up in the same merged row: they come
+    from different listings (Source Type) and no detail conflicts. Rows of one
+    listing are separate bids even when their titles are alike, whether each
+    has its own page or they share the listing's URL.
+    """
+    return a.get("Source Type") != b.get("Source Type") and compare_details(a, b) is not False
+
+
+def find_duplicates(records):
+    """
+    Group near-duplicate records. Returns (merges, links): lists of index groups,
+    merges holding same-city duplicates and links the other matches.
+
+    Same-city rows are merged only when they come from different listings (see
+    mergeable) and a due date or value known on both matches; a merge group must be mergeable
+    pair by pair, not just along the matches that formed it. Same-city matches
+    that fall short of that (say a workbook row without a due date or value)
+    are linked instead, as are cross-city matches sharing a known due date.
+    """
+    shingle_sets = [shingles(normalize_title(record.get("Title"))) for record in records]
+    signatures = minhash_signatures(shingle_sets)
+
+    parent = list(range(len(records)))
+    linked = list(range(len(records)))
+    members = {i: [i] for i in range(len(records))}
+
+    def find(forest, i):
+        while forest[i] != i:
+            forest[i] = forest[forest[i]]
+            i = forest[i]
+        return i
+
+    merge_pairs = []
+    for i, j in candidate_pairs(signatures).tolist():
+        similarity = jaccard(shingle_sets[i], shingle_sets[j])
+        if similarity < SIMILARITY_THRESHOLD:
+            continue
+        a, b = records[i], records[j]
+        verdict = compare_details(a, b)
+        if verdict is False:
+            continue
+        if a.get("City") == b.get("City"):
+            if verdict and mergeable(a, b):
+                merge_pairs.append((similarity, i, j))
+            else:
+                linked[find(linked, i)] = find(linked, j)
+        elif due_date(a) and due_date(a) == due_date(b):
+            linked[find(linked, i)] = find(linked, j)
+
+    # Closest titles first; two groups join only if every row of one is mergeable with every row of the other
+    for _, i, j in sorted(merge_pairs, reverse=True):
+        root_i, root_j = find(parent, i), find(parent, j)
+        if root_i == root_j:
+            continue
+        if all(mergeable(records[x], records[y]) for x in members[root_i] for y in members[root_j]):
+            parent[root_i] = root_j
+            members[root_j] += members.pop(root_i)
+        else:
+            linked[find(linked, i)] = find(linked, j)
+
+    def groups(forest):
+        grouped = {}
+        for i in range(len(records)):
+            grouped.setdefault(find(forest, i), []).append(i)
+        return [group for group in grouped.values() if len(group) > 1]
+
+    return groups(parent), groups(linked)
+
+
+def source_of(record):
+    """The listing a record was scraped from."""
+    return {"city": record.get("City"), "source_type": record.get("Source Type"),
+            "source_url": record.get("Source URL")}
+
+
+def sources_of(records):
+    """Every listing behind a set of records, including ones merged away earlier, without repeats."""
+    sources = []
+    for record in records:
+        for source in json.loads(record.get("Sources") or "[]") + [source_of(record)]:
+            if source not in sources:
+                sources.append(source)
+    return sources
+
+
+def merge_group(records):
+    """The row kept for a group of same-city duplicates: the most complete one, gaps filled from the others."""
+    kept = dict(max(records, key=lambda record: sum(value is not None for value in record.values())))
+    for column in MERGE_FILL_COLUMNS:
+        if kept.get(column) is None:
+            kept[column] = next((record[column] for record in records if record.get(column) is not None), None)
+    kept["Sources"] = json.dumps(sources_of(records))
+    return kept
+
+
+def dedupe_contracts(conn, table="contract_opportunities"):
+    """
+    Merge same-city duplicates and link cross-city matches among the stored
+    open and upcoming contracts, in one transaction. Returns a short summary.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL AS present", (table,))
+        if not cur.fetchone()["present"]:
+            conn.commit()
+            return f"no {table} table yet"
+        # The sinks create the column; a no-op ALTER TABLE would still lock out readers
+        cur.execute(
+            "SELECT 1 FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = 'Sources' AND NOT attisdropped",
+            (table,),
+        )
+        if cur.fetchone() is None:
+            cur.execute(f'ALTER TABLE "{table}" ADD COLUMN "Sources" TEXT')
+        # Same lock as the sinks' merge, so a concurrent load can't interleave
+        cur.execute(f'LOCK TABLE "{table}" IN SHARE ROW EXCLUSIVE MODE')
+        cur.execute(f'SELECT * FROM "{table}" WHERE {OPEN_STATUS_SQL}')
+        records = [dict(row) for row in cur.fetchall()]
+        merges, links = find_duplicates(records)
+
+        removed = 0
+        for group in merges:
+            members = [records[i] for i in group]
+            kept = merge_group(members)
+            assignments = ", ".join(f'"{column}" = %s' for column in MERGE_FILL_COLUMNS + ["Sources"])
+            cur.execute(
+                f'UPDATE "{table}" SET {assignments} WHERE "Contract ID" = %s AND {OPEN_STATUS_SQL}',
+                [kept.get(column) for column in MERGE_FILL_COLUMNS + ["Sources"]] + [kept["Contract ID"]],
+            )
+            dropped = [record["Contract ID"] for record in members if record["Contract ID"] != kept["Contract ID"]]
+            cur.execute(f'DELETE FROM "{table}" WHERE "Contract ID" = ANY(%s) AND {OPEN_STATUS_SQL}', (dropped,))
+            removed += len(dropped)
+            for i in group:
+                records[i] = kept
+
+        for group in links:
+            sources = json.dumps(sources_of([records[i] for i in group]))
+            cur.execute(
+                f'UPDATE "{table}" SET "Sources" = %s WHERE "Contract ID" = ANY(%s) AND {OPEN_STATUS_SQL}',
+                (sources, list({records[i]["Contract ID"] for i in group})),
+            )
+    conn.commit()
+    return f"{removed} duplicate rows merged in {len(merges)} groups, {len(links)} matches linked"
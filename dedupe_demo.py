@@ -0,0 +1,148 @@
+"""
+Benchmark the MinHash/LSH duplicate search in dedupe.py on synthetic
+contracts with planted duplicates (no database needed).
+
+    python dedupe_demo.py                              # 1,000, 10,000 and 100,000 contracts
+    python dedupe_demo.py --records 5000
+    python dedupe_demo.py --records 2000 --compare     # also compare every pair of titles
+
+About 2% of the contracts get a same-city duplicate from another listing
+(extra spacing and punctuation in the title, no due date, and half of the
+time no value either), as when Somerville lists a bid in its web table and in
+its upcoming-bids workbook, and about 1% a cross-city cooperative listing
+("Cooperative ..." with the same due date). About 1% are split into ward
+siblings: separate bids listed in the same workbook with titles differing
+only in the ward number, which must never be merged. The demo times
+find_duplicates and counts how many planted duplicates ended up merged or
+linked, and how many merge groups hold rows of different contracts. With
+--compare it also checks every pair of titles with the exact similarity, to
+show the pairs the LSH bands missed.
+"""
+
+import argparse
+import random
+import time
+
+import dedupe
+
+CITIES = ["Boston", "Cambridge", "Concord", "Newton", "Quincy", "Somerville", "Worcester"]
+WORDS = ("road paving school roof hvac snow removal water main sewer lighting park playground custodial "
+         "services supplies vehicle fleet repair design engineering printing bus transportation library "
+         "window replacement boiler generator fence field turf bridge culvert signal pump station").split()
+
+# The upcoming-bids workbook every workbook row is listed in
+WORKBOOK_URL = "https://example.com/upcoming-bids.xlsx"
+
+# Beyond this many records the every-pair comparison takes too long to be worth waiting for
+COMPARE_LIMIT = 3000
+
+
+def synthetic_contracts(count, rng):
+    """
+    Contracts with planted duplicates, tagged "same-city", "cross-city" or
+    "ward" under "planted" and with the contract they belong to under "origin".
+    """
+    records = []
+    for i in range(count):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 7))) + f" {rng.randint(1, 9999)}"
+        record = {
+            "Title": words.title(), "City": rng.choice(CITIES),
+            "Due Date_Display": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "Estimated Value": str(rng.choice([None, rng.randint(1, 500) * 1000])),
+            "Source Type": "Open Bids", "Source URL": f"https://example.com/bids/{i}",
+            "planted": None, "origin": i,
+        }
+        if rng.random() < 0.01:
+            for ward in (1, 2):
+                records.append(dict(record, **{
+                    "Title": f"{record['Title']} Ward {ward}", "Due Date_Display": None,
+                    "Source Type": "Upcoming Bids", "Source URL": WORKBOOK_URL,
+                    "planted": "ward", "origin": (i, ward),
+                }))
+            continue
+        records.append(record)
+        if rng.random() < 0.02:
+            records.append(dict(record, **{
+                "Title": record["Title"].replace(" ", "  ", 1) + ".", "Due Date_Display": None,
+                "Estimated Value": rng.choice([record["Estimated Value"], None]),
+                "Source Type": "Upcoming Bids", "Source URL": WORKBOOK_URL, "planted": "same-city",
+            }))
+        if rng.random() < 0.01:
+            records.append(dict(record, **{
+                "Title": f"Cooperative {words}", "City": "Quincy" if record["City"] == "Boston" else "Boston",
+                "Source URL": f"https://example.com/cooperative/{i}", "planted": "cross-city",
+            }))
+    return records
+
+
+def grouped(records, groups, kind):
+    """Planted duplicates of the given kind that are in one of the groups."""
+    return sum(1 for group in groups for i in group if records[i]["planted"] == kind)
+
+
+def wrong_merges(records, merges):
+    """Merge groups holding rows of different contracts."""
+    return sum(1 for group in merges if len({records[i]["origin"] for i in group}) > 1)
+
+
+def every_pair(records):
+    """Every pair that find_duplicates should merge or link, found by comparing all titles, for comparison."""
+    shingle_sets = [dedupe.shingles(dedupe.normalize_title(record["Title"])) for record in records]
+    pairs = []
+    for i in range(len(records)):
+        for j in range(i + 1, len(records)):
+            if dedupe.jaccard(shingle_sets[i], shingle_sets[j]) < dedupe.SIMILARITY_THRESHOLD:
+                continue
+            a, b = records[i], records[j]
+            if dedupe.compare_details(a, b) is False:
+                continue
+            if a["City"] == b["City"] or (dedupe.due_date(a) and dedupe.due_date(a) == dedupe.due_date(b)):
+                pairs.append((i, j))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the duplicate search on synthetic contracts.")
+    parser.add_argument("--records", type=int, nargs="+", default=[1000, 10_000, 100_000], help="contracts per run")
+    parser.add_argument("--compare", action="store_true",
+                        help=f"also compare every pair of titles (runs of up to {COMPARE_LIMIT:,} contracts)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for count in args.records:
+        records = synthetic_contracts(count, random.Random(args.seed))
+        started = time.perf_counter()
+        merges, links = dedupe.find_duplicates(records)
+        elapsed = time.perf_counter() - started
+
+        planted_same = sum(1 for record in records if record["planted"] == "same-city")
+        planted_cross = sum(1 for record in records if record["planted"] == "cross-city")
+        print(f"\n📊 {len(records):,} contracts in {elapsed:.2f}s "
+              f"({len(records) ** 2 // 2:,} pairs if every one were compared)")
+        print(f"   Merged  {len(merges):,} groups, {grouped(records, merges, 'same-city'):,} of "
+              f"{planted_same:,} planted same-city duplicates")
+        print(f"   Linked  {len(links):,} groups, {grouped(records, links, 'cross-city'):,} of "
+              f"{planted_cross:,} planted cross-city listings, {grouped(records, links, 'same-city'):,} "
+              f"same-city duplicates without a matching value")
+        print(f"   Ward siblings merged: {grouped(records, merges, 'ward'):,} of "
+              f"{sum(1 for record in records if record['planted'] == 'ward'):,}; "
+              f"merge groups mixing contracts: {wrong_merges(records, merges):,}")
+
+        if args.compare:
+            if len(records) > COMPARE_LIMIT:
+                print(f"   Every-pair comparison skipped (over {COMPARE_LIMIT:,} contracts)")
+                continue
+            started = time.perf_counter()
+            pairs = every_pair(records)
+            elapsed = time.perf_counter() - started
+            group_of = {}
+            for number, group in enumerate(merges + links):
+                for i in group:
+                    group_of.setdefault(i, set()).add(number)
+            found = sum(1 for i, j in pairs if group_of.get(i, set()) & group_of.get(j, set()))
+            print(f"   Every pair compared in {elapsed:.2f}s: {len(pairs):,} matching pairs, "
+                  f"{found:,} of them grouped by find_duplicates")
+
+
+if __name__ == "__main__":
+    main()
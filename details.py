@@ -0,0 +1,131 @@
+"""
+On-demand bid details for listing-only crawls.
+
+With orchestrator.py --listing-only, Boston, Worcester and Quincy are crawled
+from their listing pages alone, so a crawl costs one request per listing
+page instead of one per bid. A bid's detail page is fetched the first time
+someone asks for it through /api/contracts/<id>/details, parsed with the
+scraper's usual parser and cached in contract_details for
+DETAILS_TTL_HOURS. Concurrent requests for the same bid are coalesced with a
+transaction-level advisory lock: the first fetches the page, the others wait
+for it and read the cached result. Listing-only crawls merge whatever is
+cached into the listing rows, so details fetched once show up in the sinks too.
+"""
+
+import json
+import os
+
+from scrapers.fan_out import fan_out_scraper
+
+DETAILS_TTL_HOURS = float(os.getenv('DETAILS_TTL_HOURS', 24))
+
+DETAILS_DDL = """
+    CREATE TABLE IF NOT EXISTS contract_details (
+        contract_id TEXT PRIMARY KEY,
+        city TEXT NOT NULL,
+        source_url TEXT NOT NULL,
+        details JSONB NOT NULL,
+        fetched_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+
+def ensure_table(conn):
+    """Create contract_details if it doesn't exist yet."""
+    with conn.cursor() as cur:
+        # Checked first, since /details calls this on every request
+        cur.execute("SELECT to_regclass('contract_details') IS NOT NULL AS present")
+        if not cur.fetchone()["present"]:
+            cur.execute(DETAILS_DDL)
+    conn.commit()
+
+
+def cached_details(cur, contract_id, fresh_only=True):
+    """A contract's cached details row, or None (stale rows only with fresh_only=False)."""
+    cur.execute(
+        """
+        SELECT details, fetched_at FROM contract_details
+        WHERE contract_id = %s AND (NOT %s OR fetched_at > now() - make_interval(secs => %s))
+        """,
+        (contract_id, fresh_only, DETAILS_TTL_HOURS * 3600),
+    )
+    return cur.fetchone()
+
+
+def get_details(conn, contract_id):
+    """
+    A contract's bid-page details as {"details", "fetched_at", "cached"}, fetching
+    the page if there is no fresh cached copy. Returns None for an unknown contract.
+    Raises LookupError if the contract has no bid page and RuntimeError if the
+    page can't be fetched and nothing is cached.
+    """
+    ensure_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(
+            'SELECT "City" AS city, "Source URL" AS source_url FROM contract_opportunities '
+            'WHERE "Contract ID" = %s',
+            (contract_id,),
+        )
+        contract = cur.fetchone()
+        if contract is None:
+            conn.commit()
+            return None
+        scraper = fan_out_scraper(contract["city"])
+        if scraper is None or not scraper.has_detail_page({"Source URL": contract["source_url"]}):
+            conn.commit()
+            raise LookupError(f"{contract['city']} contracts have no separate bid page")
+
+        cached = cached_details(cur, contract_id)
+        if cached is None:
+            # One request fetches the page; concurrent ones for the same bid wait here, then read its result
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"contract_details:{contract_id}",))
+            cached = cached_details(cur, contract_id)
+        if cached is not None:
+            conn.commit()
+            return {"details": cached["details"], "fetched_at": cached["fetched_at"], "cached": True}
+
+        details = scraper.scrape_individual_bid(contract["source_url"])
+        if details is None:
+            stale = cached_details(cur, contract_id, fresh_only=False)
+            conn.commit()
+            if stale is None:
+                raise RuntimeError(f"could not fetch {contract['source_url']}")
+            return {"details": stale["details"], "fetched_at": stale["fetched_at"], "cached": True}
+
+        cur.execute(
+            """
+            INSERT INTO contract_details (contract_id, city, source_url, details) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (contract_id) DO UPDATE SET details = EXCLUDED.details, fetched_at = now()
+            RETURNING fetched_at
+            """,
+            (contract_id, contract["city"], contract["source_url"], json.dumps(details, default=str)),
+        )
+        fetched_at = cur.fetchone()["fetched_at"]
+    conn.commit()
+    return {"details": details, "fetched_at": fetched_at, "cached": False}
+
+
+def details_by_url(conn, cities):
+    """Cached details of the given cities (fresh or not) as city -> {Source URL: details}."""
+    ensure_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT city, source_url, details FROM contract_details WHERE city = ANY(%s)",
+            (list(cities),),
+        )
+        cached = {}
+        for row in cur.fetchall():
+            cached.setdefault(row["city"], {})[row["source_url"]] = row["details"]
+    conn.commit()
+    return cached
+
+
+def listing_only_records(scraper, cached, checkpoint=None):
+    """
+    Yield a fan-out city's listing rows without fetching any bid page, merged
+    with the details already cached for them (cached: {Source URL: details}).
+    """
+    for row_data in scraper.listing_rows(checkpoint=checkpoint):
+        if row_data["Source URL"] in cached:
+            row_data.update(cached[row_data["Source URL"]])
+        yield row_data
@@ -0,0 +1,448 @@
+"""
+Notification digests of new contracts, driven by user_preferences.
+
+After each orchestrator run, run_digests finds the contracts not seen by an
+earlier run and matches them against every subscriber's preferences in one
+pass. Instead of comparing every user with every contract, subscribers are
+put in an inverted index keyed by (city, industry), with None standing for
+"any" where a user has no preference. A contract then only looks up its own
+four keys ((city, industry), (city, any), (any, industry), (any, any)) and
+checks the value range of the users found there.
+
+Matches are queued in pending_notifications and sent as one digest per user
+when the user's notification_frequency says so: every run for 'immediate',
+at most once a day for 'daily' and once a week for 'weekly'. Users with
+urgency_alerts get their digest right away when it holds a contract due
+within URGENT_DAYS. Digests go out through a pluggable transport (see
+configured_transport); without one nothing is queued or marked as seen.
+
+The first run only records the contracts already listed, so subscribers
+aren't sent the whole table. Both the orchestrator and the crawl workers
+call run_digests; a session-level advisory lock lets only one of them
+queue and send at a time, and the others skip their turn.
+"""
+
+import os
+import smtplib
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from email.mime.text import MIMEText
+
+from psycopg2.extras import execute_values
+
+from models import industries_for
+from sinks import OPEN_STATUS_SQL
+
+# New contracts due within this many days trigger urgency alerts
+URGENT_DAYS = 7
+
+# Days between digests for each notification_frequency
+FREQUENCY_DAYS = {"immediate": 0, "daily": 1, "weekly": 7}
+
+# Contracts listed per digest (the rest are summarized by count)
+MAX_DIGEST_CONTRACTS = 25
+
+SITE_URL = os.getenv('SITE_URL', 'http://localhost:5000')
+
+# Advisory lock key held (per session) while digests are queued and sent
+DIGEST_LOCK = "digests"
+
+DIGEST_DDL = """
+    CREATE TABLE IF NOT EXISTS notified_contracts (
+        contract_id TEXT PRIMARY KEY,
+        seen_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    CREATE TABLE IF NOT EXISTS pending_notifications (
+        user_id INTEGER NOT NULL,
+        contract_id TEXT NOT NULL,
+        urgent BOOLEAN NOT NULL DEFAULT false,
+        queued_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (user_id, contract_id)
+    );
+    CREATE TABLE IF NOT EXISTS digest_state (
+        user_id INTEGER PRIMARY KEY,
+        last_sent_at TIMESTAMPTZ NOT NULL
+    )
+"""
+
+
+def ensure_table(conn):
+    """Create the digest tables if they don't exist yet."""
+    with conn.cursor() as cur:
+        cur.execute(DIGEST_DDL)
+    conn.commit()
+
+
+# ----------------------------
+# Transports
+# ----------------------------
+
+class Transport:
+    """
+    Delivers rendered digests. send() takes email messages (see render_digest)
+    and returns the recipients (To addresses) they were delivered to.
+    """
+
+    name = "transport"
+
+    def send(self, messages):
+        raise NotImplementedError
+
+
+class SmtpTransport(Transport):
+    """Delivers over one SMTP connection per batch (STARTTLS and login if configured)."""
+
+    name = "smtp"
+
+    def __init__(self, host, port=25, username=None, password=None, starttls=False, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, messages):
+        """
+        A message the server rejects is skipped; if the connection drops, the
+        batch ends there. Either way the messages accepted so far are returned,
+        so they are marked as sent and the rest stay queued for the next run.
+        """
+        delivered = []
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for message in messages:
+                try:
+                    # sendmail with the addresses as rendered: send_message would re-parse them
+                    smtp.sendmail(message["From"], [message["To"]], message.as_bytes())
+                    delivered.append(message["To"])
+                except smtplib.SMTPServerDisconnected as e:
+                    print(f"   ⚠️ SMTP connection lost after {len(delivered)} digests: {e}")
+                    break
+                except smtplib.SMTPException as e:
+                    print(f"   ⚠️ Digest to {message['To']} not accepted: {e}")
+                except OSError as e:
+                    # Socket errors (timeouts, resets): the connection is gone too
+                    print(f"   ⚠️ SMTP connection lost after {len(delivered)} digests: {e}")
+                    break
+        return delivered
+
+
+class ConsoleTransport(Transport):
+    """Prints digests instead of sending them (for development)."""
+
+    name = "console"
+
+    def send(self, messages):
+        messages = list(messages)
+        for message in messages:
+            print(f"--- To: {message['To']} | {message['Subject']}\n{message.get_payload(decode=True).decode()}")
+        return [message["To"] for message in messages]
+
+
+def configured_transport():
+    """
+    Transport named by DIGEST_TRANSPORT ("smtp", "console" or "none"; default
+    "smtp" when SMTP_HOST is set, else "none"). SMTP_PORT, SMTP_USERNAME,
+    SMTP_PASSWORD and SMTP_STARTTLS configure SMTP. Returns None for "none".
+    """
+    name = os.getenv('DIGEST_TRANSPORT', 'smtp' if os.getenv('SMTP_HOST') else 'none').strip().lower()
+    if name == "smtp":
+        return SmtpTransport(
+            os.getenv('SMTP_HOST', 'localhost'), int(os.getenv('SMTP_PORT', 25)),
+            os.getenv('SMTP_USERNAME') or None, os.getenv('SMTP_PASSWORD') or None,
+            os.getenv('SMTP_STARTTLS', 'false').lower() in ('1', 'true', 'yes'),
+        )
+    if name == "console":
+        return ConsoleTransport()
+    if name != "none":
+        print(f"⚠️ Unknown digest transport '{name}' - no digests sent")
+    return None
+
+
+# ----------------------------
+# Matching
+# ----------------------------
+
+def build_index(subscribers):
+    """
+    Inverted index (city, industry) -> (positions of subscribers without a
+    value range, positions of those with one). An empty city or industry
+    preference is indexed under None, meaning any.
+    """
+    index = defaultdict(lambda: ([], []))
+    for position, subscriber in enumerate(subscribers):
+        ranged = subscriber["min_value"] is not None or subscriber["max_value"] is not None
+        for city in dict.fromkeys(subscriber["cities"] or [None]):
+            for industry in dict.fromkeys(subscriber["industries"] or [None]):
+                index[(city, industry)][ranged].append(position)
+    return dict(index)
+
+
+def in_range(amount, subscriber):
+    """Whether a contract's estimated amount suits the subscriber (unknown amounts always do)."""
+    if amount is None:
+        return True
+    if subscriber["min_value"] is not None and amount < subscriber["min_value"]:
+        return False
+    if subscriber["max_value"] is not None and amount > subscriber["max_value"]:
+        return False
+    return True
+
+
+def match_contracts(contracts, subscribers, index=None):
+    """Subscriber position -> the contracts (in the given order) matching their preferences."""
+    index = build_index(subscribers) if index is None else index
+    matches = defaultdict(list)
+    for contract in contracts:
+        city, industry, amount = contract["city"], contract["industry"], contract["amount"]
+        for key in {(city, industry), (city, None), (None, industry), (None, None)}:
+            unranged, ranged = index.get(key, ((), ()))
+            for position in unranged:
+                matches[position].append(contract)
+            # Only subscribers with a value range need the amount checked
+            for position in ranged:
+                if amount is None or in_range(amount, subscribers[position]):
+                    matches[position].append(contract)
+    return matches
+
+
+def is_urgent(contract, today=None):
+    """Whether a contract is due within URGENT_DAYS."""
+    try:
+        due = datetime.strptime(str(contract["due_date"])[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return False
+    today = today or date.today()
+    return today <= due <= today + timedelta(days=URGENT_DAYS)
+
+
+# ----------------------------
+# Rendering
+# ----------------------------
+
+def contract_entry(contract):
+    """
+    A contract's lines in a digest. They are the same in every digest, so they
+    are rendered once per contract and kept on it.
+    """
+    entry = contract.get("entry")
+    if entry is None:
+        details = [contract["city"], contract["industry"], f"due {contract['due_date'] or 'TBD'}"]
+        if contract["amount"] is not None:
+            details.append(f"est. ${contract['amount']:,.0f}")
+        entry = contract["entry"] = "\n".join([
+            ("[DUE SOON] " if contract["urgent"] else "") + str(contract["title"]),
+            "   " + " · ".join(str(detail) for detail in details if detail),
+            f"   {contract['source_url']}",
+        ])
+    return entry
+
+
+def render_digest(subscriber, contracts, sender):
+    """
+    One user's digest as a plain-text email, urgent contracts first. Built with
+    the compat32 MIMEText: the EmailMessage header registry costs more than the
+    rest of the digest put together.
+    """
+    contracts = sorted(contracts, key=lambda contract: (not contract["urgent"], str(contract["due_date"] or "~")))
+    urgent = sum(contract["urgent"] for contract in contracts)
+    lines = [f"Hello {subscriber['name'] or subscriber['email']},", "",
+             "New contract opportunities matching your preferences:", ""]
+    lines += [contract_entry(contract) for contract in contracts[:MAX_DIGEST_CONTRACTS]]
+    if len(contracts) > MAX_DIGEST_CONTRACTS:
+        lines.append(f"...and {len(contracts) - MAX_DIGEST_CONTRACTS} more: {SITE_URL}/home")
+    lines += ["", f"Change what you receive at {SITE_URL}/profile"]
+
+    message = MIMEText("\n".join(lines), "plain", "utf-8")
+    message["From"] = sender
+    message["To"] = subscriber["email"]
+    message["Subject"] = (f"{len(contracts)} new contract opportunit{'y' if len(contracts) == 1 else 'ies'}"
+                          + (f" ({urgent} due within {URGENT_DAYS} days)" if urgent else ""))
+    return message
+
+
+# ----------------------------
+# Digest run
+# ----------------------------
+
+CONTRACT_FIELDS = """
+    "Contract ID" AS id, "Title" AS title, "City" AS city, "Industry" AS industry,
+    "Due Date_Display" AS due_date, "Source URL" AS source_url, "Estimated Value_Amount" AS amount
+"""
+
+
+def new_contracts(cur):
+    """Open and upcoming contracts no earlier digest run has seen."""
+    cur.execute(
+        f"""
+        SELECT {CONTRACT_FIELDS} FROM contract_opportunities c
+        WHERE {OPEN_STATUS_SQL}
+          AND NOT EXISTS (SELECT 1 FROM notified_contracts n WHERE n.contract_id = c."Contract ID")
+        """
+    )
+    return [dict(row) for row in cur.fetchall()]
+
+
+def load_subscribers(cur):
+    """
+    Active users with email notifications on, with their preferences (the
+    latest row, should a user have more than one). Preferred business types
+    are widened to the contract industries they cover.
+    """
+    cur.execute(
+        """
+        SELECT u.id AS user_id, u.email, u.business_name AS name,
+               p.preferred_cities AS cities, p.preferred_industries AS industries,
+               p.min_contract_value AS min_value, p.max_contract_value AS max_value
+        FROM users u
+        JOIN (
+            SELECT DISTINCT ON (user_id) * FROM user_preferences
+            ORDER BY user_id, updated_at DESC NULLS LAST, id DESC
+        ) p ON p.user_id = u.id
+        WHERE u.is_active AND p.email_notifications AND p.notification_frequency <> 'never'
+        """
+    )
+    return [dict(row, industries=industries_for(row["industries"])) for row in cur.fetchall()]
+
+
+def queue_matches(cur, contracts, subscribers):
+    """Queue every subscriber's matching new contracts. Returns the number of notifications queued."""
+    today = date.today()
+    for contract in contracts:
+        contract["urgent"] = is_urgent(contract, today)
+    matches = match_contracts(contracts, subscribers)
+    rows = [
+        (subscribers[position]["user_id"], contract["id"], contract["urgent"])
+        for position, matched in matches.items() for contract in matched
+    ]
+    execute_values(
+        cur,
+        "INSERT INTO pending_notifications (user_id, contract_id, urgent) VALUES %s ON CONFLICT DO NOTHING",
+        rows, page_size=10_000,
+    )
+    return len(rows)
+
+
+def due_digests(cur):
+    """
+    user_id -> {subscriber, contracts} for every user whose digest is due now,
+    with the pending contracts that are still open.
+    """
+    frequency_days = ", ".join(f"('{name}', {days})" for name, days in FREQUENCY_DAYS.items())
+    cur.execute(
+        f"""
+        WITH due_users AS (
+            SELECT p.user_id
+            FROM pending_notifications q
+            JOIN user_preferences p ON p.user_id = q.user_id
+            JOIN (VALUES {frequency_days}) AS f (frequency, days) ON f.frequency = p.notification_frequency
+            LEFT JOIN digest_state s ON s.user_id = p.user_id
+            WHERE p.email_notifications
+              AND (s.last_sent_at IS NULL OR s.last_sent_at <= now() - make_interval(days => f.days)
+                   OR (p.urgency_alerts AND q.urgent))
+            GROUP BY p.user_id
+        )
+        SELECT q.user_id, u.email, u.business_name AS name, q.urgent, {CONTRACT_FIELDS}
+        FROM due_users d
+        JOIN pending_notifications q ON q.user_id = d.user_id
+        JOIN users u ON u.id = q.user_id
+        JOIN contract_opportunities c ON c."Contract ID" = q.contract_id AND {OPEN_STATUS_SQL}
+        """
+    )
+    digests = {}
+    contracts = {}
+    for row in cur.fetchall():
+        digest = digests.setdefault(row["user_id"], {
+            "subscriber": {"user_id": row["user_id"], "email": row["email"], "name": row["name"]},
+            "contracts": [],
+        })
+        # One dict per contract, shared by every digest it appears in (see contract_entry)
+        contract = contracts.setdefault(row["id"], {
+            field: row[field] for field in ("id", "title", "city", "industry", "due_date", "source_url", "amount")
+        })
+        contract["urgent"] = row["urgent"]
+        digest["contracts"].append(contract)
+    return digests
+
+
+def run_digests(conn, transport=None):
+    """
+    Queue the new contracts for their subscribers and send the digests that
+    are due, unless another process is already doing so (see DIGEST_LOCK).
+    Returns a short summary.
+    """
+    transport = transport or configured_transport()
+    if transport is None:
+        return "no digest transport configured (set SMTP_HOST or DIGEST_TRANSPORT)"
+    # Session-level, since sending commits several times along the way
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s)) AS locked", (DIGEST_LOCK,))
+        locked = cur.fetchone()["locked"]
+    conn.commit()
+    if not locked:
+        return "skipped: digests are being sent by another process"
+    try:
+        return send_digests(conn, transport)
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (DIGEST_LOCK,))
+        conn.commit()
+
+
+def send_digests(conn, transport):
+    """Queue the new contracts and send the due digests through transport (see run_digests)."""
+    ensure_table(conn)
+    sender = os.getenv('DIGEST_FROM', 'Contract Opportunities <notifications@localhost>')
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('contract_opportunities') IS NOT NULL AS present")
+        if not cur.fetchone()["present"]:
+            conn.commit()
+            return "no contract_opportunities table yet"
+        cur.execute("SELECT NOT EXISTS (SELECT 1 FROM notified_contracts) AS first_run")
+        first_run = cur.fetchone()["first_run"]
+        contracts = new_contracts(cur)
+        queued = 0 if first_run else queue_matches(cur, contracts, load_subscribers(cur))
+        execute_values(
+            cur, "INSERT INTO notified_contracts (contract_id) VALUES %s ON CONFLICT DO NOTHING",
+            [(contract["id"],) for contract in contracts], page_size=10_000,
+        )
+    conn.commit()
+    if first_run:
+        return f"first run: {len(contracts)} listed contracts recorded, no digests sent"
+
+    with conn.cursor() as cur:
+        # Contracts that closed before their digest went out are dropped
+        cur.execute(
+            f"""
+            DELETE FROM pending_notifications q WHERE NOT EXISTS (
+                SELECT 1 FROM contract_opportunities c WHERE c."Contract ID" = q.contract_id AND {OPEN_STATUS_SQL}
+            )
+            """
+        )
+        digests = due_digests(cur)
+    conn.commit()
+    by_email = {digest["subscriber"]["email"]: user_id for user_id, digest in digests.items()}
+    delivered = transport.send(
+        render_digest(digest["subscriber"], digest["contracts"], sender) for digest in digests.values()
+    )
+    sent = [by_email[email] for email in delivered]
+
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM pending_notifications WHERE user_id = ANY(%s)", (sent,))
+        execute_values(
+            cur,
+            """
+            INSERT INTO digest_state (user_id, last_sent_at) VALUES %s
+            ON CONFLICT (user_id) DO UPDATE SET last_sent_at = EXCLUDED.last_sent_at
+            """,
+            [(user_id,) for user_id in sent], template="(%s, now())", page_size=10_000,
+        )
+    conn.commit()
+    return (f"{len(contracts)} new contracts, {queued} notifications queued, "
+            f"{len(sent)} of {len(digests)} due digests sent via {transport.name}")
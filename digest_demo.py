@@ -0,0 +1,155 @@
+"""
+Benchmark the notification digests in digest.py against a local SMTP
+stand-in, with synthetic users and contracts (no database needed).
+
+    python digest_demo.py                              # 100k users, 500 new contracts
+    python digest_demo.py --users 10000 --contracts 50
+    python digest_demo.py --compare                    # also time a users x contracts loop
+
+The stand-in accepts SMTP on localhost and only counts the messages it
+receives. The demo builds the inverted index, matches the contracts,
+renders one digest per matched user, delivers them through SmtpTransport and
+prints the time and throughput of each step.
+"""
+
+import argparse
+import random
+import socketserver
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import digest
+
+CITIES = ["Boston", "Cambridge", "Concord", "Newton", "Quincy", "Somerville", "Worcester"]
+INDUSTRIES = [f"Industry {i}" for i in range(20)]
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    """Minimal SMTP server that accepts every message and counts them."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SmtpHandler)
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 localhost SMTP stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith("EHLO"):
+                self.wfile.write(b"250-localhost\r\n250 8BITMIME\r\n")
+            elif command.startswith("DATA"):
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.received += 1
+                self.reply("250 OK")
+            elif command.startswith("QUIT"):
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+def synthetic_subscribers(count, rng):
+    subscribers = []
+    for user_id in range(count):
+        low = rng.choice([None, 10_000, 50_000, 100_000])
+        subscribers.append({
+            "user_id": user_id, "email": f"user{user_id}@example.com", "name": f"Business {user_id}",
+            "cities": rng.sample(CITIES, rng.choice([0, 1, 1, 2, 3])),
+            "industries": rng.sample(INDUSTRIES, rng.choice([0, 1, 2, 2, 3])),
+            "min_value": None if low is None else Decimal(low),
+            "max_value": None if low is None or rng.random() < 0.5 else Decimal(low * 20),
+        })
+    return subscribers
+
+
+def synthetic_contracts(count, rng):
+    today = date.today()
+    return [{
+        "id": f"contract-{i}", "title": f"Bid {i}: supply and services", "city": rng.choice(CITIES),
+        "industry": rng.choice(INDUSTRIES + [None]),
+        "due_date": (today + timedelta(days=rng.randint(1, 60))).isoformat(),
+        "source_url": f"https://example.com/bids/{i}",
+        "amount": None if rng.random() < 0.4 else Decimal(rng.randint(1_000, 2_000_000)),
+    } for i in range(count)]
+
+
+def naive_matches(contracts, subscribers):
+    """Every user against every contract, for comparison."""
+    matches = {}
+    for position, subscriber in enumerate(subscribers):
+        for contract in contracts:
+            if ((not subscriber["cities"] or contract["city"] in subscriber["cities"])
+                    and (not subscriber["industries"] or contract["industry"] in subscriber["industries"])
+                    and digest.in_range(contract["amount"], subscriber)):
+                matches.setdefault(position, []).append(contract)
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark digest matching and delivery against a local SMTP stand-in.")
+    parser.add_argument("--users", type=int, default=100_000, help="synthetic subscribers")
+    parser.add_argument("--contracts", type=int, default=500, help="new contracts in the run")
+    parser.add_argument("--compare", action="store_true", help="also time the users x contracts loop")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    subscribers = synthetic_subscribers(args.users, rng)
+    contracts = synthetic_contracts(args.contracts, rng)
+    for contract in contracts:
+        contract["urgent"] = digest.is_urgent(contract)
+
+    server = SmtpStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    transport = digest.SmtpTransport("127.0.0.1", server.server_address[1])
+
+    started = time.perf_counter()
+    index = digest.build_index(subscribers)
+    indexed = time.perf_counter()
+    matches = digest.match_contracts(contracts, subscribers, index)
+    matched = time.perf_counter()
+    messages = [digest.render_digest(subscribers[position], found, "demo@localhost")
+                for position, found in matches.items()]
+    rendered = time.perf_counter()
+    delivered = transport.send(messages)
+    sent = time.perf_counter()
+    server.shutdown()
+
+    pairs = sum(len(found) for found in matches.values())
+    print(f"\n📊 {args.users:,} users, {args.contracts:,} new contracts: {len(matches):,} users matched "
+          f"({pairs:,} notifications)")
+    print(f"   Index   {indexed - started:7.2f}s ({len(index):,} keys)")
+    print(f"   Match   {matched - indexed:7.2f}s")
+    print(f"   Render  {rendered - matched:7.2f}s ({len(messages) / max(rendered - matched, 1e-9):,.0f} digests/s)")
+    print(f"   Deliver {sent - rendered:7.2f}s ({len(delivered):,} accepted, {server.received:,} received, "
+          f"{len(delivered) / max(sent - rendered, 1e-9):,.0f} digests/s)")
+    print(f"   Total   {sent - started:7.2f}s")
+
+    if args.compare:
+        started = time.perf_counter()
+        naive = naive_matches(contracts, subscribers)
+        elapsed = time.perf_counter() - started
+        same = {position: [c["id"] for c in found] for position, found in naive.items()} == \
+               {position: [c["id"] for c in found] for position, found in matches.items()}
+        print(f"   Users x contracts loop: {elapsed:.2f}s (same matches: {same})")
+
+
+if __name__ == "__main__":
+    main()
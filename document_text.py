@@ -0,0 +1,204 @@
+"""
+Text extraction and full-text index of bid documents.
+
+Scope, bonding and wage requirements are written in the bid documents, not in
+the titles and comments the scrapers capture. After documents.py has
+downloaded a run's documents, index_documents extracts the text of every
+stored file that hasn't been processed yet, in a process pool (PDF parsing is
+CPU-bound; each file is read from document_blobs as a worker frees up), and
+stores it in document_text with a GIN-indexed tsvector. Rows
+are keyed by the file's SHA-256, so a file is parsed once however many bids
+link it, and a run only costs as much as its new documents. Files that can't
+be parsed get a row with the error, so they aren't retried every run either.
+
+/api/contracts?q=... matches the query against the contracts' own text and
+the text of their documents (see CONTRACT_SEARCH_SQL).
+"""
+
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from html import unescape
+
+from documents import read_document
+
+# Processes extracting text at once
+EXTRACT_WORKERS = int(os.getenv('DOCUMENT_EXTRACT_WORKERS', os.cpu_count() or 2))
+
+# Only this many pages of a PDF and characters of text are indexed (a tsvector
+# must stay under 1 MB, and the first pages carry the requirements anyway)
+MAX_PAGES = 200
+MAX_TEXT_CHARS = 500_000
+
+DOCUMENT_TEXT_DDL = """
+    CREATE TABLE IF NOT EXISTS document_text (
+        sha256 TEXT PRIMARY KEY,
+        text TEXT NOT NULL,
+        error TEXT,
+        tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', text)) STORED,
+        extracted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS document_text_tsv ON document_text USING GIN (tsv)
+"""
+
+# Condition matching contracts whose own text or whose documents' text match
+# a web-search style query; takes the query twice as parameters
+CONTRACT_SEARCH_SQL = """
+    (to_tsvector('english', concat_ws(' ', "Title", "Department", "Industry", "Comments", "Instructions"))
+        @@ websearch_to_tsquery('english', %s)
+     OR "Contract ID" IN (
+        SELECT cd.contract_id
+        FROM document_text t
+        JOIN bid_documents d ON d.sha256 = t.sha256
+        JOIN contract_documents cd ON cd.url = d.url
+        WHERE t.tsv @@ websearch_to_tsquery('english', %s)
+     ))
+"""
+
+
+def ensure_table(conn):
+    """Create document_text if it doesn't exist yet."""
+    with conn.cursor() as cur:
+        # Checked first: CREATE INDEX IF NOT EXISTS share-locks the table even when
+        # the index exists, and searches call this on every request
+        cur.execute("SELECT to_regclass('document_text_tsv') IS NOT NULL AS present")
+        if not cur.fetchone()["present"]:
+            cur.execute(DOCUMENT_TEXT_DDL)
+    conn.commit()
+
+
+def pdf_text(data):
+    """Text of a PDF's first MAX_PAGES pages."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    return "\n".join(page.extract_text() or "" for page in reader.pages[:MAX_PAGES])
+
+
+def docx_text(data):
+    """Text of a .docx: the runs of word/document.xml (no extra dependency needed)."""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        xml = archive.read("word/document.xml").decode("utf-8", errors="ignore")
+    paragraphs = re.split(r"</w:p>", xml)
+    return "\n".join(
+        unescape("".join(re.findall(r"<w:t[^>]*>([^<]*)</w:t>", paragraph))) for paragraph in paragraphs
+    )
+
+
+def xlsx_text(data):
+    """Cell values of every sheet of a .xlsx, a row per line."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        return "\n".join(
+            " ".join(str(value) for value in row if value is not None)
+            for sheet in workbook.worksheets for row in sheet.iter_rows(values_only=True)
+        )
+    finally:
+        workbook.close()
+
+
+def file_kind(data, content_type):
+    """"pdf", "docx", "xlsx" or None, from the file's first bytes and its content type."""
+    if data.startswith(b"%PDF"):
+        return "pdf"
+    if data.startswith(b"PK"):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            names = set(archive.namelist())
+        if "word/document.xml" in names:
+            return "docx"
+        if "xl/workbook.xml" in names:
+            return "xlsx"
+    if content_type and "pdf" in content_type:
+        return "pdf"
+    return None
+
+
+EXTRACTORS = {"pdf": pdf_text, "docx": docx_text, "xlsx": xlsx_text}
+
+
+def extract_text(sha256, content_type, data):
+    """
+    Text of a stored document's content, run in a worker process. Returns
+    (sha256, text, error); unsupported formats (e.g. old binary .doc/.xls) give
+    empty text, and text is None if the parser for the format isn't installed.
+    """
+    try:
+        kind = file_kind(data, content_type)
+        if kind is None:
+            return sha256, "", f"unsupported format ({content_type or 'unknown'})"
+        text = EXTRACTORS[kind](data)
+    except ImportError as e:
+        return sha256, None, str(e)
+    except Exception as e:
+        return sha256, "", f"{type(e).__name__}: {e}"
+    # NUL bytes can't be stored in a TEXT column
+    text = re.sub(r"\s+", " ", text.replace("\x00", " ")).strip()
+    return sha256, text[:MAX_TEXT_CHARS], None
+
+
+def index_documents(conn):
+    """
+    Extract and index the text of every stored document not processed yet.
+    Returns a short summary.
+    """
+    ensure_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT ON (d.sha256) d.sha256, d.content_type
+            FROM bid_documents d
+            JOIN document_blobs b ON b.sha256 = d.sha256
+            LEFT JOIN document_text t ON t.sha256 = d.sha256
+            WHERE t.sha256 IS NULL
+            """
+        )
+        pending = [(row["sha256"], row["content_type"]) for row in cur.fetchall()]
+    conn.commit()
+    if not pending:
+        return "no new documents to index"
+
+    indexed = failed = 0
+    missing_parsers = set()
+    workers = min(EXTRACT_WORKERS, len(pending))
+    queued = iter(pending)
+    running = set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            # Only a couple of files per worker are read into memory at a time
+            for sha256, content_type in queued:
+                data = read_document(conn, sha256)
+                if data is not None:
+                    running.add(executor.submit(extract_text, sha256, content_type, data))
+                if len(running) >= 2 * workers:
+                    break
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                sha256, text, error = future.result()
+                if text is None:
+                    # Left unprocessed, to be indexed once the parser is installed
+                    missing_parsers.add(error)
+                    continue
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        INSERT INTO document_text (sha256, text, error) VALUES (%s, %s, %s)
+                        ON CONFLICT (sha256) DO NOTHING
+                        """,
+                        (sha256, text, error),
+                    )
+                # Committed one by one, so an interrupted run keeps what it extracted
+                conn.commit()
+                if error:
+                    failed += 1
+                else:
+                    indexed += 1
+    summary = f"{indexed} documents indexed, {failed} could not be read"
+    if missing_parsers:
+        summary += f"; skipped until installed: {', '.join(sorted(missing_parsers))}"
+    return summary
@@ -0,0 +1,341 @@
+"""
+Bid document downloads with content-addressed storage.
+
+Boston and Worcester bid pages link their forms, specifications and drawings
+(.pdf/.doc/.xls); the scrapers record those links in each contract's
+"Document_URLs". After a load, orchestrator.py --documents runs
+sync_documents, which downloads the linked files concurrently (through the
+per-host throttle in scrapers.fetch) into document_blobs. Every file is
+stored once under its SHA-256, however many bids or runs link to it. The
+files live in Postgres rather than on local disk: each Heroku dyno has its
+own ephemeral filesystem, so the worker that downloads a file and the web
+dyno that serves it would never see the same one.
+
+A document already downloaded is only fetched again when it may have
+changed: it is skipped for DOCUMENTS_RECHECK_HOURS after a check, and after
+that the request carries the stored ETag / Last-Modified so an unchanged file
+costs a 304. For servers that send neither, a HEAD request compares the size
+first. /api/documents/<sha256> streams the stored files from the database a
+slice at a time (see BlobReader), with range requests.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import unquote, urlparse
+
+import psycopg2
+
+from scrapers import fetch
+from sinks import OPEN_STATUS_SQL
+
+# Documents downloaded at once (each host's throttle still applies)
+DOWNLOAD_WORKERS = int(os.getenv('DOCUMENT_DOWNLOAD_WORKERS', 4))
+
+# A document checked this recently isn't requested again
+DOCUMENTS_RECHECK_HOURS = float(os.getenv('DOCUMENTS_RECHECK_HOURS', 24))
+
+CHUNK_SIZE = 1 << 16
+
+# A download is held in memory up to this size, then in a temporary file, until it is saved
+SPOOL_SIZE = 8 << 20
+
+# Bytes of a stored document read per query when it is served
+READ_CHUNK_SIZE = 1 << 20
+
+DOCUMENTS_DDL = """
+    CREATE TABLE IF NOT EXISTS bid_documents (
+        url TEXT PRIMARY KEY,
+        sha256 TEXT,
+        size BIGINT,
+        content_type TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        checked_at TIMESTAMPTZ
+    );
+    CREATE INDEX IF NOT EXISTS bid_documents_sha256 ON bid_documents (sha256);
+    CREATE TABLE IF NOT EXISTS contract_documents (
+        contract_id TEXT NOT NULL,
+        url TEXT NOT NULL,
+        name TEXT,
+        PRIMARY KEY (contract_id, url)
+    );
+    CREATE TABLE IF NOT EXISTS document_blobs (
+        sha256 TEXT PRIMARY KEY,
+        size BIGINT NOT NULL,
+        data BYTEA NOT NULL
+    );
+    -- Kept uncompressed (PDFs and Office files mostly are compressed already),
+    -- so reading a slice only fetches the TOAST chunks it covers
+    ALTER TABLE document_blobs ALTER COLUMN data SET STORAGE EXTERNAL
+"""
+
+
+def ensure_table(conn):
+    """Create bid_documents, contract_documents and document_blobs if they don't exist yet."""
+    with conn.cursor() as cur:
+        # document_blobs is created last; the DDL (its ALTER TABLE locks the
+        # table) only runs when it is missing
+        cur.execute("SELECT to_regclass('document_blobs') IS NOT NULL AS present")
+        if not cur.fetchone()["present"]:
+            cur.execute(DOCUMENTS_DDL)
+    conn.commit()
+
+
+def spool(response):
+    """
+    Stream a response body into a temporary file while hashing it. Returns
+    (sha256, size, file), the file rewound for store().
+    """
+    digest = hashlib.sha256()
+    size = 0
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            digest.update(chunk)
+            spooled.write(chunk)
+            size += len(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return digest.hexdigest(), size, spooled
+
+
+def store(conn, sha256, size, spooled):
+    """Save a spooled download in document_blobs; a file already stored under the same hash is kept."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM document_blobs WHERE sha256 = %s", (sha256,))
+        if cur.fetchone() is None:
+            cur.execute(
+                """
+                INSERT INTO document_blobs (sha256, size, data) VALUES (%s, %s, %s)
+                ON CONFLICT (sha256) DO NOTHING
+                """,
+                (sha256, size, psycopg2.Binary(spooled.read())),
+            )
+    conn.commit()
+
+
+def download(url, known=None):
+    """
+    Fetch one document unless the server says the stored copy (known, its
+    bid_documents row) is still current. Returns the document's new row with
+    "changed" (whether the content was downloaded again) and, when it was,
+    "file" (the spooled content, see spool()); None on failure.
+    """
+    if known and known["stored"]:
+        headers = {}
+        if known["etag"]:
+            headers["If-None-Match"] = known["etag"]
+        if known["last_modified"]:
+            headers["If-Modified-Since"] = known["last_modified"]
+        if not headers and known["size"] is not None:
+            try:
+                response = fetch.head(url, timeout=20)
+                if response.ok and response.headers.get("Content-Length") == str(known["size"]):
+                    return dict(known, changed=False)
+            except Exception:
+                pass
+    else:
+        known, headers = None, {}
+
+    try:
+        with fetch.get(url, headers=headers, stream=True, timeout=30) as response:
+            if response.status_code == 304 and known:
+                return dict(known, changed=False)
+            response.raise_for_status()
+            sha256, size, spooled = spool(response)
+            return {
+                "url": url, "sha256": sha256, "size": size,
+                "content_type": response.headers.get("Content-Type"),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "changed": not known or known["sha256"] != sha256,
+                "file": spooled,
+            }
+    except Exception as e:
+        print(f"   ⚠️ Failed to download document {url}: {e}")
+        return None
+
+
+def linked_documents(conn, cities=None):
+    """(contract id, name, url) of every document linked from an open or upcoming contract."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('contract_opportunities') IS NOT NULL AS present")
+        if not cur.fetchone()["present"]:
+            return []
+        city_filter = 'AND "City" = ANY(%s)' if cities else ""
+        cur.execute(
+            f'SELECT "Contract ID" AS contract_id, "Document_URLs" AS documents FROM contract_opportunities '
+            f'WHERE {OPEN_STATUS_SQL} AND "Document_URLs" IS NOT NULL {city_filter}',
+            (list(cities),) if cities else None,
+        )
+        rows = cur.fetchall()
+    return [
+        (row["contract_id"], document.get("name"), document["url"])
+        for row in rows for document in json.loads(row["documents"])
+    ]
+
+
+def sync_documents(conn, cities=None):
+    """
+    Link every open contract's documents and download the new or changed ones
+    (of the given cities, or all). Returns a short summary.
+    """
+    ensure_table(conn)
+    links = linked_documents(conn, cities)
+    urls = sorted({url for _, _, url in links})
+    with conn.cursor() as cur:
+        for contract_id, name, url in links:
+            cur.execute(
+                """
+                INSERT INTO contract_documents (contract_id, url, name) VALUES (%s, %s, %s)
+                ON CONFLICT (contract_id, url) DO UPDATE SET name = EXCLUDED.name
+                """,
+                (contract_id, url, name),
+            )
+        cur.execute(
+            """
+            SELECT d.*, b.sha256 IS NOT NULL AS stored,
+                d.checked_at > now() - make_interval(secs => %s) AS recent
+            FROM bid_documents d LEFT JOIN document_blobs b ON b.sha256 = d.sha256
+            WHERE d.url = ANY(%s)
+            """,
+            (DOCUMENTS_RECHECK_HOURS * 3600, urls),
+        )
+        known = {row["url"]: dict(row) for row in cur.fetchall()}
+    conn.commit()
+
+    due = [url for url in urls if not (url in known and known[url]["recent"] and known[url]["stored"])]
+    results = []
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        futures = [executor.submit(download, url, known.get(url)) for url in due]
+        # Each download is saved as soon as it completes, so spooled files don't pile up
+        for future in as_completed(futures):
+            document = future.result()
+            results.append(document)
+            if document is None:
+                continue
+            spooled = document.pop("file", None)
+            if spooled is not None:
+                with spooled:
+                    store(conn, document["sha256"], document["size"], spooled)
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO bid_documents (url, sha256, size, content_type, etag, last_modified, checked_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, now())
+                    ON CONFLICT (url) DO UPDATE SET sha256 = EXCLUDED.sha256, size = EXCLUDED.size,
+                        content_type = EXCLUDED.content_type, etag = EXCLUDED.etag,
+                        last_modified = EXCLUDED.last_modified, checked_at = now()
+                    """,
+                    (document["url"], document["sha256"], document["size"], document["content_type"],
+                     document["etag"], document["last_modified"]),
+                )
+            conn.commit()
+
+    downloaded = [document for document in results if document and document["changed"]]
+    failed = sum(document is None for document in results)
+    return (f"{len(urls)} documents linked, {len(due)} checked: {len(downloaded)} downloaded, "
+            f"{len(due) - len(downloaded) - failed} unchanged, {failed} failed")
+
+
+def contract_documents(conn, contract_id):
+    """A contract's documents with their stored file (sha256 is None until downloaded)."""
+    ensure_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT cd.name, cd.url, d.sha256, d.size, d.content_type, d.checked_at
+            FROM contract_documents cd LEFT JOIN bid_documents d ON d.url = cd.url
+            WHERE cd.contract_id = %s ORDER BY cd.name
+            """,
+            (contract_id,),
+        )
+        documents = [dict(row) for row in cur.fetchall()]
+    conn.commit()
+    return documents
+
+
+def stored_document(conn, sha256):
+    """Size, content type and a file name of a stored document, or None if it isn't stored."""
+    ensure_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT b.size, d.content_type, d.url
+            FROM document_blobs b LEFT JOIN bid_documents d ON d.sha256 = b.sha256
+            WHERE b.sha256 = %s LIMIT 1
+            """,
+            (sha256,),
+        )
+        row = cur.fetchone()
+    conn.commit()
+    if row is None:
+        return None
+    name = unquote(os.path.basename(urlparse(row["url"] or "").path)) or sha256
+    return {"size": row["size"], "content_type": row["content_type"], "name": name}
+
+
+def read_document(conn, sha256):
+    """The whole content of a stored document, or None if it isn't stored."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT data FROM document_blobs WHERE sha256 = %s", (sha256,))
+        row = cur.fetchone()
+    conn.commit()
+    return None if row is None else bytes(row["data"])
+
+
+class BlobReader(io.RawIOBase):
+    """
+    Seekable, read-only file over a stored document. Every read fetches just
+    the slice it asks for from document_blobs, so a document (or a range of
+    it) is served without loading the whole file. The reader owns conn and
+    closes it when it is closed.
+    """
+
+    def __init__(self, conn, sha256, size):
+        super().__init__()
+        self.conn = conn
+        self.sha256 = sha256
+        self.size = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        start = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = max(start + offset, 0)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def readinto(self, buffer):
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT substring(data FROM %s FOR %s) AS chunk FROM document_blobs WHERE sha256 = %s",
+                (self.position + 1, length, self.sha256),
+            )
+            row = cur.fetchone()
+        self.conn.commit()
+        chunk = row["chunk"] if row else b""
+        buffer[:len(chunk)] = chunk
+        self.position += len(chunk)
+        return len(chunk)
+
+    def close(self):
+        if not self.closed:
+            self.conn.close()
+        super().close()
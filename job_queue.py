@@ -0,0 +1,283 @@
+"""
+Durable crawl job queue in PostgreSQL.
+
+A crawl run is a row in crawl_runs plus the jobs in crawl_jobs that belong
+to it. Workers (see crawl_worker.py) claim one job at a time with
+FOR UPDATE SKIP LOCKED, so any number of worker processes can pull from the
+queue without handing the same job to two of them. A job whose worker dies
+is handed out again once its lease runs out, and a failed job is retried
+with backoff; either way a job gets MAX_ATTEMPTS attempts before it is
+marked failed.
+
+host_rate_limits holds the next free request slot per host, so the
+politeness spacing in scrapers.fetch holds across every worker, not just
+within one process.
+"""
+
+import json
+
+# Seconds a claimed job may run before another worker may take it over
+JOB_LEASE_SECONDS = 600
+
+# Attempts per job before it is marked failed, and the backoff between them
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 30
+
+QUEUE_DDL = """
+    CREATE TABLE IF NOT EXISTS crawl_runs (
+        id SERIAL PRIMARY KEY,
+        cities TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'running',
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        finished_at TIMESTAMPTZ
+    );
+
+    CREATE TABLE IF NOT EXISTS crawl_jobs (
+        id BIGSERIAL PRIMARY KEY,
+        run_id INTEGER NOT NULL REFERENCES crawl_runs(id) ON DELETE CASCADE,
+        kind TEXT NOT NULL,
+        city TEXT NOT NULL,
+        payload JSONB NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        result JSONB,
+        error TEXT,
+        claimed_by TEXT,
+        claimed_at TIMESTAMPTZ,
+        run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+        finished_at TIMESTAMPTZ
+    );
+
+    CREATE INDEX IF NOT EXISTS crawl_jobs_claim_idx ON crawl_jobs (status, run_after, id);
+    CREATE INDEX IF NOT EXISTS crawl_jobs_run_idx ON crawl_jobs (run_id, status);
+
+    -- A bid's detail page is fetched once per run even if several listing pages show it
+    CREATE UNIQUE INDEX IF NOT EXISTS crawl_jobs_detail_url_idx
+        ON crawl_jobs (run_id, city, (payload->'row'->>'Source URL'))
+        WHERE kind = 'detail';
+
+    CREATE TABLE IF NOT EXISTS host_rate_limits (
+        host TEXT PRIMARY KEY,
+        next_request_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+"""
+
+
+def ensure_tables(conn):
+    """Create the queue tables if they don't exist yet."""
+    with conn.cursor() as cur:
+        cur.execute(QUEUE_DDL)
+    conn.commit()
+
+
+def create_run(conn, jobs):
+    """
+    Start a crawl run with its initial jobs, given as (kind, city, payload) tuples.
+    Returns the run id.
+    """
+    cities = sorted({city for _, city, _ in jobs})
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO crawl_runs (cities) VALUES (%s) RETURNING id", (",".join(cities),))
+        run_id = cur.fetchone()["id"]
+        for kind, city, payload in jobs:
+            enqueue(cur, run_id, kind, city, payload)
+    conn.commit()
+    return run_id
+
+
+def enqueue(cur, run_id, kind, city, payload):
+    """Add a job to a run (inside the caller's transaction). Duplicate detail pages are skipped."""
+    if kind == "detail":
+        cur.execute(
+            """
+            INSERT INTO crawl_jobs (run_id, kind, city, payload) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (run_id, city, (payload->'row'->>'Source URL')) WHERE kind = 'detail' DO NOTHING
+            """,
+            (run_id, kind, city, json.dumps(payload)),
+        )
+    else:
+        cur.execute(
+            "INSERT INTO crawl_jobs (run_id, kind, city, payload) VALUES (%s, %s, %s, %s)",
+            (run_id, kind, city, json.dumps(payload)),
+        )
+
+
+def fail_expired_jobs(conn):
+    """
+    Mark failed the jobs whose lease ran out on their last attempt: their
+    worker died MAX_ATTEMPTS times (e.g. on a page that crashes it), so they
+    aren't handed out again. Returns the ids of the runs they belong to.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE crawl_jobs
+            SET status = 'failed', finished_at = now(),
+                error = COALESCE(error || '; ', '') || 'worker lost on the last attempt'
+            WHERE status = 'running' AND claimed_at < now() - make_interval(secs => %s) AND attempts >= %s
+            RETURNING run_id
+            """,
+            (JOB_LEASE_SECONDS, MAX_ATTEMPTS),
+        )
+        run_ids = sorted({row["run_id"] for row in cur.fetchall()})
+    conn.commit()
+    return run_ids
+
+
+def claim_job(conn, worker_id):
+    """
+    Claim the next runnable job, or return None if there is none.
+    Listing and whole-city jobs go before detail jobs so fan-out starts early;
+    jobs whose lease has run out (their worker died) are claimed again while
+    they have attempts left (see fail_expired_jobs).
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE crawl_jobs
+            SET status = 'running', attempts = attempts + 1, claimed_by = %s, claimed_at = now()
+            WHERE id = (
+                SELECT id FROM crawl_jobs
+                WHERE (status = 'pending' AND run_after <= now())
+                   OR (status = 'running' AND claimed_at < now() - make_interval(secs => %s) AND attempts < %s)
+                ORDER BY (kind = 'detail'), id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, run_id, kind, city, payload, attempts
+            """,
+            (worker_id, JOB_LEASE_SECONDS, MAX_ATTEMPTS),
+        )
+        job = cur.fetchone()
+    conn.commit()
+    return dict(job) if job else None
+
+
+def complete_job(conn, job, result, follow_up=()):
+    """
+    Store a job's result and enqueue the jobs it fans out to, in one transaction.
+    follow_up is a list of (kind, payload) for the same run and city.
+    """
+    with conn.cursor() as cur:
+        for kind, payload in follow_up:
+            enqueue(cur, job["run_id"], kind, job["city"], payload)
+        cur.execute(
+            "UPDATE crawl_jobs SET status = 'done', result = %s, error = NULL, finished_at = now() WHERE id = %s",
+            (json.dumps(result), job["id"]),
+        )
+    conn.commit()
+
+
+def fail_job(conn, job, error):
+    """Put a failed job back on the queue with backoff, or mark it failed after MAX_ATTEMPTS."""
+    conn.rollback()
+    with conn.cursor() as cur:
+        if job["attempts"] < MAX_ATTEMPTS:
+            cur.execute(
+                """
+                UPDATE crawl_jobs
+                SET status = 'pending', error = %s, run_after = now() + make_interval(secs => %s)
+                WHERE id = %s
+                """,
+                (error, RETRY_BACKOFF_SECONDS * job["attempts"], job["id"]),
+            )
+        else:
+            cur.execute(
+                "UPDATE crawl_jobs SET status = 'failed', error = %s, finished_at = now() WHERE id = %s",
+                (error, job["id"]),
+            )
+    conn.commit()
+
+
+def claim_finished_run(conn, run_id):
+    """
+    Mark a run as aggregating if all of its jobs have finished. Returns True for
+    exactly one caller, which should then run the aggregation step.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE crawl_runs SET status = 'aggregating'
+            WHERE id = %s AND status = 'running'
+              AND NOT EXISTS (
+                  SELECT 1 FROM crawl_jobs
+                  WHERE run_id = %s AND status IN ('pending', 'running')
+              )
+            RETURNING id
+            """,
+            (run_id, run_id),
+        )
+        claimed = cur.fetchone() is not None
+    conn.commit()
+    return claimed
+
+
+def finish_run(conn, run_id, status="done"):
+    """Record the end of a run's aggregation step."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE crawl_runs SET status = %s, finished_at = now() WHERE id = %s",
+            (status, run_id),
+        )
+    conn.commit()
+
+
+def job_summary(conn, run_id):
+    """
+    Per city: counts of done and failed jobs, the error of any failed
+    listing/city job, and an error of any failed job.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT city,
+                   count(*) FILTER (WHERE status = 'done') AS done,
+                   count(*) FILTER (WHERE status = 'failed') AS failed,
+                   max(error) FILTER (WHERE status = 'failed' AND kind <> 'detail') AS listing_error,
+                   max(error) FILTER (WHERE status = 'failed') AS error,
+                   min(claimed_at) AS started_at,
+                   max(finished_at) AS finished_at
+            FROM crawl_jobs WHERE run_id = %s
+            GROUP BY city
+            """,
+            (run_id,),
+        )
+        return {row["city"]: dict(row) for row in cur.fetchall()}
+
+
+def iter_run_records(conn, run_id, fetch_size=500):
+    """Yield every record stored in a run's job results, streamed with a server-side cursor."""
+    with conn.cursor(name=f"run_records_{run_id}") as cur:
+        cur.itersize = fetch_size
+        cur.execute(
+            """
+            SELECT jsonb_array_elements(result->'records') AS record
+            FROM crawl_jobs
+            WHERE run_id = %s AND status = 'done' AND result ? 'records'
+            ORDER BY city, id
+            """,
+            (run_id,),
+        )
+        for row in cur:
+            yield row["record"]
+
+
+def reserve_host_slot(conn, host, min_interval):
+    """
+    Reserve the next request slot for host across all workers.
+    Returns how many seconds the caller should wait before sending its request.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO host_rate_limits (host, next_request_at)
+            VALUES (%s, now() + make_interval(secs => %s))
+            ON CONFLICT (host) DO UPDATE
+                SET next_request_at = GREATEST(host_rate_limits.next_request_at, now()) + make_interval(secs => %s)
+            RETURNING EXTRACT(EPOCH FROM next_request_at - now()) AS until_next
+            """,
+            (host, min_interval, min_interval),
+        )
+        until_next = float(cur.fetchone()["until_next"])
+    conn.commit()
+    return max(until_next - min_interval, 0.0)
@@ -2,6 +2,7 @@ import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 from datetime import datetime
+from io import BytesIO
 from sqlalchemy import create_engine
 
 # ----------------------------
@@ -40,9 +41,12 @@ if excel_url and not excel_url.startswith("http"):
 df_excel = pd.DataFrame()
 if excel_url:
     excel_response = requests.get(excel_url)
-    with open("upcoming_bids.xlsx", "wb") as f:
-        f.write(excel_response.content)
-    df_excel = pd.read_excel("upcoming_bids.xlsx", skiprows=8)
+    # Parse from memory, reading only the columns mapped below
+    df_excel = pd.read_excel(
+        BytesIO(excel_response.content), skiprows=8,
+        usecols=lambda col: col in ("DESCRIPTION OF PURCHASE", "DEPARTMENT", "INDUSTRY TYPE",
+                                    "ESTIMATED TOTAL VALUE", "MONTH", "YEAR")
+    )
     print("\U0001F50D df_excel columns:", df_excel.columns.tolist())
     print("✅ Excel file downloaded and parsed")
 else:
@@ -317,4 +317,36 @@ def get_business_types():
         'Food Services',
         'Professional Services',
         'Other'
-    ]
\ No newline at end of file
+    ]
+
+# Contract "Industry" values covered by each business type. Contracts are
+# classified by the scrapers and pipeline.classify_industry, so the profile's
+# business types ("Construction") aren't the values stored on contracts
+# ("Construction (Buildings)").
+BUSINESS_TYPE_INDUSTRIES = {
+    'Landscaping': ['Landscaping', 'Construction (Public Works, Parks, Roadways)'],
+    'Construction': ['Construction', 'Construction (Buildings)', 'Construction (Public Works, Parks, Roadways)'],
+    'Plumbing': ['Water and Sewer Infrastructure Services and Supplies', 'Utilities'],
+    'Electrical': ['Energy and Electrical Services', 'Utilities'],
+    'HVAC': ['Construction (Buildings)', 'Energy and Electrical Services'],
+    'Cleaning Services': ['Custodial Supplies and Services', 'Maintenance', 'Waste Management'],
+    'Security Services': ['Security'],
+    'IT Services': ['IT - Software and Services', 'IT/Technology'],
+    'Consulting': ['Professional Services', 'Financial/Banking Services'],
+    'Engineering': ['Design and Engineering'],
+    'Architecture': ['Design and Engineering'],
+    'Transportation': ['Transportation Services'],
+    'Food Services': ['Food and Food Services', 'Food Services'],
+    'Professional Services': ['Professional Services', 'Financial/Banking Services', 'Design and Engineering',
+                              'Printing, Marketing/Collateral Materials, Graphic Design',
+                              'Job-Related Training/Professional Memberships'],
+    'Other': ['Other', 'General Services'],
+}
+
+
+def industries_for(preferred_industries):
+    """Contract industries matching preferred industries: each preference itself plus, for business types, the industries they cover."""
+    industries = []
+    for preference in preferred_industries or []:
+        industries += [preference] + BUSINESS_TYPE_INDUSTRIES.get(preference, [])
+    return list(dict.fromkeys(industries))
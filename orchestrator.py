@@ -1,337 +1,166 @@
-from scrapers import somerville
-#from scrapers.cambridge import scrape as scrape_cambridge  
-from scrapers.concord import scrape as scrape_concord
-from scrapers.newton import scrape as scrape_newton
-from scrapers.worcester import scrape as scrape_worcester
-from scrapers.boston import scrape as scrape_boston
-from scrapers.quincy import scrape as scrape_quincy
-import pandas as pd
-import dateparser
-from sqlalchemy import create_engine
-import os
-import json
-from urllib.parse import urlparse
+import argparse
+from functools import partial
+
+import budget
+import checkpoints
+import dedupe
+import digest
+import details
+import document_text
+import documents
+import scheduler
+from models import get_db_connection
+from pipeline import FAN_OUT_SCRAPERS, SCRAPERS, select_scrapers, run_pipeline, print_scraper_report
+from sinks import configured_sinks, print_sink_report
+
+parser = argparse.ArgumentParser(description="Scrape municipal bid listings and load them into the output sinks.")
+parser.add_argument(
+    "--cities",
+    help=f"comma-separated cities to refresh (default: all of {', '.join(SCRAPERS)}); "
+         "other cities' stored rows are left as they are",
+)
+parser.add_argument(
+    "--due-only", action="store_true",
+    help="only crawl cities whose adaptive schedule says they are due (see scheduler.py)",
+)
+parser.add_argument(
+    "--budget-minutes", type=float,
+    help="stop fetching bid pages after this many minutes and finish with what was crawled (see budget.py); "
+         "allow extra time after it for the sinks",
+)
+parser.add_argument(
+    "--listing-only", action="store_true",
+    help=f"crawl {', '.join(FAN_OUT_SCRAPERS)} from their listing pages only; bid pages are fetched "
+         "on demand by /api/contracts/<id>/details (see details.py)",
+)
+parser.add_argument(
+    "--documents", action="store_true",
+    help="after the load, download the bid documents that are new or changed (see documents.py) and "
+         "index the text of new ones for search (see document_text.py)",
+)
+args = parser.parse_args()
+
+try:
+    scrapers = select_scrapers(args.cities)
+except ValueError as e:
+    parser.error(str(e))
+
+if args.due_only:
+    conn = get_db_connection()
+    due = scheduler.due_cities(conn, list(scrapers))
+    conn.close()
+    scrapers = {city: scrapers[city] for city in due}
+    if not scrapers:
+        print("🗓️ No cities are due for a crawl.")
+        exit()
 
 # ----------------------------
-# Run all scrapers
+# Run the scrapers, streaming their records to the output sinks
 # ----------------------------
-df_somerville = somerville.scrape()
-#df_cambridge = scrape_cambridge()
-#print("🔍 Cambridge rows scraped:", len(df_cambridge))
-df_concord = scrape_concord()
-print("🔍 Concord rows scraped:", len(df_concord))
-df_newton = scrape_newton()
-print("🔍 Newton rows scraped:", len(df_newton))
-df_worcester = scrape_worcester()
-print("🔍 Worcester rows scraped:", len(df_worcester))
-df_boston = scrape_boston()
-print("🔍 Boston rows scraped:", len(df_boston))
-df_quincy = scrape_quincy()
-print("🔍 Quincy rows scraped:", len(df_quincy))
+# Each scraper runs in its own thread and yields records as it goes; records
+# are normalized and classified in small batches (see pipeline.py) and every
+# batch is written to the configured sinks (PostgreSQL, Google Sheets, ...)
+# as soon as it is ready. Only the scraped cities' rows are replaced, and a
+# city whose scrape fails or comes back empty keeps its previous rows.
+# Listing and bid pages are checkpointed to Postgres as they are scraped, so a
+# run that dies part-way resumes where it left off (see checkpoints.py)
+checkpoint_for = None
+try:
+    checkpoint_for = checkpoints.checkpoint_factory(get_db_connection())
+except Exception as e:
+    print(f"⚠️ Checkpoints unavailable, crawling without them: {e}")
 
-# Combine safely
-dfs = [df for df in [df_somerville, df_concord, df_newton, df_worcester, df_boston, df_quincy] if not df.empty]
-if dfs:
-    df_combined = pd.concat(dfs, ignore_index=True)
-    # --- Normalize and bucket Status column ---
-    # Rename lowercase 'status' to 'Status' if present
-    if 'status' in df_combined.columns:
-        df_combined.rename(columns={'status': 'Status'}, inplace=True)
-    # Standardize casing and bucket into Open, Upcoming, Closed
-    if 'Status' in df_combined.columns:
-        df_combined['Status'] = (
-            df_combined['Status']
-            .astype(str)
-            .str.strip()
-            .str.lower()
-            .str.capitalize()
-        )
-        df_combined['Status'] = df_combined['Status'].apply(
-            lambda x: 'Open' if x == 'Open' else 'Upcoming' if x == 'Upcoming' else 'Closed'
-        )
-    # --- Clean up Title prefixes ---
-    if 'Title' in df_combined.columns:
-        df_combined['Title'] = (
-            df_combined['Title']
-            .astype(str)
-            .str.replace(
-                r'^(?:IFB\s*#?\d+-\d+\s+|RFP\s*\d+-\d+\s+|RFS\s*\d+-\d+\s+|Request for Quotes\s*\d{4}-\d+\s+)',
-                '',
-                regex=True
-            )
-            .str.strip()
-            .str.title()
-        )
-    # --- Standardize date fields for display ---
-    import re
-    from datetime import datetime
-    
-    def standardize_date_for_display(date_str):
-        """
-        Convert various date formats to standardized display format:
-        - Full datetime: "2025-06-18 3:00 PM" 
-        - Date only: "2025-06-18"
-        - Month-Year: "Nov 2025" (for upcoming planning phase bids)
-        """
-        if not date_str or str(date_str).lower() in ('', 'nan', 'none'):
-            return None
-            
-        date_str = str(date_str).strip()
-        
-        # Handle Month-Year only (upcoming bids in planning phase)
-        month_year_match = re.match(r'^([A-Za-z]+)\s+(\d{4})$', date_str)
-        if month_year_match:
-            return date_str  # Keep as-is for planning phase display
-            
-        # Handle TBD dates (to be determined)
-        if 'TBD' in date_str.upper():
-            # Extract year if present: "TBD/01/2025" -> "2025 TBD"
-            year_match = re.search(r'(\d{4})', date_str)
-            if year_match:
-                return f"{year_match.group(1)} TBD"
-            else:
-                return "TBD"
-            
-        # Try parsing with dateparser first (handles most formats)
-        try:
-            parsed = dateparser.parse(date_str)
-            if parsed:
-                # Format for display
-                if parsed.time() != datetime.min.time():  # Has time component
-                    return parsed.strftime("%Y-%m-%d %I:%M %p")
-                else:  # Date only
-                    return parsed.strftime("%Y-%m-%d")
-        except:
-            pass
-            
-        # Fallback patterns for common formats
-        patterns = [
-            # "Wed, 05/28/2025 - 12:00pm" or "06/18/2025 - 3:00pm"
-            (r'(?:\w+,?\s*)?(\d{1,2})/(\d{1,2})/(\d{4})\s*-?\s*(\d{1,2}):(\d{2})\s*(AM|PM|am|pm)', 'datetime'),
-            # "05/28/2025" or "06/18/2025"  
-            (r'(?:\w+,?\s*)?(\d{1,2})/(\d{1,2})/(\d{4})', 'date'),
-        ]
-        
-        for pattern, format_type in patterns:
-            match = re.search(pattern, date_str)
-            if match:
-                try:
-                    if format_type == 'datetime':
-                        month, day, year, hour, minute, ampm = match.groups()
-                        hour = int(hour)
-                        if ampm.upper() == 'PM' and hour != 12:
-                            hour += 12
-                        elif ampm.upper() == 'AM' and hour == 12:
-                            hour = 0
-                        dt = datetime(int(year), int(month), int(day), hour, int(minute))
-                        return dt.strftime("%Y-%m-%d %I:%M %p")
-                    else:  # date only
-                        month, day, year = match.groups()
-                        dt = datetime(int(year), int(month), int(day))
-                        return dt.strftime("%Y-%m-%d")
-                except ValueError:
-                    continue
-                    
-        # If all parsing fails, keep original for manual review
-        print(f"⚠️  Could not parse date: '{date_str}' - keeping original")
-        return date_str
+# In listing-only mode the fan-out cities skip their bid pages and reuse the
+# details cached by /api/contracts/<id>/details instead (see details.py)
+if args.listing_only:
+    cached = {}
+    try:
+        conn = get_db_connection()
+        cached = details.details_by_url(conn, [city for city in scrapers if city in FAN_OUT_SCRAPERS])
+        conn.close()
+    except Exception as e:
+        print(f"⚠️ Could not load cached bid details, listing rows only: {e}")
+    scrapers = {
+        city: partial(details.listing_only_records, FAN_OUT_SCRAPERS[city], cached.get(city, {}))
+        if city in FAN_OUT_SCRAPERS else iter_records
+        for city, iter_records in scrapers.items()
+    }
 
-    # Process date columns
-    date_cols = [col for col in df_combined.columns if 'Date' in col]
-    
-    for col in date_cols:
-        print(f"📅 Standardizing {col}...")
-        
-        # Create raw backup column
-        df_combined[col + '_Raw'] = df_combined[col].copy()
-        
-        # Create standardized display column
-        df_combined[col + '_Display'] = df_combined[col].apply(standardize_date_for_display)
-        
-        # Drop original column (we have Raw and Display now)
-        df_combined.drop(columns=[col], inplace=True)
-        
-    # --- Industry Classification ---
-    def classify_industry(title, department=None):
-        """
-        Classify contract into industry categories based on title and department.
-        Uses existing categories from the database.
-        """
-        if not title:
-            return "Other"
-            
-        title_lower = str(title).lower()
-        dept_lower = str(department).lower() if department else ""
-        
-        # Industry classification rules based on keywords
-        classification_rules = {
-            "Construction (Buildings)": [
-                "school", "building", "construction", "demolition", "renovation", "roof", 
-                "foundation", "structural", "facility", "elementary", "boiler", "hvac"
-            ],
-            "Construction (Public Works, Parks, Roadways)": [
-                "roadway", "street", "sidewalk", "park", "playground", "asphalt", "paving", 
-                "infrastructure", "sewer", "water main", "drainage", "bridge", "entrance improvements"
-            ],
-            "Energy and Electrical Services": [
-                "electrical", "electric", "energy", "lighting", "power", "wiring", "generator"
-            ],
-            "Water and Sewer Infrastructure Services and Supplies": [
-                "sewer", "water", "wastewater", "drainage", "pipe", "main", "rehabilitation", 
-                "storm water", "sewage"
-            ],
-            "Vehicle Maintenance and Parts": [
-                "vehicle", "truck", "car", "engine", "parts", "maintenance", "repair", "fleet",
-                "automotive", "heavy rescue", "ladder"
-            ],
-            "IT - Software and Services": [
-                "website", "software", "technology", "it ", "computer", "digital", "drupal", 
-                "hosting", "development", "captioning"
-            ],
-            "Design and Engineering": [
-                "design", "engineering", "architect", "planning", "consultant", "designer services"
-            ],
-            "Custodial Supplies and Services": [
-                "custodial", "cleaning", "janitorial", "supplies", "sanitation"
-            ],
-            "Snow Removal and Salting/Sanding": [
-                "snow", "ice", "salt", "sanding", "winter", "ice melt"
-            ],
-            "Food and Food Services": [
-                "food", "meal", "catering", "kitchen", "dining", "breakfast", "lunch"
-            ],
-            "Transportation Services": [
-                "transportation", "transit", "field trip", "bus", "transport"
-            ],
-            "Inspectional/Environmental Services": [
-                "inspection", "environmental", "pest control", "rodent", "lead paint", "safety"
-            ],
-            "Rentals and Leasing, Equipment": [
-                "rental", "lease", "equipment", "restroom rental", "lift"
-            ],
-            "Financial/Banking Services": [
-                "financial", "banking", "accounting", "billing", "spending account", "fmla"
-            ],
-            "Printing, Marketing/Collateral Materials, Graphic Design": [
-                "printing", "marketing", "graphic", "advertising", "collateral", "promotional"
-            ],
-            "Job-Related Training/Professional Memberships": [
-                "training", "education", "professional", "membership", "development", "in service"
-            ],
-            "Vehicles/Heavy Equipment": [
-                "heavy equipment", "machinery", "excavator", "heavy duty"
-            ],
-            "Community and Recreational Goods and Services": [
-                "community", "recreational", "recreation", "center", "social"
-            ]
-        }
-        
-        # Check each category
-        for industry, keywords in classification_rules.items():
-            for keyword in keywords:
-                if keyword in title_lower or keyword in dept_lower:
-                    return industry
-        
-        # Special handling for DPW department
-        if "dpw" in dept_lower:
-            if any(word in title_lower for word in ["boiler", "hvac", "electrical"]):
-                return "Energy and Electrical Services"
-            elif any(word in title_lower for word in ["sewer", "water"]):
-                return "Water and Sewer Infrastructure Services and Supplies"
-            else:
-                return "Construction (Public Works, Parks, Roadways)"
-        
-        # If no match found, return Other
-        return "Other"
-    
-    # Apply industry classification to records missing it
-    print("🏭 Applying industry classification...")
-    mask = (df_combined['Industry'].isna()) | (df_combined['Industry'] == '') | (df_combined['Industry'] == 'Other')
-    if mask.any():
-        print(f"   Classifying {mask.sum()} contracts...")
-        df_combined.loc[mask, 'Industry'] = df_combined.loc[mask].apply(
-            lambda row: classify_industry(row.get('Title'), row.get('Department')), axis=1
-        )
-        
-        # Show sample classifications
-        newly_classified = df_combined.loc[mask, ['Title', 'Industry']].head(5)
-        for _, row in newly_classified.iterrows():
-            print(f"   📋 '{row['Title'][:50]}...' → {row['Industry']}")
-    else:
-        print("   ✅ All contracts already have industry classifications")
+# With a time budget, bid pages are fetched in priority order until the
+# deadline and skipped bids keep their stored details (see budget.py)
+crawl_budget = None
+if args.budget_minutes:
+    crawl_budget = budget.CrawlBudget(args.budget_minutes)
+    known = {}
+    try:
+        conn = get_db_connection()
+        known = budget.known_rows(conn, scrapers)
+        conn.close()
+    except Exception as e:
+        print(f"⚠️ Could not load stored rows, every bid counts as new: {e}")
+    scrapers = {
+        city: partial(budget.budgeted_records, city, FAN_OUT_SCRAPERS[city], crawl_budget, known.get(city, {}))
+        if city in FAN_OUT_SCRAPERS and not args.listing_only
+        else partial(budget.limited_records, iter_records, crawl_budget)
+        for city, iter_records in scrapers.items()
+    }
+    print(f"⏱️ Crawl budget: {args.budget_minutes:g} minutes")
 
-else:
-    print("❌ No data collected from any scraper.")
-    exit()
+print("🚀 Starting scrapers:", ", ".join(scrapers))
+scraper_report, sink_report = run_pipeline(
+    scrapers, configured_sinks(), checkpoint_for=checkpoint_for, budget=crawl_budget,
+)
 
-print("\n✅ All scrapers completed. Preview of combined data:")
-print(df_combined.head(10))
+print_scraper_report(scraper_report)
+print_sink_report(sink_report)
 
 # ----------------------------
-# Upload to PostgreSQL
+# Merge duplicate listings of the same contract (see dedupe.py)
 # ----------------------------
-# Use DATABASE_URL environment variable for production, fallback to local for development
-database_url = os.getenv('DATABASE_URL')
+if any(entry["sink"] == "postgres" and entry["status"] == "ok" for entry in sink_report):
+    try:
+        conn = get_db_connection()
+        print(f"\n🧹 Deduplication: {dedupe.dedupe_contracts(conn)}")
+        conn.close()
+    except Exception as e:
+        print(f"⚠️ Could not deduplicate contracts: {e}")
 
-if database_url:
-    # Production: Fix Heroku postgres URL for SQLAlchemy
-    if database_url.startswith("postgres://"):
-        database_url = database_url.replace("postgres://", "postgresql://", 1)
-    engine = create_engine(database_url)
-else:
-    # Development: Use local database
-    db_user = "scraper"
-    db_password = "scraperpass"
-    db_host = "localhost"
-    db_port = "5432"
-    db_name = "contracts"
-    db_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    engine = create_engine(db_url)
+# ----------------------------
+# Download new or changed bid documents (see documents.py)
+# ----------------------------
+if args.documents and any(entry["sink"] == "postgres" and entry["status"] == "ok" for entry in sink_report):
+    try:
+        conn = get_db_connection()
+        print(f"\n📎 Bid documents: {documents.sync_documents(conn, scrapers)}")
+        print(f"🔎 Document text: {document_text.index_documents(conn)}")
+        conn.close()
+    except Exception as e:
+        print(f"⚠️ Could not download bid documents: {e}")
 
-df_combined.to_sql("contract_opportunities", engine, if_exists="replace", index=False)
-print("✅ Data uploaded to PostgreSQL")
+# ----------------------------
+# Send subscribers their digests of the new contracts (see digest.py)
+# ----------------------------
+if any(entry["sink"] == "postgres" and entry["status"] == "ok" for entry in sink_report):
+    try:
+        conn = get_db_connection()
+        print(f"\n📬 Digests: {digest.run_digests(conn)}")
+        conn.close()
+    except Exception as e:
+        print(f"⚠️ Could not send digests: {e}")
 
 # ----------------------------
-# Upload to Google Sheets
+# Adapt each city's crawl schedule to whether this crawl found changes
 # ----------------------------
 try:
-    import gspread
-    from gspread_dataframe import set_with_dataframe
-    from oauth2client.service_account import ServiceAccountCredentials
-    
-    # Get Google Sheets credentials from environment variable or file
-    google_creds_json = os.getenv('GOOGLE_SHEETS_CREDENTIALS_JSON')
-    
-    if google_creds_json:
-        # Production: Use credentials from environment variable
-        import tempfile
-        creds_data = json.loads(google_creds_json)
-        
-        # Create temporary file for credentials
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as temp_file:
-            json.dump(creds_data, temp_file)
-            temp_creds_path = temp_file.name
-        
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(temp_creds_path, scope)
-        
-        # Clean up temporary file
-        os.unlink(temp_creds_path)
-    else:
-        # Development: Use local credentials file
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        CREDS_PATH = os.path.join(BASE_DIR, "google_sheets_credentials.json")
-        
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(CREDS_PATH, scope)
-    
-    client = gspread.authorize(creds)
-    spreadsheet = client.open("Contract Opportunities")
-    worksheet = spreadsheet.sheet1
-    worksheet.clear()
-    set_with_dataframe(worksheet, df_combined)
-    print("✅ Data uploaded to Google Sheets")
-    
+    conn = get_db_connection()
+    print("\n🗓️ Crawl schedule:")
+    scheduler.record_crawls(conn, scraper_report)
+    conn.close()
 except Exception as e:
-    print(f"⚠️ Google Sheets upload failed: {e}")
-    print("✅ Data still saved to PostgreSQL database")
+    print(f"⚠️ Could not update the crawl schedule: {e}")
+
+if not any(entry["rows"] for entry in scraper_report):
+    print("❌ No data collected from any scraper.")
+    exit()
+
+print("\n✅ All scrapers completed.")
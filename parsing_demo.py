@@ -0,0 +1,320 @@
+"""
+Check the scrapers' page parsing against the saved pages in fixtures/, and
+time it on large synthetic pages, served from a local stand-in server (no
+access to the city sites needed).
+
+    python parsing_demo.py quincy                      # fixture check + a 3,000-bid listing page
+    python parsing_demo.py quincy --bids 10000
+    python parsing_demo.py quincy --compare            # also time a per-bid scan of the page text
+    python parsing_demo.py boston                      # a bid page padded to ~800 paragraphs
+    python parsing_demo.py boston --baseline <rev>     # also time the scraper as of a git revision
+    python parsing_demo.py worcester --baseline <rev>
+    python parsing_demo.py listings                    # listing pages padded with 3,000 navigation links
+
+Each subcommand points the scraper at the stand-in server, parses the saved
+page and compares the fields it extracted with the expected values saved
+next to it (fixtures/<page>.json, where document links are kept as the page
+writes them and resolved against the URL the page is served at), then times
+the same parsing on a synthetic page padded out to the given size. With --baseline, the scraper
+module is also loaded as it was at that git revision and run over the same
+pages, so its fields and timings can be compared. The demo exits non-zero if
+any field differs.
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from scrapers import boston, fetch, parsing, quincy, worcester
+from scrapers.parsing import parse_html
+
+FIXTURES = Path(__file__).parent / "fixtures"
+NAV_LINK = '<li><a href="/departments/{0}">Department {0}</a></li>\n'
+FILLER = ("<p>Residents can find permits, licenses, trash and recycling schedules, street sweeping "
+          "dates and public meeting calendars here, and sign up for alerts from City Hall.</p>\n")
+
+
+class PageServer(ThreadingHTTPServer):
+    """Local stand-in for a city site, serving fixed pages by path."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), PageHandler)
+        self.pages = {}
+        self.host = f"127.0.0.1:{self.server_port}"
+        # The stand-in answers at once, so there is no need to space requests to it
+        fetch.MIN_INTERVAL = 0.001
+        fetch.HOST_LIMITS[self.host] = (4, fetch.MIN_INTERVAL)
+
+    def url(self, path, content):
+        self.pages[path] = content
+        return f"http://{self.host}{path}"
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        content = self.server.pages.get(self.path)
+        if content is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+def expected_rows(name):
+    return json.loads((FIXTURES / f"{name}.json").read_text())
+
+
+def compare_fields(label, row, wanted, fields=None):
+    """Problems with one parsed row's fields (all of wanted's, or just the given ones)."""
+    return [f"{label}: {field} {row.get(field)!r}, expected {wanted.get(field)!r}"
+            for field in (fields or wanted) if row.get(field) != wanted.get(field)]
+
+
+def compare_rows(rows, expected, key="Source URL"):
+    """Problems with the parsed rows, field by field, against the expected ones."""
+    problems = []
+    found = {row[key]: row for row in rows}
+    for wanted in expected:
+        row = found.pop(wanted[key], None)
+        if row is None:
+            problems.append(f"{wanted[key]}: missing")
+            continue
+        problems += compare_fields(wanted[key], row, wanted)
+    problems += [f"{url}: not expected" for url in found]
+    return problems
+
+
+def report(label, problems):
+    print(f"📄 {label}: {'ok' if not problems else f'{len(problems)} problems'}")
+    for problem in problems[:20]:
+        print(f"   ⚠️ {problem}")
+    return problems
+
+
+def load_baseline(path, revision):
+    """The module at path as it was at a git revision, loaded under a name of its own."""
+    source = subprocess.run(["git", "show", f"{revision}:{path}"], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).parent).stdout
+    module = types.ModuleType(f"baseline_{Path(path).stem}")
+    exec(compile(source, f"{revision}:{path}", "exec"), module.__dict__)
+    return module
+
+
+def time_calls(function, argument, repeat):
+    """Average seconds per call over repeat calls, and the last call's result."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function(argument)
+    return (time.perf_counter() - started) / repeat, result
+
+
+def padded_page(fixture, half):
+    """A saved page with site boilerplate (half of it) added before and after its main content."""
+    page = (FIXTURES / fixture).read_text()
+    page = page.replace("<main", half + "<main", 1).replace("</main>", "</main>" + half, 1)
+    return page.encode()
+
+
+def resolved_documents(expected, page_url):
+    """Expected fields with the document hrefs in "Document_URLs" resolved against the bid page's URL."""
+    documents = [dict(document, url=urljoin(page_url, document["url"]))
+                 for document in json.loads(expected["Document_URLs"])]
+    return dict(expected, Document_URLs=json.dumps(documents))
+
+
+def demo_detail_page(server, args, module, path, fixture):
+    """Check and time a scraper's scrape_individual_bid on a saved bid page and a padded copy of it."""
+    # Served below the site root, so page-relative document links resolve somewhere other than the root
+    url = server.url(f"/bids/{fixture}.html", (FIXTURES / f"{fixture}.html").read_bytes())
+    expected = resolved_documents(json.loads((FIXTURES / f"{fixture}.json").read_text()), url)
+    problems = report(f"{module.__name__} fixture",
+                      compare_fields(fixture, module.scrape_individual_bid(url) or {}, expected))
+
+    page = padded_page(f"{fixture}.html", FILLER * (args.paragraphs // 2))
+    padded_url = server.url(f"/bids/{fixture}_padded.html", page)
+    elapsed, fields = time_calls(module.scrape_individual_bid, padded_url, args.repeat)
+    problems += report(f"{module.__name__} padded page", compare_fields(f"{fixture} (padded)", fields or {}, expected))
+    print(f"\n📊 {module.__name__} bid page padded to {len(page) / 1024:,.0f} KB, {args.repeat} fetches")
+    print(f"   This tree         {elapsed * 1000:7.1f}ms per page")
+
+    if args.baseline:
+        baseline = load_baseline(path, args.baseline)
+        found = baseline.scrape_individual_bid(url) or {}
+        # Fields the baseline doesn't return are listed rather than compared
+        fields = [field for field in expected if field in found]
+        missing = [field for field in expected if field not in found]
+        baseline_problems = compare_fields(f"{fixture} at {args.baseline}", found, expected, fields)
+        baseline_elapsed, _ = time_calls(baseline.scrape_individual_bid, padded_url, args.repeat)
+        print(f"   At {args.baseline:<14} {baseline_elapsed * 1000:7.1f}ms per page "
+              f"(same {len(fields)} fields: {not baseline_problems}"
+              + (f"; not found: {', '.join(missing)})" if missing else ")"))
+    return problems
+
+
+# ----------------------------
+# Quincy: current bids listing
+# ----------------------------
+
+def quincy_page(bids):
+    """A listing page of bids posted as lines of text, as in its "Recently Posted" section."""
+    items = "".join(
+        f'<p><a href="/departments/purchasing/bid_detail_S26-{i:05d}.php">IFB #S26-{i:05d} Supply and services lot {i}</a></p>\n'
+        f"<p>Issued July {i % 28 + 1}, 2025</p>\n<p>Due August {i % 28 + 1}, 2025 11:00 AM</p>\n"
+        for i in range(bids)
+    )
+    return f"<html><body><main><h1>Current Bids</h1>\n{items}</main></body></html>".encode()
+
+
+def scan_context(lines, title):
+    """Every page line scanned for the bid's title, for comparison."""
+    for i, line in enumerate(lines):
+        if title in line:
+            return lines[i:i + 4]
+    return []
+
+
+def demo_quincy(server, args):
+    quincy.MAIN_URL = server.url("/current_bids.php", (FIXTURES / "quincy_current_bids.html").read_bytes())
+    problems = report("Quincy fixture", compare_rows(quincy.fetch_listing_rows(), expected_rows("quincy_current_bids")))
+
+    page = quincy_page(args.bids)
+    quincy.MAIN_URL = server.url("/synthetic_bids.php", page)
+    started = time.perf_counter()
+    rows = quincy.fetch_listing_rows()
+    elapsed = time.perf_counter() - started
+    if len(rows) != args.bids:
+        problems.append(f"synthetic page: {len(rows)} rows, expected {args.bids}")
+
+    soup = parse_html(page)
+    bid_links = soup.find_all("a", href=re.compile(r"bid_detail_.*\.php"))
+    titles = [bid_link.get_text(strip=True) for bid_link in bid_links]
+    started = time.perf_counter()
+    lines, title_lines = quincy.index_page_lines(soup, bid_links)
+    contexts = [quincy.extract_bid_context(lines, title, title_lines) for title in titles]
+    indexed = time.perf_counter() - started
+
+    print(f"\n📊 Quincy listing of {args.bids:,} bids ({len(page) / 1024:,.0f} KB): {len(rows):,} rows")
+    print(f"   Fetch and parse   {elapsed:7.2f}s")
+    print(f"   Bid contexts      {indexed:7.2f}s (indexed lines, looked up by title)")
+
+    if args.compare:
+        started = time.perf_counter()
+        page_lines = [line.strip() for line in soup.get_text().split("\n") if line.strip()]
+        scanned = [scan_context(page_lines, title) for title in titles]
+        elapsed = time.perf_counter() - started
+        print(f"   Per-bid text scan {elapsed:7.2f}s (same contexts: {scanned == contexts})")
+    return problems
+
+
+# ----------------------------
+# Boston: bid detail page
+# ----------------------------
+
+def demo_boston(server, args):
+    return demo_detail_page(server, args, boston, "scrapers/boston.py", "boston_bid_detail")
+
+
+# ----------------------------
+# Worcester: bid detail page
+# ----------------------------
+
+def demo_worcester(server, args):
+    return demo_detail_page(server, args, worcester, "scrapers/worcester.py", "worcester_bid_detail")
+
+
+# ----------------------------
+# Listing pages: html.parser against lxml with the scrapers' regions
+# ----------------------------
+
+# city -> (saved page, region it is parsed with, what the scraper reads from it, how many of those)
+LISTINGS = {
+    "Boston": ("boston_listing.html", parsing.BOSTON_LISTING, "div.views-row a[href], .pager a[href]", 7),
+    "Concord": ("concord_listing.html", parsing.CONCORD_LISTING, "div.listItems div.listItemsRow", 3),
+    "Newton": ("newton_listing.html", parsing.NEWTON_LISTING, "table.listtable tbody tr", 3),
+    "Somerville": ("somerville_listing.html", parsing.SOMERVILLE_LISTING, "table tr, a[href$='.xlsx']", 4),
+    "Worcester": ("worcester_listing.html", parsing.WORCESTER_LISTING, "table tr", 4),
+}
+
+
+def read_elements(soup, selector):
+    return [element.get_text(" ", strip=True) for element in soup.select(selector)]
+
+
+def demo_listings(server, args):
+    problems = []
+    navigation = '<nav><ul class="menu">\n' + "".join(NAV_LINK.format(i) for i in range(args.nav // 2)) + "</ul></nav>\n"
+    timings = []
+    for city, (fixture, region, selector, count) in LISTINGS.items():
+        page_problems = []
+        for label, page in (("saved", (FIXTURES / fixture).read_bytes()), ("padded", padded_page(fixture, navigation))):
+            # Everything the scraper reads must be in the region, just as in the whole page
+            whole = read_elements(BeautifulSoup(page, "html.parser"), selector)
+            in_region = read_elements(parse_html(page, region), selector)
+            if len(whole) != count:
+                page_problems.append(f"{city} ({label}): {len(whole)} elements for {selector!r}, expected {count}")
+            if in_region != whole:
+                page_problems.append(f"{city} ({label}): region holds {len(in_region)} of {len(whole)} elements")
+        problems += report(f"{city} listing", page_problems)
+
+        html_parser, _ = time_calls(lambda markup: BeautifulSoup(markup, "html.parser"), page, args.repeat)
+        lxml_region, _ = time_calls(lambda markup: parse_html(markup, region), page, args.repeat)
+        timings.append((city, len(page), html_parser, lxml_region))
+
+    print(f"\n📊 Listing pages padded with {args.nav:,} navigation links, {args.repeat} parses each")
+    print(f"   {'':<11} {'size':>7} {'html.parser':>12} {'lxml+region':>12}")
+    for city, size, html_parser, lxml_region in timings:
+        print(f"   {city:<11} {size / 1024:6,.0f}K {html_parser * 1000:10.0f}ms {lxml_region * 1000:10.0f}ms")
+    return problems
+
+
+def add_detail_arguments(subparser):
+    subparser.add_argument("--paragraphs", type=int, default=800, help="boilerplate paragraphs added to the page")
+    subparser.add_argument("--repeat", type=int, default=20, help="fetches of the padded page to average over")
+    subparser.add_argument("--baseline", metavar="REVISION", help="also run the scraper as of this git revision")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time the scrapers' page parsing against saved pages.")
+    subcommands = parser.add_subparsers(dest="scraper", required=True)
+    quincy_parser = subcommands.add_parser("quincy", help="Quincy current bids listing")
+    quincy_parser.add_argument("--bids", type=int, default=3000, help="bids on the synthetic listing page")
+    quincy_parser.add_argument("--compare", action="store_true", help="also time a per-bid scan of the page text")
+    add_detail_arguments(subcommands.add_parser("boston", help="Boston bid detail page"))
+    add_detail_arguments(subcommands.add_parser("worcester", help="Worcester bid detail page"))
+    listings_parser = subcommands.add_parser("listings", help="every listing page, html.parser against lxml")
+    listings_parser.add_argument("--nav", type=int, default=3000, help="navigation links added to each page")
+    listings_parser.add_argument("--repeat", type=int, default=5, help="parses of each padded page to average over")
+    args = parser.parse_args()
+
+    server = PageServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    demos = {"quincy": demo_quincy, "boston": demo_boston, "worcester": demo_worcester, "listings": demo_listings}
+    try:
+        problems = demos[args.scraper](server, args)
+    finally:
+        server.shutdown()
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,457 @@
+"""
+Streaming scrape-to-load pipeline.
+
+Every scraper yields bid records as it scrapes them. The scrapers run in their
+own threads and push records into a bounded queue; the pipeline cuts the
+queue into small batches, normalizes and classifies each batch, and hands it
+to the output sinks as soon as it is ready. Memory stays bounded by the queue
+and batch sizes no matter how many cities are crawled, and a fast city's rows
+reach the sinks without waiting for the slowest scraper.
+"""
+
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+
+import dateparser
+import pandas as pd
+
+from scrapers import boston, cambridge_api, concord, newton, quincy, somerville, worcester
+from scrapers.fan_out import FAN_OUT_MODULES, fan_out_scraper
+from sinks import SinkWriter
+
+# City -> generator of that city's bid records
+SCRAPERS = {
+    "Somerville": somerville.iter_records,
+    "Cambridge": cambridge_api.iter_records,
+    "Concord": concord.iter_records,
+    "Newton": newton.iter_records,
+    "Worcester": worcester.iter_records,
+    "Boston": boston.iter_records,
+    "Quincy": quincy.iter_records,
+}
+
+# Cities whose listing rows and bid pages can be fetched separately (see scrapers.fan_out)
+FAN_OUT_SCRAPERS = {city: fan_out_scraper(city) for city in FAN_OUT_MODULES}
+
+# Columns of the contract_opportunities table, in order. Every batch is
+# reindexed to this list and stored as TEXT so batches always line up.
+CONTRACT_COLUMNS = [
+    "Title", "Department", "Industry", "Estimated Value",
+    "Release Date_Raw", "Release Date_Display", "Due Date_Raw", "Due Date_Display",
+    "Instructions", "Bid Deposit", "Addendum", "Comments", "Standard_Forms", "Bid_Forms",
+    "City", "Source Type", "Source URL", "Bid Number", "Document_PDF", "Document_URLs", "Status",
+]
+
+DATE_COLUMNS = ["Release Date", "Due Date"]
+
+# Records per normalized batch, and records buffered between scrapers and the loader
+BATCH_SIZE = int(os.getenv('PIPELINE_BATCH_SIZE', 25))
+QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 100))
+
+# A partial batch is flushed after this many seconds without a new record,
+# so rows from a slow scraper aren't held back waiting for the batch to fill
+FLUSH_SECONDS = 5
+
+# With a crawl budget, scrapers still running this long past the deadline are
+# given up on (their cities keep their previous rows) so the sinks can finish
+BUDGET_GRACE_SECONDS = 30
+
+TITLE_PREFIX_PATTERN = r'^(?:IFB\s*#?\d+-\d+\s+|RFP\s*\d+-\d+\s+|RFS\s*\d+-\d+\s+|Request for Quotes\s*\d{4}-\d+\s+)'
+
+
+def standardize_date_for_display(date_str):
+    """
+    Convert various date formats to standardized display format:
+    - Full datetime: "2025-06-18 3:00 PM" 
+    - Date only: "2025-06-18"
+    - Month-Year: "Nov 2025" (for upcoming planning phase bids)
+    """
+    if not date_str or str(date_str).lower() in ('', 'nan', 'none'):
+        return None
+
+    date_str = str(date_str).strip()
+
+    # Handle Month-Year only (upcoming bids in planning phase)
+    month_year_match = re.match(r'^([A-Za-z]+)\s+(\d{4})$', date_str)
+    if month_year_match:
+        return date_str  # Keep as-is for planning phase display
+
+    # Handle TBD dates (to be determined)
+    if 'TBD' in date_str.upper():
+        # Extract year if present: "TBD/01/2025" -> "2025 TBD"
+        year_match = re.search(r'(\d{4})', date_str)
+        if year_match:
+            return f"{year_match.group(1)} TBD"
+        else:
+            return "TBD"
+
+    # Try parsing with dateparser first (handles most formats)
+    try:
+        parsed = dateparser.parse(date_str)
+        if parsed:
+            # Format for display
+            if parsed.time() != datetime.min.time():  # Has time component
+                return parsed.strftime("%Y-%m-%d %I:%M %p")
+            else:  # Date only
+                return parsed.strftime("%Y-%m-%d")
+    except:
+        pass
+
+    # Fallback patterns for common formats
+    patterns = [
+        # "Wed, 05/28/2025 - 12:00pm" or "06/18/2025 - 3:00pm"
+        (r'(?:\w+,?\s*)?(\d{1,2})/(\d{1,2})/(\d{4})\s*-?\s*(\d{1,2}):(\d{2})\s*(AM|PM|am|pm)', 'datetime'),
+        # "05/28/2025" or "06/18/2025"  
+        (r'(?:\w+,?\s*)?(\d{1,2})/(\d{1,2})/(\d{4})', 'date'),
+    ]
+
+    for pattern, format_type in patterns:
+        match = re.search(pattern, date_str)
+        if match:
+            try:
+                if format_type == 'datetime':
+                    month, day, year, hour, minute, ampm = match.groups()
+                    hour = int(hour)
+                    if ampm.upper() == 'PM' and hour != 12:
+                        hour += 12
+                    elif ampm.upper() == 'AM' and hour == 12:
+                        hour = 0
+                    dt = datetime(int(year), int(month), int(day), hour, int(minute))
+                    return dt.strftime("%Y-%m-%d %I:%M %p")
+                else:  # date only
+                    month, day, year = match.groups()
+                    dt = datetime(int(year), int(month), int(day))
+                    return dt.strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+
+    # If all parsing fails, keep original for manual review
+    print(f"⚠️  Could not parse date: '{date_str}' - keeping original")
+    return date_str
+
+
+def classify_industry(title, department=None):
+    """
+    Classify contract into industry categories based on title and department.
+    Uses existing categories from the database.
+    """
+    if not title:
+        return "Other"
+
+    title_lower = str(title).lower()
+    dept_lower = str(department).lower() if department else ""
+
+    # Industry classification rules based on keywords
+    classification_rules = {
+        "Construction (Buildings)": [
+            "school", "building", "construction", "demolition", "renovation", "roof", 
+            "foundation", "structural", "facility", "elementary", "boiler", "hvac"
+        ],
+        "Construction (Public Works, Parks, Roadways)": [
+            "roadway", "street", "sidewalk", "park", "playground", "asphalt", "paving", 
+            "infrastructure", "sewer", "water main", "drainage", "bridge", "entrance improvements"
+        ],
+        "Energy and Electrical Services": [
+            "electrical", "electric", "energy", "lighting", "power", "wiring", "generator"
+        ],
+        "Water and Sewer Infrastructure Services and Supplies": [
+            "sewer", "water", "wastewater", "drainage", "pipe", "main", "rehabilitation", 
+            "storm water", "sewage"
+        ],
+        "Vehicle Maintenance and Parts": [
+            "vehicle", "truck", "car", "engine", "parts", "maintenance", "repair", "fleet",
+            "automotive", "heavy rescue", "ladder"
+        ],
+        "IT - Software and Services": [
+            "website", "software", "technology", "it ", "computer", "digital", "drupal", 
+            "hosting", "development", "captioning"
+        ],
+        "Design and Engineering": [
+            "design", "engineering", "architect", "planning", "consultant", "designer services"
+        ],
+        "Custodial Supplies and Services": [
+            "custodial", "cleaning", "janitorial", "supplies", "sanitation"
+        ],
+        "Snow Removal and Salting/Sanding": [
+            "snow", "ice", "salt", "sanding", "winter", "ice melt"
+        ],
+        "Food and Food Services": [
+            "food", "meal", "catering", "kitchen", "dining", "breakfast", "lunch"
+        ],
+        "Transportation Services": [
+            "transportation", "transit", "field trip", "bus", "transport"
+        ],
+        "Inspectional/Environmental Services": [
+            "inspection", "environmental", "pest control", "rodent", "lead paint", "safety"
+        ],
+        "Rentals and Leasing, Equipment": [
+            "rental", "lease", "equipment", "restroom rental", "lift"
+        ],
+        "Financial/Banking Services": [
+            "financial", "banking", "accounting", "billing", "spending account", "fmla"
+        ],
+        "Printing, Marketing/Collateral Materials, Graphic Design": [
+            "printing", "marketing", "graphic", "advertising", "collateral", "promotional"
+        ],
+        "Job-Related Training/Professional Memberships": [
+            "training", "education", "professional", "membership", "development", "in service"
+        ],
+        "Vehicles/Heavy Equipment": [
+            "heavy equipment", "machinery", "excavator", "heavy duty"
+        ],
+        "Community and Recreational Goods and Services": [
+            "community", "recreational", "recreation", "center", "social"
+        ]
+    }
+
+    # Check each category
+    for industry, keywords in classification_rules.items():
+        for keyword in keywords:
+            if keyword in title_lower or keyword in dept_lower:
+                return industry
+
+    # Special handling for DPW department
+    if "dpw" in dept_lower:
+        if any(word in title_lower for word in ["boiler", "hvac", "electrical"]):
+            return "Energy and Electrical Services"
+        elif any(word in title_lower for word in ["sewer", "water"]):
+            return "Water and Sewer Infrastructure Services and Supplies"
+        else:
+            return "Construction (Public Works, Parks, Roadways)"
+
+    # If no match found, return Other
+    return "Other"
+
+
+def text_value(value):
+    """Cell value as stored in the database: None for missing values, text otherwise"""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+def normalize_batch(records):
+    """
+    Normalize a batch of scraped records into a DataFrame with CONTRACT_COLUMNS:
+    bucket Status, clean Title prefixes, split each date column into _Raw and
+    _Display copies, and classify the industry of records missing one.
+    """
+    df = pd.DataFrame(records, dtype=object)
+
+    # --- Normalize and bucket Status column ---
+    # Fold lowercase 'status' into 'Status'. A mixed batch can carry both (e.g.
+    # Cambridge records cached by an older version), and renaming would leave
+    # two 'Status' columns
+    if 'status' in df.columns:
+        if 'Status' in df.columns:
+            df['Status'] = df['status'].where(df['status'].notna(), df['Status'])
+            df.drop(columns='status', inplace=True)
+        else:
+            df.rename(columns={'status': 'Status'}, inplace=True)
+    # Standardize casing and bucket into Open, Upcoming, Closed
+    if 'Status' in df.columns:
+        df['Status'] = df['Status'].astype(str).str.strip().str.lower().str.capitalize()
+        df['Status'] = df['Status'].apply(
+            lambda x: 'Open' if x == 'Open' else 'Upcoming' if x == 'Upcoming' else 'Closed'
+        )
+
+    # --- Clean up Title prefixes ---
+    if 'Title' in df.columns:
+        df['Title'] = (
+            df['Title']
+            .astype(str)
+            .str.replace(TITLE_PREFIX_PATTERN, '', regex=True)
+            .str.strip()
+            .str.title()
+        )
+
+    # --- Standardize date fields for display ---
+    for col in DATE_COLUMNS:
+        values = df[col] if col in df.columns else pd.Series([None] * len(df), dtype=object)
+        df[col + '_Raw'] = values
+        df[col + '_Display'] = values.apply(standardize_date_for_display)
+
+    # --- Industry Classification ---
+    if 'Industry' not in df.columns:
+        df['Industry'] = None
+    mask = (df['Industry'].isna()) | (df['Industry'] == '') | (df['Industry'] == 'Other')
+    if mask.any():
+        df.loc[mask, 'Industry'] = df.loc[mask].apply(
+            lambda row: classify_industry(row.get('Title'), row.get('Department')), axis=1
+        )
+
+    # Built column by column so missing values stay None (Series.map turns them into NaN)
+    df = df.reindex(columns=CONTRACT_COLUMNS)
+    return pd.DataFrame({col: [text_value(value) for value in df[col]] for col in CONTRACT_COLUMNS},
+                        index=df.index, dtype=object)
+
+
+def update_fingerprints(fingerprints, df):
+    """
+    Fold a normalized batch into per-city content fingerprints. A city's
+    fingerprint is the sum of its rows' SHA-1 digests, so it doesn't depend on
+    row order or batching. Status is left out because it moves with the clock,
+    not with the listing.
+    """
+    columns = [col for col in df.columns if col != "Status"]
+    for city, row in zip(df["City"], df[columns].itertuples(index=False, name=None)):
+        digest = hashlib.sha1("\x1f".join("" if value is None else value for value in row).encode()).digest()
+        fingerprints[city] = (fingerprints.get(city, 0) + int.from_bytes(digest, "big")) % (1 << 160)
+
+
+class BudgetExpired(Exception):
+    """Raised by a scraper that ran out of crawl budget before finishing (see budget.py)"""
+
+
+def run_scraper(city, iter_records, records, report, checkpoint=None):
+    """Push one city's records onto the shared queue, then a (None, city) end marker"""
+    started = time.monotonic()
+    count = 0
+    status, detail = "ok", None
+    try:
+        for record in iter_records(checkpoint=checkpoint):
+            records.put((city, record))
+            count += 1
+    except BudgetExpired as e:
+        status, detail = "timeout", str(e)
+    except Exception as e:
+        status, detail = "failed", str(e)
+    # A scraper given up on at the budget deadline already has its entry
+    report.setdefault(city, {
+        "city": city, "status": status, "rows": count,
+        "seconds": round(time.monotonic() - started, 2), "detail": detail,
+    })
+    records.put((None, city))
+
+
+def run_pipeline(scrapers, sinks, batch_size=BATCH_SIZE, checkpoint_for=None, budget=None):
+    """
+    Run the scrapers concurrently and stream their normalized records to the sinks.
+    scrapers maps city -> iter_records. Only cities that scrape cleanly with at
+    least one row have their stored rows replaced (see sinks.refreshed_cities).
+    Returns (scraper_report, sink_report); each scraper entry carries its city's
+    content fingerprint (see update_fingerprints).
+    checkpoint_for(city) supplies each scraper's checkpoint (see checkpoints.py);
+    a city's checkpoint is cleared once it scraped cleanly and the sinks of
+    record (Postgres; every sink if none of them is) succeeded.
+    With a budget (see budget.CrawlBudget), scrapers still running
+    BUDGET_GRACE_SECONDS after its deadline are reported as timed out and left behind.
+    """
+    records = queue.Queue(maxsize=QUEUE_SIZE)
+    scraper_report = {}
+    writers = [SinkWriter(sink) for sink in sinks]
+    for writer in writers:
+        writer.start()
+
+    checkpoints = {city: checkpoint_for(city) for city in scrapers} if checkpoint_for else {}
+    for city, iter_records in scrapers.items():
+        threading.Thread(
+            target=run_scraper, args=(city, iter_records, records, scraper_report, checkpoints.get(city)),
+            name=f"scraper-{city}", daemon=True,
+        ).start()
+
+    batch = []
+    batches = 0
+    fingerprints = {}
+
+    def flush():
+        nonlocal batch, batches
+        if not batch:
+            return
+        df = normalize_batch(batch)
+        update_fingerprints(fingerprints, df)
+        batches += 1
+        cities = ", ".join(sorted(set(df["City"].dropna())))
+        print(f"   📦 Batch {batches}: {len(df)} records ({cities})")
+        for writer in writers:
+            writer.submit(df)
+        batch = []
+
+    started = time.monotonic()
+    received = dict.fromkeys(scrapers, 0)
+    running = set(scrapers)
+    while running:
+        if budget is not None and budget.remaining() < -BUDGET_GRACE_SECONDS:
+            for city in sorted(running):
+                print(f"⏱️ {city} still running past the crawl budget - giving up on it")
+                scraper_report.setdefault(city, {
+                    "city": city, "status": "timeout", "rows": received[city],
+                    "seconds": round(time.monotonic() - started, 2), "detail": "crawl budget ran out",
+                })
+            break
+        try:
+            city, record = records.get(timeout=FLUSH_SECONDS)
+        except queue.Empty:
+            flush()
+            continue
+        if city is None:
+            # A finished city's last records go out right away
+            running.discard(record)
+            flush()
+            finished = scraper_report[record]
+            icon = "🔍" if finished["status"] == "ok" else "⚠️"
+            print(f"{icon} {record} rows scraped: {finished['rows']}"
+                  + (f" (scraper {finished['status']}: {finished['detail']})" if finished["detail"] else ""))
+            continue
+        received[city] += 1
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    scraper_report = [scraper_report[city] for city in scrapers]
+    for entry in scraper_report:
+        entry["fingerprint"] = format(fingerprints.get(entry["city"], 0), "x")
+    sink_report = [writer.close(scraper_report) for writer in writers]
+
+    # Keep the checkpoints of anything that didn't land in the system of record,
+    # so a rerun can resume it. A mirror failing (e.g. Sheets) doesn't keep them:
+    # the next run re-exports from a fresh crawl either way.
+    of_record = [entry for writer, entry in zip(writers, sink_report) if writer.sink.of_record] or sink_report
+    if all(entry["status"] == "ok" for entry in of_record):
+        for entry in scraper_report:
+            if entry["status"] == "ok" and entry["city"] in checkpoints:
+                checkpoints[entry["city"]].clear()
+    return scraper_report, sink_report
+
+
+def select_scrapers(cities):
+    """
+    SCRAPERS limited to a comma-separated list of city names (case-insensitive).
+    Raises ValueError for unknown cities.
+    """
+    if not cities:
+        return dict(SCRAPERS)
+    by_name = {city.lower(): city for city in SCRAPERS}
+    selected = {}
+    for name in cities.split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in by_name:
+            raise ValueError(f"unknown city '{name}' (choose from {', '.join(SCRAPERS)})")
+        selected[by_name[name]] = SCRAPERS[by_name[name]]
+    return selected
+
+
+def print_scraper_report(report):
+    """Print the scraper section of the run report."""
+    print("\n📊 Scrapers:")
+    for entry in report:
+        refreshed = entry["status"] == "ok" and entry["rows"]
+        icon = "✅" if refreshed else "⚠️"
+        note = entry["detail"] or ""
+        if not refreshed:
+            note = f"{note} - previous rows kept".lstrip(" -")
+        print(f"   {icon} {entry['city']:<10} {entry['status']:<8} {entry['rows']:>5} rows "
+              f"{entry['seconds']:>8.2f}s  {note}")
@@ -0,0 +1,123 @@
+"""
+Run the streaming pipeline over a mixed-city batch, with stand-in scrapers
+that yield records shaped like each city's scraper (no network or database
+needed).
+
+    python pipeline_demo.py
+    python pipeline_demo.py --records 200 --batch-size 50
+
+Cambridge records come from cambridge_api.procurement_record itself, plus one
+shaped like those cached by older versions (capitalised "Status"); the other
+cities yield lowercase "status" like their scrapers. The demo normalizes the
+whole mix as one batch, then streams it through run_pipeline into a sink that
+keeps the batches, and checks every batch came out with a single Status column
+bucketed into Open, Upcoming and Closed.
+"""
+
+import argparse
+import sys
+import time
+from functools import partial
+
+import pipeline
+from scrapers import cambridge_api
+from sinks import Sink
+
+CITIES = ["Boston", "Concord", "Newton", "Quincy", "Somerville", "Worcester"]
+STATUSES = ["open", "Open", "upcoming", "closed", "awarded"]
+EXPECTED = {"open": "Open", "upcoming": "Upcoming"}
+
+
+class KeepBatches(Sink):
+    """Sink that keeps every batch it is given."""
+
+    name = "memory"
+
+    def start(self):
+        self.batches = []
+
+    def write_batch(self, df):
+        self.batches.append(df)
+
+    def finish(self, scraper_report=None):
+        return f"{sum(len(df) for df in self.batches)} rows in {len(self.batches)} batches"
+
+
+def cambridge_records(count):
+    records = [cambridge_api.procurement_record({
+        "title": f"Cambridge procurement {i}", "department": "Public Works",
+        "closing_date": "2026-11-20T14:00:00Z", "public_url": f"/portal/cambridgema/projects/{i}",
+        "status": STATUSES[i % len(STATUSES)],
+    }) for i in range(count)]
+    # As stored in the scraper state before the key was lowercased
+    records.append({
+        "Title": "Cambridge cached procurement", "City": "Cambridge", "Status": "Open",
+        "Source URL": "https://procurement.opengov.com/portal/cambridgema/projects/cached",
+    })
+    return records
+
+
+def city_records(city, count):
+    return [{
+        "Title": f"IFB #26-{i} {city} road paving", "Department": "DPW", "City": city,
+        "Due Date": "11/20/2026 - 2:00pm", "Source URL": f"https://example.com/{city.lower()}/{i}",
+        "status": STATUSES[i % len(STATUSES)],
+    } for i in range(count)]
+
+
+def stand_in(records, checkpoint=None):
+    """Yield records at a scraper-like pace, so the cities' records interleave in the batches."""
+    for record in records:
+        time.sleep(0.002)
+        yield record
+
+
+def expected_status(record):
+    status = str(record.get("status") or record.get("Status")).lower()
+    return EXPECTED.get(status, "Closed")
+
+
+def check(df, records):
+    """Problems with one normalized batch of the given records."""
+    problems = []
+    if list(df.columns).count("Status") != 1 or "status" in df.columns:
+        problems.append(f"status columns {[c for c in df.columns if c.lower() == 'status']}")
+        return problems
+    wanted = {r["Source URL"]: expected_status(r) for r in records}
+    for url, status in zip(df["Source URL"], df["Status"]):
+        if status != wanted[url]:
+            problems.append(f"{url}: Status {status}, expected {wanted[url]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pipeline over a mixed-city batch of stand-in records.")
+    parser.add_argument("--records", type=int, default=10, help="records per city")
+    parser.add_argument("--batch-size", type=int, default=pipeline.BATCH_SIZE)
+    args = parser.parse_args()
+
+    by_city = {"Cambridge": cambridge_records(args.records)}
+    by_city.update({city: city_records(city, args.records) for city in CITIES})
+    everything = [record for records in by_city.values() for record in records]
+
+    problems = check(pipeline.normalize_batch(everything), everything)
+    print(f"📦 One batch of {len(everything)} records from {len(by_city)} cities: "
+          f"{'ok' if not problems else f'{len(problems)} problems'}")
+
+    sink = KeepBatches()
+    scrapers = {city: partial(stand_in, records) for city, records in by_city.items()}
+    scraper_report, sink_report = pipeline.run_pipeline(scrapers, [sink], batch_size=args.batch_size)
+    pipeline.print_scraper_report(scraper_report)
+    for df in sink.batches:
+        problems += check(df, everything)
+    failed = [entry for entry in scraper_report + sink_report if entry["status"] != "ok"]
+    print(f"\n📊 {len(sink.batches)} streamed batches: "
+          f"{'ok' if not problems and not failed else f'{len(problems)} problems, {len(failed)} failed steps'}")
+    for problem in problems[:20]:
+        print(f"   ⚠️ {problem}")
+    if problems or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,8 +15,10 @@ source venv/bin/activate
 # Set Python path to avoid import issues
 export PYTHONPATH="/Users/rongolan/Desktop/contract_scraper:$PYTHONPATH"
 
-# Run the orchestrator with full output logged
-python orchestrator.py >> cron.log 2>&1
+# Run the orchestrator with full output logged. Cron can fire this often
+# (e.g. hourly): --due-only crawls just the cities whose adaptive schedule
+# says they are due (see scheduler.py)
+python orchestrator.py --due-only >> cron.log 2>&1
 
 # Log completion
 echo "cron completed at $(date)" >> cron.log
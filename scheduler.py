@@ -0,0 +1,144 @@
+"""
+Adaptive per-city crawl scheduling.
+
+city_crawl_schedule keeps, for each city, how often its crawls have turned
+up new or changed contracts and when it should next be crawled. After every
+crawl the interval adapts: a crawl that found changes halves the interval, a
+crawl that found nothing new grows it by half, always within
+SCHEDULE_MIN_HOURS..SCHEDULE_MAX_HOURS. A city with an open bid coming due is
+also re-crawled DUE_REFRESH_LEAD_HOURS before that due date (addenda and
+extensions tend to land then), even if its interval says it could wait.
+
+Change detection compares the content fingerprint the pipeline computes for
+each city (see pipeline.update_fingerprints) with the previous crawl's.
+"""
+
+import os
+
+from sinks import refreshed_cities
+
+MIN_INTERVAL_HOURS = float(os.getenv('SCHEDULE_MIN_HOURS', 6))
+MAX_INTERVAL_HOURS = float(os.getenv('SCHEDULE_MAX_HOURS', 168))
+INITIAL_INTERVAL_HOURS = 24.0
+
+# Interval multipliers after a crawl with and without changes
+CHANGED_FACTOR = 0.5
+UNCHANGED_FACTOR = 1.5
+
+# Re-crawl a city this long before its soonest open due date
+DUE_REFRESH_LEAD_HOURS = float(os.getenv('DUE_REFRESH_LEAD_HOURS', 24))
+
+SCHEDULE_DDL = """
+    CREATE TABLE IF NOT EXISTS city_crawl_schedule (
+        city TEXT PRIMARY KEY,
+        interval_hours REAL NOT NULL,
+        next_crawl_at TIMESTAMPTZ NOT NULL,
+        last_crawl_at TIMESTAMPTZ,
+        last_changed_at TIMESTAMPTZ,
+        fingerprint TEXT,
+        crawls INTEGER NOT NULL DEFAULT 0,
+        changed_crawls INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+
+def ensure_table(conn):
+    """Create city_crawl_schedule if it doesn't exist yet."""
+    with conn.cursor() as cur:
+        cur.execute(SCHEDULE_DDL)
+    conn.commit()
+
+
+def due_cities(conn, cities):
+    """The cities (in the given order) that have never been crawled or whose next crawl time has passed."""
+    ensure_table(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT city FROM city_crawl_schedule WHERE next_crawl_at > now()")
+        not_due = {row["city"] for row in cur.fetchall()}
+    return [city for city in cities if city not in not_due]
+
+
+def next_interval(interval_hours, changed):
+    """Adapt a city's crawl interval to whether its last crawl found changes."""
+    factor = CHANGED_FACTOR if changed else UNCHANGED_FACTOR
+    return min(max(interval_hours * factor, MIN_INTERVAL_HOURS), MAX_INTERVAL_HOURS)
+
+
+def soonest_due_dates(conn):
+    """City -> earliest due date of its open contracts that is still in the future."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('contract_opportunities') IS NOT NULL AS present")
+        if not cur.fetchone()["present"]:
+            return {}
+        cur.execute(
+            r"""
+            SELECT "City" AS city, min(to_timestamp(left("Due Date_Display", 10), 'YYYY-MM-DD')) AS due_at
+            FROM contract_opportunities
+            WHERE "Status" = 'Open' AND "Due Date_Display" ~ '^\d{4}-\d{2}-\d{2}'
+              AND to_timestamp(left("Due Date_Display", 10), 'YYYY-MM-DD') > now()
+            GROUP BY "City"
+            """
+        )
+        return {row["city"]: row["due_at"] for row in cur.fetchall()}
+
+
+def record_crawls(conn, scraper_report):
+    """
+    Update each crawled city's schedule from a run's scraper report. Cities that
+    crawled cleanly adapt their interval; a failed or empty crawl is retried
+    after the minimum interval without changing the interval.
+    """
+    ensure_table(conn)
+    refreshed = set(refreshed_cities(scraper_report))
+    due_dates = soonest_due_dates(conn)
+    with conn.cursor() as cur:
+        for entry in scraper_report:
+            city = entry["city"]
+            cur.execute("SELECT interval_hours, fingerprint FROM city_crawl_schedule WHERE city = %s", (city,))
+            current = cur.fetchone()
+            interval = current["interval_hours"] if current else INITIAL_INTERVAL_HOURS
+
+            if city not in refreshed:
+                cur.execute(
+                    """
+                    INSERT INTO city_crawl_schedule (city, interval_hours, next_crawl_at)
+                    VALUES (%s, %s, now() + make_interval(secs => %s))
+                    ON CONFLICT (city) DO UPDATE SET next_crawl_at = EXCLUDED.next_crawl_at
+                    """,
+                    (city, interval, MIN_INTERVAL_HOURS * 3600),
+                )
+                continue
+
+            changed = current is None or current["fingerprint"] != entry.get("fingerprint")
+            interval = next_interval(interval, changed)
+            # Pull the next crawl forward to just before the soonest open due date
+            cur.execute(
+                """
+                SELECT GREATEST(
+                    LEAST(now() + make_interval(secs => %s),
+                          COALESCE(%s::timestamptz - make_interval(secs => %s), 'infinity')),
+                    now() + make_interval(secs => %s)
+                ) AS next_crawl_at
+                """,
+                (interval * 3600, due_dates.get(city), DUE_REFRESH_LEAD_HOURS * 3600, MIN_INTERVAL_HOURS * 3600),
+            )
+            next_crawl_at = cur.fetchone()["next_crawl_at"]
+            cur.execute(
+                """
+                INSERT INTO city_crawl_schedule
+                    (city, interval_hours, next_crawl_at, last_crawl_at, last_changed_at, fingerprint, crawls, changed_crawls)
+                VALUES (%s, %s, %s, now(), CASE WHEN %s THEN now() END, %s, 1, %s)
+                ON CONFLICT (city) DO UPDATE SET
+                    interval_hours = EXCLUDED.interval_hours,
+                    next_crawl_at = EXCLUDED.next_crawl_at,
+                    last_crawl_at = EXCLUDED.last_crawl_at,
+                    last_changed_at = COALESCE(EXCLUDED.last_changed_at, city_crawl_schedule.last_changed_at),
+                    fingerprint = EXCLUDED.fingerprint,
+                    crawls = city_crawl_schedule.crawls + 1,
+                    changed_crawls = city_crawl_schedule.changed_crawls + EXCLUDED.changed_crawls
+                """,
+                (city, interval, next_crawl_at, changed, entry.get("fingerprint"), int(changed)),
+            )
+            print(f"   🗓️ {city}: {'changed' if changed else 'unchanged'} - interval {interval:.0f}h, "
+                  f"next crawl {next_crawl_at:%Y-%m-%d %H:%M}")
+    conn.commit()
@@ -1,9 +1,23 @@
 import requests
-from bs4 import BeautifulSoup
+from scrapers import fetch
+from scrapers.parsing import document_links, parse_html, BOSTON_LISTING
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import re
-import time
+
+BASE_URL = "https://www.boston.gov"
+MAIN_URL = f"{BASE_URL}/bid-listings"
+
+# Listing pages fetched at once (the host throttle in scrapers.fetch still applies)
+LISTING_WORKERS = 2
+
+COLUMNS = [
+    "Title", "Department", "Industry", "Estimated Value", "Release Date",
+    "Due Date", "Instructions", "Bid Deposit", "Addendum", "Comments",
+    "Standard_Forms", "Bid_Forms", "City", "Source Type", "Source URL", 
+    "Bid Number", "status"
+]
 
 def scrape():
     """
@@ -12,175 +26,298 @@ def scrape():
     2. Scrape each individual bid page for detailed information
     Returns DataFrame with comprehensive bid data
     """
-    base_url = "https://www.boston.gov"
-    main_url = f"{base_url}/bid-listings"
+    rows = list(iter_records())
+    if not rows:
+        print("⚠️ No bid data found in Boston listings")
+        return pd.DataFrame()
     
-    print("🔍 Scraping Boston main bid listings...")
+    df = pd.DataFrame(rows, columns=COLUMNS)
     
+    print(f"✅ Boston enhanced scraping complete: {len(df)} bids with detailed data")
+    return df
+
+def iter_records(checkpoint=None):
+    """
+    Yield each Boston bid (listing row merged with its detail page) as soon as it is scraped.
+    Later listing pages download in the background while earlier pages' bids are
+    being scraped. With a checkpoint (see checkpoints.py), listing pages and bid
+    pages saved by an interrupted run are restored instead of fetched again.
+    A listing page after the first that can't be fetched raises, so the city
+    fails and keeps its stored rows.
+    """
+    seen_urls = set()
+    for page_label, page_rows in iter_listing_pages(checkpoint):
+        yield from scrape_page_bids(page_rows, page_label, seen_urls, checkpoint)
+
+def listing_rows(checkpoint=None):
+    """
+    Step 1 on its own: the basic rows of every listing page, without duplicates
+    """
     rows = []
-    page = 1
+    seen_urls = set()
+    for _, page_rows in iter_listing_pages(checkpoint):
+        for row_data in page_rows:
+            if row_data["Source URL"] not in seen_urls:
+                seen_urls.add(row_data["Source URL"])
+                rows.append(row_data)
+    return rows
+
+def iter_listing_pages(checkpoint=None):
+    """
+    Yield (page label, rows) for every listing page in order.
+    Page 1 is fetched first to find the last page from the pager; the remaining
+    pages are then downloaded concurrently, ahead of the caller.
+    """
+    print("🔍 Scraping Boston main bid listings...")
     
-    while True:
-        # Build page URL (first page has no ?page= parameter)
-        if page == 1:
-            page_url = main_url
+    first_page = checkpoint.remembered("listing", "first") if checkpoint else None
+    if first_page is None:
+        print("   📄 Scraping first listing page...")
+        soup = fetch_listing_page(MAIN_URL)
+        if soup is None:
+            return
+        first_page = {"rows": parse_listing_page(soup, MAIN_URL), "last_page": find_last_page(soup)}
+        if checkpoint:
+            checkpoint.remember("listing", "first", first_page)
+    
+    first_page_rows = first_page["rows"]
+    
+    with ThreadPoolExecutor(max_workers=LISTING_WORKERS) as executor:
+        last_page = first_page["last_page"]
+        if last_page is not None:
+            print(f"   🔍 Pager reports {last_page} as the last page")
+            pending = iter_pages_known(executor, last_page, checkpoint)
+        elif first_page_rows:
+            print("   🔍 No last-page link found - probing ahead for more pages")
+            pending = iter_pages_probed(executor, checkpoint)
         else:
-            page_url = f"{main_url}?page={page}"
+            pending = iter([])
         
-        print(f"   📄 Scraping page {page}...")
-        
-        # Step 1: Scrape current page of bid listings
+        yield "first page", first_page_rows
+        for page, page_rows in pending:
+            yield f"?page={page}", page_rows
+
+def iter_pages_known(executor, last_page, checkpoint=None):
+    """
+    Submit every listing page after page 1 up to last_page right away, returning
+    an iterator of (page, rows) in page order
+    """
+    # Drupal pagers count from ?page=0, so ?page=1 is normally the second page;
+    # if it turns out to repeat the first page, its bids are dropped by URL in scrape_page_bids
+    futures = [(page, executor.submit(checkpointed_listing_rows, page, checkpoint))
+               for page in range(1, last_page + 1)]
+    return completed_pages(futures)
+
+def completed_pages(futures):
+    """
+    Yield (page, rows) for submitted listing pages in order, skipping empty ones.
+    A page that failed to fetch raises, and the pages not started yet are dropped.
+    """
+    for index, (page, future) in enumerate(futures):
         try:
-            response = requests.get(page_url, timeout=10)
-            response.raise_for_status()
-        except requests.RequestException as e:
-            print(f"❌ Error fetching Boston page {page}: {e}")
-            break
-        
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        # Find bid containers using the correct structure from page source
-        # Each bid is in a div.views-row container
-        bid_containers = soup.find_all("div", class_="views-row")
-        
-        # Filter to only containers that actually contain bid links (not empty rows)
-        actual_bid_containers = []
-        for container in bid_containers:
-            # Check if this container has a bid link (href contains /bid-listings/)
-            bid_link = container.find("a", href=True)
-            if bid_link and "/bid-listings/" in bid_link.get("href", ""):
-                actual_bid_containers.append(container)
+            page_rows = future.result()
+        except Exception:
+            for _, other in futures[index + 1:]:
+                other.cancel()
+            raise
+        if page_rows:
+            yield page, page_rows
+
+def iter_pages_probed(executor, checkpoint=None):
+    """
+    Fetch listing pages after page 1 a window at a time until one comes back empty,
+    returning an iterator of (page, rows) in page order. The first window is submitted right away.
+    """
+    window = submit_window(executor, 1, checkpoint)
+    return probed_pages(executor, window, checkpoint)
+
+def submit_window(executor, page, checkpoint):
+    """
+    Submit LISTING_WORKERS listing pages starting at page
+    """
+    return [(p, executor.submit(checkpointed_listing_rows, p, checkpoint))
+            for p in range(page, page + LISTING_WORKERS)]
+
+def probed_pages(executor, window, checkpoint):
+    """
+    Yield (page, rows) from successive windows until a page comes back empty.
+    A page that failed to fetch raises instead of ending the pagination.
+    """
+    while True:
+        for p, future in window:
+            try:
+                page_rows = future.result()
+            except Exception:
+                for _, other in window:
+                    other.cancel()
+                raise
+            if not page_rows:
+                print(f"   ✅ No more bids found on ?page={p} - pagination complete")
+                for _, other in window:
+                    other.cancel()
+                return
+            yield p, page_rows
+        window = submit_window(executor, window[-1][0] + 1, checkpoint)
+
+def fetch_listing_page(page_url):
+    """
+    Fetch and parse one listing page. Returns the soup or None on failure.
+    """
+    try:
+        response = fetch.get(page_url, timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"❌ Error fetching Boston page {page_url}: {e}")
+        return None
+    return parse_html(response.content, BOSTON_LISTING)
+
+def fetch_listing_rows(page):
+    """
+    Fetch one listing page (?page=N) and return its basic bid rows.
+    Raises if the page can't be fetched: a missing page isn't an empty one, and
+    the city must fail (keeping its stored rows) rather than archive the page's bids.
+    """
+    page_url = f"{MAIN_URL}?page={page}"
+    print(f"   📄 Fetching listing page ?page={page}...")
+    soup = fetch_listing_page(page_url)
+    if soup is None:
+        raise RuntimeError(f"could not fetch the Boston listing page {page_url}")
+    return parse_listing_page(soup, page_url)
+
+def checkpointed_listing_rows(page, checkpoint):
+    """
+    fetch_listing_rows, restoring the page from the checkpoint if an earlier run already read it
+    """
+    if checkpoint is None:
+        return fetch_listing_rows(page)
+    saved = checkpoint.remembered("listing", page)
+    if saved is not None:
+        return saved["rows"]
+    rows = fetch_listing_rows(page)
+    if rows:
+        checkpoint.remember("listing", page, {"rows": rows})
+    return rows
+
+def find_last_page(soup):
+    """
+    Read the last page number from the pager's "last page" link, or None if there isn't one
+    """
+    last_page = None
+    for link in soup.find_all("a", href=True):
+        page_match = re.search(r"[?&]page=(\d+)", link["href"])
+        if not page_match:
+            continue
+        title = link.get("title", "").lower()
+        text = link.get_text(strip=True).lower()
+        if "last page" in title or text.startswith("last"):
+            last_page = max(last_page or 0, int(page_match.group(1)))
+    return last_page
+
+def parse_listing_page(soup, page_url):
+    """
+    Parse the bid rows (basic info and individual bid URLs) from a listing page
+    """
+    # Find bid containers using the correct structure from page source
+    # Each bid is in a div.views-row container
+    bid_containers = soup.find_all("div", class_="views-row")
+    
+    rows = []
+    for container in bid_containers:
+        # Only containers that actually contain a bid link (href contains /bid-listings/)
+        title_link = container.find("a", href=True)
+        if not title_link or "/bid-listings/" not in title_link.get("href", ""):
+            continue
+            
+        title = title_link.get_text(strip=True)
+        individual_bid_url = title_link.get("href")
         
-        if not actual_bid_containers:
-            # Debug: show what we actually found
-            print(f"   🔍 Debug: Found {len(bid_containers)} views-row containers, but 0 actual bid containers")
-            if page == 1:
-                print("   🔍 Debug: Sample containers found:")
-                for container in bid_containers[:3]:
-                    link = container.find("a", href=True)
-                    link_info = f"{link.get_text()[:30]} -> {link.get('href')}" if link else "No link"
-                    print(f"      - Container: {link_info}")
-            print(f"   ✅ No more bids found on page {page} - pagination complete")
-            break
+        # Make URL absolute
+        if individual_bid_url and individual_bid_url.startswith("/"):
+            individual_bid_url = BASE_URL + individual_bid_url
         
-        bid_containers = actual_bid_containers
+        # Extract other basic info from listing
+        date_info = container.find("div", class_="txt")
+        posted_date = None
+        due_date = None
         
-        print(f"   📋 Found {len(bid_containers)} bids on page {page}")
-        page_rows = []
-    
-        # Process each bid from current page
-        for i, container in enumerate(bid_containers, 1):
-            # Extract basic info from listing
-            title_link = container.find("a")
-            if not title_link:
-                continue
-                
-            title = title_link.get_text(strip=True)
-            individual_bid_url = title_link.get("href")
-            
-            # Make URL absolute
-            if individual_bid_url and individual_bid_url.startswith("/"):
-                individual_bid_url = base_url + individual_bid_url
-            
-            # Extract other basic info from listing
-            date_info = container.find("div", class_="txt")
-            posted_date = None
-            due_date = None
-            
-            if date_info:
-                date_text = date_info.get_text()
-                # Look for "Posted" and "Due" dates
-                posted_match = re.search(r"Posted:\s*([^|]+)", date_text)
-                due_match = re.search(r"Due:\s*([^|]+)", date_text)
-                
-                if posted_match:
-                    posted_date = standardize_date(posted_match.group(1).strip())
-                if due_match:
-                    due_date = standardize_date(due_match.group(1).strip())
-            
-            # Extract department if shown
-            department = extract_department_from_listing(container)
+        if date_info:
+            date_text = date_info.get_text()
+            # Look for "Posted" and "Due" dates
+            posted_match = re.search(r"Posted:\s*([^|]+)", date_text)
+            due_match = re.search(r"Due:\s*([^|]+)", date_text)
             
-            # Start with basic data from listing
-            row_data = {
-                "Title": title,
-                "Department": department,
-                "Industry": None,
-                "Estimated Value": None,
-                "Release Date": posted_date,
-                "Due Date": due_date,
-                "Instructions": None,
-                "Bid Deposit": None,
-                "Addendum": None,
-                "Comments": None,
-                "Standard_Forms": None,
-                "Bid_Forms": None,
-                "City": "Boston",
-                "Source Type": "Open Bids",
-                "Source URL": individual_bid_url or page_url,
-                "Bid Number": extract_bid_number(title),
-                "status": determine_status(due_date)
-            }
-            
-            # Step 2: Scrape individual bid page for detailed info
-            if individual_bid_url:
-                bid_number = f"Page {page}, Bid {i}"
-                print(f"      📄 Scraping individual bid {bid_number}: {title[:30]}...")
-                enhanced_data = scrape_individual_bid(individual_bid_url)
-                if enhanced_data:
-                    # Update row_data with enhanced information
-                    row_data.update(enhanced_data)
-                
-                # Rate limiting: delay between requests
-                time.sleep(1.5)  # 1.5 second delay to be respectful
-            
-            page_rows.append(row_data)
-        
-        # Add page rows to main rows list
-        rows.extend(page_rows)
+            if posted_match:
+                posted_date = standardize_date(posted_match.group(1).strip())
+            if due_match:
+                due_date = standardize_date(due_match.group(1).strip())
         
-        # Check if there are more pages by looking for pagination links
-        # Boston uses links with ?page=X in href and titles like "Go to page X" or "Go to next page"
-        all_page_links = soup.find_all("a", href=True)
-        has_next_page = False
+        # Extract department if shown
+        department = extract_department_from_listing(container)
         
-        for link in all_page_links:
-            href = link.get("href", "")
-            title = link.get("title", "")
-            text = link.get_text()
-            
-            # Look for next page links in various formats
-            if (("?page=" in href) and 
-                (f"page={page}" in href or 
-                 "next page" in title.lower() or 
-                 "››" in text or
-                 f"page {page + 1}" in title.lower())):
-                has_next_page = True
-                print(f"   🔍 Found next page link: {title} -> {href}")
-                break
+        rows.append({
+            "Title": title,
+            "Department": department,
+            "Industry": None,
+            "Estimated Value": None,
+            "Release Date": posted_date,
+            "Due Date": due_date,
+            "Instructions": None,
+            "Bid Deposit": None,
+            "Addendum": None,
+            "Comments": None,
+            "Standard_Forms": None,
+            "Bid_Forms": None,
+            "City": "Boston",
+            "Source Type": "Open Bids",
+            "Source URL": individual_bid_url or page_url,
+            "Bid Number": extract_bid_number(title),
+            "status": determine_status(due_date)
+        })
+    
+    return rows
+
+def scrape_page_bids(page_rows, page_label, seen_urls, checkpoint=None):
+    """
+    Scrape the individual bid page for each listing row on a page, yielding each
+    row as it is enriched and skipping bids already seen
+    """
+    print(f"   📋 Found {len(page_rows)} bids on {page_label}")
+    for i, row_data in enumerate(page_rows, 1):
+        individual_bid_url = row_data["Source URL"]
+        if individual_bid_url in seen_urls:
+            continue
+        seen_urls.add(individual_bid_url)
         
-        if not has_next_page:
-            print(f"   ✅ No next page found - pagination complete")
-            break
-            
-        page += 1
+        # Scrape individual bid page for detailed info
+        if has_detail_page(row_data):
+            print(f"      📄 Scraping individual bid {page_label}, Bid {i}: {row_data['Title'][:30]}...")
+            enrich_row(row_data, checkpoint)
         
-        # Rate limiting between pages
-        time.sleep(2)
-    
-    if not rows:
-        print("⚠️ No bid data found in Boston listings")
-        return pd.DataFrame()
-    
-    df = pd.DataFrame(rows, columns=[
-        "Title", "Department", "Industry", "Estimated Value", "Release Date",
-        "Due Date", "Instructions", "Bid Deposit", "Addendum", "Comments",
-        "Standard_Forms", "Bid_Forms", "City", "Source Type", "Source URL", 
-        "Bid Number", "status"
-    ])
-    
-    print(f"✅ Boston enhanced scraping complete: {len(df)} bids with detailed data")
-    return df
+        yield row_data
+
+def has_detail_page(row_data):
+    """
+    Whether a listing row links to an individual bid page
+    """
+    return "/bid-listings/" in row_data["Source URL"]
+
+def enrich_row(row_data, checkpoint=None):
+    """
+    Merge the bid page's enhanced fields into a listing row, restored from the
+    checkpoint if an earlier run already parsed the page.
+    Returns True if the page's fields were merged, False if the listing data is kept as-is.
+    """
+    bid_url = row_data["Source URL"]
+    enhanced_data = checkpoint.remembered("detail", bid_url) if checkpoint else None
+    if enhanced_data is None:
+        enhanced_data = scrape_individual_bid(bid_url)
+        if enhanced_data is not None and checkpoint:
+            checkpoint.remember("detail", bid_url, enhanced_data)
+    if enhanced_data:
+        # Update row_data with enhanced information
+        row_data.update(enhanced_data)
+        return True
+    return False
 
 def scrape_individual_bid(bid_url):
     """
@@ -188,59 +325,71 @@ def scrape_individual_bid(bid_url):
     Returns dict with enhanced bid data or None if scraping fails
     """
     try:
-        response = requests.get(bid_url, timeout=10)
+        response = fetch.get(bid_url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        enhanced_data = {}
-        content_text = soup.get_text()
-        
-        # Extract Industry using Boston-specific Type + UNSPSC + content analysis
-        industry = extract_boston_industry(soup, content_text)
-        if industry:
-            enhanced_data["Industry"] = industry
-        
-        # Extract Estimated Value - Boston specific patterns
-        estimated_value = extract_boston_estimated_value(content_text)
-        if estimated_value:
-            enhanced_data["Estimated Value"] = estimated_value
-        
-        # Extract Release Date - look for "RFQ Available", "Posted", etc.
-        release_date = extract_boston_release_date(content_text)
-        if release_date:
-            enhanced_data["Release Date"] = release_date
-        
-        # Extract Due Date - look for "SOQ Submission Deadline", "Due", etc.
-        due_date = extract_boston_due_date(content_text)
-        if due_date:
-            enhanced_data["Due Date"] = due_date
-        
-        # Extract Comments - project description + location
-        comments = extract_boston_comments(soup, content_text)
-        if comments:
-            enhanced_data["Comments"] = comments[:500]  # Limit length
-        
-        # Extract Instructions - Boston submission requirements
-        instructions = extract_boston_instructions(content_text)
-        if instructions:
-            enhanced_data["Instructions"] = instructions[:300]
-        
-        # Extract Standard Forms - Boston specific requirements
-        standard_forms = extract_boston_standard_forms(content_text)
-        if standard_forms:
-            enhanced_data["Standard_Forms"] = standard_forms
-        
-        # Extract Bid-Specific Forms/Documents
-        bid_forms = extract_boston_bid_forms(soup)
-        if bid_forms:
-            enhanced_data["Bid_Forms"] = bid_forms
-        
-        return enhanced_data
+        soup = parse_html(response.content)
+        return parse_bid_page(soup, bid_url)
         
     except Exception as e:
         print(f"   ⚠️ Failed to scrape individual bid page {bid_url}: {e}")
         return None  # Return None so we keep basic listing data
 
+def parse_bid_page(soup, page_url):
+    """
+    Extract the enhanced fields from a parsed Boston bid page.
+    The page is scanned once (see scan_bid_page) and every field is read from that scan.
+    page_url is the page's address, which its document links are resolved against.
+    """
+    page = scan_bid_page(soup)
+    enhanced_data = {}
+    
+    # Extract Industry using Boston-specific UNSPSC + content analysis
+    industry = extract_boston_industry(page)
+    if industry:
+        enhanced_data["Industry"] = industry
+    
+    # Extract Estimated Value - Boston specific patterns
+    estimated_value = extract_boston_estimated_value(page)
+    if estimated_value:
+        enhanced_data["Estimated Value"] = estimated_value
+    
+    # Extract Release Date - look for "RFQ Available", "Posted", etc.
+    release_date = extract_boston_release_date(page)
+    if release_date:
+        enhanced_data["Release Date"] = release_date
+    
+    # Extract Due Date - look for "SOQ Submission Deadline", "Due", etc.
+    due_date = extract_boston_due_date(page)
+    if due_date:
+        enhanced_data["Due Date"] = due_date
+    
+    # Extract Comments - project description + location
+    comments = extract_boston_comments(page)
+    if comments:
+        enhanced_data["Comments"] = comments[:500]  # Limit length
+    
+    # Extract Instructions - Boston submission requirements
+    instructions = extract_boston_instructions(page)
+    if instructions:
+        enhanced_data["Instructions"] = instructions[:300]
+    
+    # Extract Standard Forms - Boston specific requirements
+    standard_forms = extract_boston_standard_forms(page)
+    if standard_forms:
+        enhanced_data["Standard_Forms"] = standard_forms
+    
+    # Extract Bid-Specific Forms/Documents
+    bid_forms = extract_boston_bid_forms(page)
+    if bid_forms:
+        enhanced_data["Bid_Forms"] = bid_forms
+    
+    # Links to the documents themselves, downloaded by documents.py
+    documents = document_links(boston_bid_documents(page), page_url)
+    if documents:
+        enhanced_data["Document_URLs"] = documents
+    
+    return enhanced_data
+
 def extract_department_from_listing(container):
     """
     Extract department from bid listing container
@@ -279,19 +428,126 @@ def extract_bid_number(title):
     
     return None
 
-def extract_boston_industry(soup, content_text):
+# All Boston detail-page labels in one pattern, matched against the lowercased
+# page text (much faster than re.IGNORECASE). Only the label's first word is
+# consumed; the rest is captured in a lookahead so labels inside another
+# label's value (e.g. "Closes ..." on a "Location: ..." line) are still found.
+BOSTON_LABEL_SOURCE = (
+    r"(?P<construction_cost>estimated)(?= construction cost[:\s]*\$?(?P<construction_cost_value>[\d,]+))"
+    r"|(?P<unspsc>unspsc)(?=[:\s]*(?P<unspsc_value>\d+))"
+    r"|(?P<budget>budget)(?=[:\s]*\$?(?P<budget_value>[\d,]+))"
+    r"|(?P<value>value)(?=[:\s]*\$?(?P<value_value>[\d,]+))"
+    r"|(?P<amount>amount)(?=[:\s]*\$?(?P<amount_value>[\d,]+))"
+    r"|(?P<rfq_available>rfq)(?= available[:\s]*(?P<rfq_available_value>[a-z]+ \d{1,2}, \d{4}))"
+    r"|(?P<posted>posted)(?=[:\s]*(?P<posted_value>\d{1,2}/\d{1,2}/\d{4}))"
+    r"|(?P<closes>closes)(?=[:\s]*(?P<closes_value>\d{1,2}/\d{1,2}/\d{4})(?:\s*-\s*(?P<closes_time>\d{1,2}:\d{2}\s*[ap]m))?)"
+    r"|(?P<soq_deadline>soq)(?= submission deadline[:\s]*(?P<soq_deadline_value>[a-z]+ \d{1,2}, \d{4}))"
+    r"|(?P<deadline>deadline)(?=[:\s]*(?P<deadline_value>\d{1,2}/\d{1,2}/\d{4}))"
+    r"|(?P<due>due)(?=[:\s]*(?P<due_value>\d{1,2}/\d{1,2}/\d{4}))"
+    r"|(?P<location>location)(?=[:\s]*(?P<location_value>[^\n]+))"
+    r"|(?P<submission>submission)(?=[:\s]*(?P<submission_value>[^\n.]+))"
+    r"|(?P<usb>usb)(?=(?P<usb_value> flash drives[^\n.]+))"
+    r"|(?P<sealed>sealed)(?=(?P<sealed_value> package[^\n.]+))"
+    r"|(?P<pdf_format>pdf)(?=(?P<pdf_format_value> format[^\n.]+))"
+)
+BOSTON_LABEL_PATTERN = re.compile(BOSTON_LABEL_SOURCE)
+# Used when lowercasing changes the text length, so offsets wouldn't line up
+BOSTON_LABEL_PATTERN_IGNORECASE = re.compile(BOSTON_LABEL_SOURCE, re.IGNORECASE)
+# Just the label words. Named groups stop the regex engine from skipping ahead
+# on the first character, so the page is scanned with this plain alternation
+# and BOSTON_LABEL_PATTERN is only tried where a label word starts.
+BOSTON_LABEL_WORDS = re.compile(
+    "|".join(re.findall(r"\(\?P<\w+>([a-z]+)\)", BOSTON_LABEL_SOURCE))
+)
+
+# Map every group name (including the _value/_time captures, which close last)
+# back to its label
+BOSTON_LABEL_BY_GROUP = {
+    group: re.sub(r"_(value|time)$", "", group)
+    for group in BOSTON_LABEL_PATTERN.groupindex
+}
+
+# Labels that can appear several times and are collected in order
+BOSTON_REPEATED_LABELS = ("submission", "usb", "sealed", "pdf_format")
+
+# Boston-specific requirements reported as standard forms
+BOSTON_REQUIREMENTS = [
+    "Prevailing Wages Apply",
+    "DCAMM Certification",
+    "MWBE",
+    "CORI",
+    "EPP"
+]
+
+def scan_bid_page(soup):
     """
-    Extract industry classification using Boston-specific Type + UNSPSC + content analysis
+    Walk a Boston bid page once.
+    Returns a dict with:
+    - labels: first value found for each label in BOSTON_LABEL_PATTERN
+      (plus "closes_with_time" for the first Closes date that has a time)
+    - repeated: every value for the labels in BOSTON_REPEATED_LABELS, in page order
+    - paragraphs / links: <p> texts and (href, text) pairs, collected in one traversal
+    - content_text / content_lower: the page text
+    """
+    content_text = soup.get_text()
+    content_lower = content_text.lower()
+    if len(content_lower) == len(content_text):
+        matches = (
+            BOSTON_LABEL_PATTERN.match(content_lower, hit.start())
+            for hit in BOSTON_LABEL_WORDS.finditer(content_lower)
+        )
+    else:
+        matches = BOSTON_LABEL_PATTERN_IGNORECASE.finditer(content_text)
+    labels = {}
+    repeated = {label: [] for label in BOSTON_REPEATED_LABELS}
+    repeated_end = {label: -1 for label in BOSTON_REPEATED_LABELS}
+    
+    # Values are always read from content_text so they keep their original case
+    for match in matches:
+        if not match:
+            continue
+        label = BOSTON_LABEL_BY_GROUP[match.lastgroup]
+        if label in repeated:
+            # Keep re.findall semantics: matches of one label don't overlap.
+            # Submission reports its value, the others the whole phrase.
+            value_end = match.end(f"{label}_value")
+            if match.start() >= repeated_end[label]:
+                if label == "submission":
+                    repeated[label].append(content_text[match.start("submission_value"):value_end])
+                else:
+                    repeated[label].append(content_text[match.start():value_end])
+                repeated_end[label] = value_end
+            continue
+        
+        value = content_text[match.start(f"{label}_value"):match.end(f"{label}_value")]
+        if label == "closes" and match.group("closes_time") and "closes_with_time" not in labels:
+            time_part = content_text[match.start("closes_time"):match.end("closes_time")]
+            labels["closes_with_time"] = (value, time_part)
+        labels.setdefault(label, value)
+    
+    paragraphs = []
+    links = []
+    for element in soup.find_all(["p", "a"]):
+        if element.name == "p":
+            paragraphs.append(element.get_text(strip=True))
+        elif element.has_attr("href"):
+            links.append((element["href"], element.get_text(strip=True)))
+    
+    return {
+        "labels": labels,
+        "repeated": repeated,
+        "paragraphs": paragraphs,
+        "links": links,
+        "content_text": content_text,
+        "content_lower": content_lower
+    }
+
+def extract_boston_industry(page):
+    """
+    Extract industry classification using Boston-specific UNSPSC + content analysis
     """
-    # Extract Type field (Paper, Electronic, etc.)
-    type_match = re.search(r"Type:\s*(\w+)", content_text, re.IGNORECASE)
-    bid_type = type_match.group(1) if type_match else None
-    
-    # Extract UNSPSC code
-    unspsc_match = re.search(r"UNSPSC[:\s]*(\d+)", content_text, re.IGNORECASE)
-    unspsc_code = unspsc_match.group(1) if unspsc_match else None
-    
     # Map UNSPSC codes to industries (basic mapping for now)
+    unspsc_code = page["labels"].get("unspsc")
     if unspsc_code:
         unspsc_prefix = unspsc_code[:2] if len(unspsc_code) >= 2 else ""
         if unspsc_prefix == "72":  # Construction and building
@@ -302,7 +558,7 @@ def extract_boston_industry(soup, content_text):
             return "IT - Software and Services"
     
     # Fallback to content analysis
-    content_lower = content_text.lower()
+    content_lower = page["content_lower"]
     if any(word in content_lower for word in ["construction", "building", "community center", "renovation"]):
         return "Construction (Buildings)"
     elif any(word in content_lower for word in ["fiscal agent", "financial", "professional services"]):
@@ -316,164 +572,117 @@ def extract_boston_industry(soup, content_text):
     
     return "Other"
 
-def extract_boston_estimated_value(content_text):
+def extract_boston_estimated_value(page):
     """
     Extract estimated value using Boston-specific patterns
     """
-    # Look for "Estimated Construction Cost: $50,000,000"
-    construction_cost_match = re.search(r"Estimated Construction Cost[:\s]*\$?([\d,]+)", content_text, re.IGNORECASE)
-    if construction_cost_match:
-        return f"${construction_cost_match.group(1)}"
-    
-    # Look for other budget patterns
-    budget_patterns = [
-        r"Budget[:\s]*\$?([\d,]+)",
-        r"Value[:\s]*\$?([\d,]+)",
-        r"Amount[:\s]*\$?([\d,]+)"
-    ]
-    
-    for pattern in budget_patterns:
-        match = re.search(pattern, content_text, re.IGNORECASE)
-        if match:
-            return f"${match.group(1)}"
+    labels = page["labels"]
+    # "Estimated Construction Cost: $50,000,000" first, then other budget patterns
+    for label in ["construction_cost", "budget", "value", "amount"]:
+        if label in labels:
+            return f"${labels[label]}"
     
     return None
 
-def extract_boston_release_date(content_text):
+def extract_boston_release_date(page):
     """
     Extract release date using Boston-specific patterns
     """
-    # Look for "RFQ Available: July 7, 2025"
-    rfq_match = re.search(r"RFQ Available[:\s]*([A-Za-z]+ \d{1,2}, \d{4})", content_text, re.IGNORECASE)
-    if rfq_match:
-        return standardize_date(rfq_match.group(1))
-    
-    # Look for "Posted: 07/07/2025"
-    posted_match = re.search(r"Posted[:\s]*(\d{1,2}/\d{1,2}/\d{4})", content_text, re.IGNORECASE)
-    if posted_match:
-        return standardize_date(posted_match.group(1))
+    labels = page["labels"]
+    # "RFQ Available: July 7, 2025", then "Posted: 07/07/2025"
+    for label in ["rfq_available", "posted"]:
+        if label in labels:
+            return standardize_date(labels[label])
     
     return None
 
-def extract_boston_due_date(content_text):
+def extract_boston_due_date(page):
     """
     Extract due date using Boston-specific patterns
     """
-    # Look for "Closes MM/DD/YYYY - HH:MM AM/PM" (most common Boston format)
-    closes_match = re.search(r"Closes[:\s]*(\d{1,2}/\d{1,2}/\d{4})\s*-\s*(\d{1,2}:\d{2}\s*[AP]M)", content_text, re.IGNORECASE)
-    if closes_match:
-        date_part = closes_match.group(1)
-        time_part = closes_match.group(2)
+    labels = page["labels"]
+    # "Closes MM/DD/YYYY - HH:MM AM/PM" (most common Boston format)
+    if "closes_with_time" in labels:
+        date_part, time_part = labels["closes_with_time"]
         return standardize_date_with_time(f"{date_part} {time_part}")
     
-    # Look for "Closes MM/DD/YYYY" (date only)
-    closes_date_match = re.search(r"Closes[:\s]*(\d{1,2}/\d{1,2}/\d{4})", content_text, re.IGNORECASE)
-    if closes_date_match:
-        return standardize_date(closes_date_match.group(1))
-    
-    # Look for "SOQ Submission Deadline: July 22, 2025"
-    soq_match = re.search(r"SOQ Submission Deadline[:\s]*([A-Za-z]+ \d{1,2}, \d{4})", content_text, re.IGNORECASE)
-    if soq_match:
-        return standardize_date(soq_match.group(1))
-    
-    # Look for "Deadline: MM/DD/YYYY"
-    deadline_match = re.search(r"Deadline[:\s]*(\d{1,2}/\d{1,2}/\d{4})", content_text, re.IGNORECASE)
-    if deadline_match:
-        return standardize_date(deadline_match.group(1))
-    
-    # Look for "Due: MM/DD/YYYY"
-    due_match = re.search(r"Due[:\s]*(\d{1,2}/\d{1,2}/\d{4})", content_text, re.IGNORECASE)
-    if due_match:
-        return standardize_date(due_match.group(1))
+    # "Closes MM/DD/YYYY", "SOQ Submission Deadline: July 22, 2025",
+    # "Deadline: MM/DD/YYYY", "Due: MM/DD/YYYY"
+    for label in ["closes", "soq_deadline", "deadline", "due"]:
+        if label in labels:
+            return standardize_date(labels[label])
     
     return None
 
-def extract_boston_comments(soup, content_text):
+def extract_boston_comments(page):
     """
     Extract project description and location for comments
     """
     comments_parts = []
     
-    # Look for location information
-    location_match = re.search(r"Location[:\s]*([^\n]+)", content_text, re.IGNORECASE)
-    if location_match:
-        comments_parts.append(f"Location: {location_match.group(1).strip()}")
+    # Location information
+    location = page["labels"].get("location")
+    if location:
+        comments_parts.append(f"Location: {location.strip()}")
     
-    # Look for project description/narrative paragraphs
-    paragraphs = soup.find_all("p")
-    for p in paragraphs:
-        text = p.get_text(strip=True)
+    # Project description/narrative paragraphs
+    for text in page["paragraphs"]:
         if len(text) > 100 and any(word in text.lower() for word in ["project", "services", "scope", "background"]):
             comments_parts.append(text)
             break  # Take first substantial description
     
     return " | ".join(comments_parts) if comments_parts else None
 
-def extract_boston_instructions(content_text):
+def extract_boston_instructions(page):
     """
     Extract submission instructions and requirements
     """
     instructions_parts = []
     
-    # Look for submission requirements
-    submission_patterns = [
-        r"Submission[:\s]*([^\n.]+)",
-        r"USB flash drives[^\n.]+",
-        r"Sealed package[^\n.]+",
-        r"PDF format[^\n.]+"
-    ]
-    
-    for pattern in submission_patterns:
-        matches = re.findall(pattern, content_text, re.IGNORECASE)
-        for match in matches:
+    for label in BOSTON_REPEATED_LABELS:
+        for match in page["repeated"][label]:
             if len(match.strip()) > 10:
                 instructions_parts.append(match.strip())
     
     return " | ".join(instructions_parts[:3]) if instructions_parts else None
 
-def extract_boston_standard_forms(content_text):
+def extract_boston_standard_forms(page):
     """
     Extract Boston-specific standard forms and requirements
     """
     standard_forms = []
     
-    # Boston-specific requirements
-    boston_requirements = [
-        "Prevailing Wages Apply",
-        "DCAMM Certification",
-        "MWBE",
-        "CORI",
-        "EPP"
-    ]
-    
-    for requirement in boston_requirements:
-        if requirement.lower() in content_text.lower():
+    for requirement in BOSTON_REQUIREMENTS:
+        if requirement.lower() in page["content_lower"]:
             standard_forms.append(requirement)
     
     # Add UNSPSC code if present
-    unspsc_match = re.search(r"UNSPSC[:\s]*(\d+)", content_text, re.IGNORECASE)
-    if unspsc_match:
-        standard_forms.append(f"UNSPSC: {unspsc_match.group(1)}")
+    unspsc_code = page["labels"].get("unspsc")
+    if unspsc_code:
+        standard_forms.append(f"UNSPSC: {unspsc_code}")
     
     return ", ".join(standard_forms) if standard_forms else None
 
-def extract_boston_bid_forms(soup):
+def extract_boston_bid_forms(page):
     """
     Extract bid-specific forms and documents from links
     """
-    bid_forms = []
-    links = soup.find_all("a", href=True)
+    bid_forms = [link_text for _, link_text in boston_bid_documents(page)]
+    return ", ".join(bid_forms[:5]) if bid_forms else None
+
+def boston_bid_documents(page):
+    """
+    (href, link text) of every bid-specific form or document link
+    """
+    documents = []
     
-    for link in links:
-        href = link["href"]
-        link_text = link.get_text(strip=True)
-        
+    for href, link_text in page["links"]:
         # Look for document links
         if any(ext in href.lower() for ext in [".pdf", ".doc", ".xls", ".docx"]):
             if any(word in link_text.lower() for word in ["form", "spec", "drawing", "addendum", "attachment", "document"]):
-                bid_forms.append(link_text)
+                documents.append((href, link_text))
     
-    return ", ".join(bid_forms[:5]) if bid_forms else None
+    return documents
 
 def standardize_date(date_str):
     """
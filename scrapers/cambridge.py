@@ -49,7 +49,7 @@ def scrape():
                 "City": "Cambridge",
                 "Source Type": "Open Bids",
                 "Source URL": full_url,
-                "Status": "Open"
+                "status": "open"
             })
 
         df = pd.DataFrame(rows)
@@ -1,54 +1,146 @@
-import requests
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
 import pandas as pd
 
+from scrapers import fetch
+from scrapers.state import load_state, save_state
+
 # ----------------------------
 # Scraper for City of Cambridge via OpenGov
 # ----------------------------
+# The procurements API is paged. The first page says how many pages there
+# are, and the rest are requested concurrently (spaced by fetch's per-host
+# throttle). Each run only asks for procurements updated since the last
+# successful sync and merges them into the Cambridge set kept in the scraper
+# state, so the full set is still yielded every run. A full sync is done on
+# the first run and every FULL_SYNC_DAYS to drop anything removed upstream.
+# CAMBRIDGE_API_URL points the scraper at another server (e.g. a local
+# stand-in serving recorded JSON).
 
-def scrape():
-    api_url = "https://procurement.opengov.com/api/procurements?portal_slug=cambridgema&sort_by=closing_date&status=open"
-    
-    headers = {
+API_URL = os.environ.get("CAMBRIDGE_API_URL", "https://procurement.opengov.com/api/procurements")
+PORTAL_SLUG = "cambridgema"
+PAGE_SIZE = 50
+PAGE_WORKERS = 4
+FULL_SYNC_DAYS = 7
+
+# The cursor is moved back by this much so edits made while a sync runs aren't missed
+SYNC_OVERLAP = timedelta(minutes=5)
+
+STATE_NAME = "cambridge_api"
+
+HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36",
     "Accept": "application/json, text/plain, */*",
-    "Referer": "https://procurement.opengov.com/portal/cambridgema"
+    "Referer": f"https://procurement.opengov.com/portal/{PORTAL_SLUG}",
 }
-    response = requests.get(api_url, headers=headers)
 
-    if not response.ok or not response.text.strip():
-        print(f"❌ Error fetching data from OpenGov. Status: {response.status_code}, Body: {response.text[:200]}")
-        return pd.DataFrame()
+def scrape():
+    df = pd.DataFrame(list(iter_records()))
+    print("✅ Cambridge data scraped:")
+    print(df.head())
+    return df
+
+def iter_records(checkpoint=None):
+    """
+    Yield every open Cambridge procurement after syncing the changes since the last run.
+    The sync itself is the checkpoint here: the merged set is saved only once every page has been read.
+    """
+    state = load_state(STATE_NAME) or {}
+    synced_at = state.get("synced_at")
+    records = state.get("records") or {}
+    started = datetime.now(timezone.utc)
 
+    full_sync = not synced_at or started - datetime.fromisoformat(synced_at) > timedelta(days=FULL_SYNC_DAYS)
+    if full_sync:
+        print("🔍 Cambridge: full sync of open procurements")
+        records = {}
+        params = {"status": "open"}
+    else:
+        print(f"🔍 Cambridge: syncing procurements updated since {synced_at}")
+        params = {"updated_since": synced_at}
+
+    changed = fetch_procurements(params)
+    for item in changed:
+        attributes = item.get("attributes", {})
+        if str(attributes.get("status") or "open").lower() == "open":
+            records[str(item.get("id"))] = procurement_record(attributes)
+        else:
+            records.pop(str(item.get("id")), None)
+    print(f"   📋 {len(changed)} procurements {'listed' if full_sync else 'changed'}, {len(records)} open")
+
+    save_state(STATE_NAME, {"synced_at": (started - SYNC_OVERLAP).isoformat(), "records": records})
+    yield from records.values()
+
+def fetch_procurements(params):
+    """
+    Every procurement matching params, across all pages. Raises on a failed page,
+    so a partial sync never moves the cursor.
+    """
+    first = fetch_page(params, 1)
+    items = list(first.get("data", []))
+    page_count = count_pages(first)
+    if page_count is not None:
+        with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+            for page in executor.map(lambda number: fetch_page(params, number), range(2, page_count + 1)):
+                items.extend(page.get("data", []))
+        return items
+
+    # No page count in the response: follow the next links one at a time
+    page = first
+    number = 1
+    while page.get("links", {}).get("next") and page.get("data"):
+        number += 1
+        page = fetch_page(params, number)
+        items.extend(page.get("data", []))
+    return items
+
+def fetch_page(params, number):
+    """
+    One page of the procurements API as parsed JSON
+    """
+    query = {"portal_slug": PORTAL_SLUG, "sort_by": "closing_date", "page": number, "limit": PAGE_SIZE, **params}
+    response = fetch.get(API_URL, params=query, headers=HEADERS, timeout=20)
+    if not response.ok or not response.text.strip():
+        raise RuntimeError(f"OpenGov page {number} failed. Status: {response.status_code}, Body: {response.text[:200]}")
     try:
-        data = response.json()
+        return response.json()
     except ValueError as e:
-        print(f"❌ Failed to parse JSON: {e}")
-        return pd.DataFrame()
+        raise RuntimeError(f"OpenGov page {number} is not JSON: {e}")
 
-    rows = []
-    for item in data.get("data", []):
-        attributes = item.get("attributes", {})
+def count_pages(page):
+    """
+    Number of pages from the response's meta (a page count, or a total with the page size), or None
+    """
+    meta = page.get("meta") or {}
+    for key in ("total_pages", "page_count", "pageCount"):
+        if meta.get(key) is not None:
+            return int(meta[key])
+    for key in ("total", "count", "total_count"):
+        if meta.get(key) is not None:
+            return max(-(-int(meta[key]) // PAGE_SIZE), 1)
+    return None
 
-        rows.append({
-            "Title": attributes.get("title"),
-            "Department": attributes.get("department"),
-            "Industry": None,
-            "Estimated Value": None,
-            "Release Date": None,
-            "Due Date": attributes.get("closing_date"),
-            "Instructions": None,
-            "Bid Deposit": None,
-            "Addendum": None,
-            "City": "Cambridge",
-            "Source Type": "Open Bids",
-            "Source URL": f"https://procurement.opengov.com{attributes.get('public_url', '')}",
-            "Status": attributes.get("status", "Open").capitalize()
-        })
-
-    df = pd.DataFrame(rows)
-    print("✅ Cambridge data scraped:")
-    print(df.head())
-    return df
+def procurement_record(attributes):
+    """
+    Bid record for one procurement's attributes
+    """
+    return {
+        "Title": attributes.get("title"),
+        "Department": attributes.get("department"),
+        "Industry": None,
+        "Estimated Value": None,
+        "Release Date": None,
+        "Due Date": attributes.get("closing_date"),
+        "Instructions": None,
+        "Bid Deposit": None,
+        "Addendum": None,
+        "City": "Cambridge",
+        "Source Type": "Open Bids",
+        "Source URL": f"https://procurement.opengov.com{attributes.get('public_url', '')}",
+        "status": (attributes.get("status") or "open").lower()
+    }
 
 # If running this module directly, test the output
 if __name__ == "__main__":
@@ -1,20 +1,32 @@
-import requests
-from bs4 import BeautifulSoup
+from scrapers import fetch
+from scrapers.parsing import parse_html, CONCORD_LISTING
 import pandas as pd
 from datetime import datetime
 import re
 
+COLUMNS = [
+    "Title", "Department", "Industry", "Estimated Value", "Release Date",
+    "Due Date", "Instructions", "Bid Deposit", "Addendum",
+    "City", "Source Type", "Source URL", "status"
+]
+
 def scrape():
+    return pd.DataFrame(list(iter_records()), columns=COLUMNS)
+
+def iter_records(checkpoint=None):
+    """
+    Yield each Concord bid (listing row plus detail page fields) as soon as it is scraped.
+    With a checkpoint (see checkpoints.py), detail pages read by an interrupted run are restored.
+    """
     url = "https://concordma.gov/bids.aspx"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
+    response = fetch.get(url)
+    soup = parse_html(response.content, CONCORD_LISTING)
     print(soup.prettify()[:2000])  # Print the first 2000 characters
 
     container = soup.find("div", class_="listItems")
     if not container:
         raise ValueError("Could not find the bid listings container.")
 
-    rows = []
     bid_rows = container.find_all("div", class_="listItemsRow")
     for row in bid_rows:
         title_div = row.find("div", class_="bidTitle")
@@ -31,72 +43,19 @@ def scrape():
         status = spans[2].get_text(strip=True) if len(spans) > 2 else "Unknown"
         closing_date = spans[3].get_text(strip=True) if len(spans) > 3 else "Unknown"
 
-        # Fetch detail page to get additional info
+        # Fetch detail page to get additional info (restored from the
+        # checkpoint if an interrupted run already read it)
         release_date = None
-        # Initialize estimated value
         estimated_value = None
-        
         if detail_url:
-            try:
-                detail_response = requests.get(detail_url)
-                detail_soup = BeautifulSoup(detail_response.text, "html.parser")
-                all_trs = detail_soup.find_all("tr")
-                
-                # Look for both Publication Date and Estimated Value
-                for idx, tr in enumerate(all_trs):
-                    label_span = tr.find("span", class_="BidListHeader")
-                    if label_span:
-                        label_text = label_span.get_text(strip=True)
-                        
-                        # Look for Publication Date/Time
-                        if "Publication Date/Time" in label_text:
-                            if idx + 1 < len(all_trs):
-                                next_tr = all_trs[idx + 1]
-                                value_span = next_tr.find("span", class_="BidDetail")
-                                if value_span:
-                                    release_date = value_span.get_text(strip=True)
-                        
-                        # Look for contract value indicators
-                        elif any(keyword in label_text.lower() for keyword in [
-                            "estimated", "budget", "value", "cost", "amount", "price"
-                        ]):
-                            if idx + 1 < len(all_trs):
-                                next_tr = all_trs[idx + 1]
-                                value_span = next_tr.find("span", class_="BidDetail")
-                                if value_span:
-                                    value_text = value_span.get_text(strip=True)
-                                    # Extract numeric value from text like "$1,500,000" or "1500000"
-                                    value_match = re.search(r'[\d,]+(?:\.\d{2})?', value_text.replace('$', '').replace(',', ''))
-                                    if value_match:
-                                        try:
-                                            estimated_value = int(float(value_match.group()))
-                                            print(f"   💵 Found estimated value: ${estimated_value:,} for {title}")
-                                        except ValueError:
-                                            pass
-                
-                # Also check the general page text for value patterns if not found in structured data
-                if not estimated_value:
-                    page_text = detail_soup.get_text().lower()
-                    value_patterns = [
-                        r'estimated\s+(?:cost|value|amount)[:]?\s*\$?([\d,]+(?:\.\d{2})?)',
-                        r'budget[:]?\s*\$?([\d,]+(?:\.\d{2})?)',
-                        r'not\s+to\s+exceed\s*\$?([\d,]+(?:\.\d{2})?)',
-                        r'\$\s*([\d,]+(?:\.\d{2})?)'
-                    ]
-                    
-                    for pattern in value_patterns:
-                        match = re.search(pattern, page_text)
-                        if match:
-                            try:
-                                clean_value = match.group(1).replace(',', '')
-                                estimated_value = int(float(clean_value))
-                                print(f"   💵 Found estimated value in text: ${estimated_value:,} for {title}")
-                                break
-                            except ValueError:
-                                continue
-                                
-            except Exception as e:
-                print(f"Failed to fetch details for {detail_url}: {e}")
+            details = checkpoint.remembered("detail", detail_url) if checkpoint else None
+            if details is None:
+                details = fetch_bid_details(detail_url, title)
+                if details is not None and checkpoint:
+                    checkpoint.remember("detail", detail_url, details)
+            if details:
+                release_date = details["Release Date"]
+                estimated_value = details["Estimated Value"]
 
         row_data = {
             "Title": title,
@@ -113,14 +72,76 @@ def scrape():
             "Source URL": detail_url,
             "status": status
         }
-        rows.append(row_data)
-
-    df = pd.DataFrame(rows, columns=[
-        "Title", "Department", "Industry", "Estimated Value", "Release Date",
-        "Due Date", "Instructions", "Bid Deposit", "Addendum",
-        "City", "Source Type", "Source URL", "status"
-    ])
-    return df
+        yield row_data
+
+def fetch_bid_details(detail_url, title):
+    """
+    Fetch a bid's detail page for its publication date and estimated value.
+    Returns {"Release Date", "Estimated Value"}, or None if the page can't be fetched.
+    """
+    release_date = None
+    estimated_value = None
+    try:
+        detail_response = fetch.get(detail_url)
+        detail_soup = parse_html(detail_response.content)
+        all_trs = detail_soup.find_all("tr")
+
+        # Look for both Publication Date and Estimated Value
+        for idx, tr in enumerate(all_trs):
+            label_span = tr.find("span", class_="BidListHeader")
+            if label_span:
+                label_text = label_span.get_text(strip=True)
+
+                # Look for Publication Date/Time
+                if "Publication Date/Time" in label_text:
+                    if idx + 1 < len(all_trs):
+                        next_tr = all_trs[idx + 1]
+                        value_span = next_tr.find("span", class_="BidDetail")
+                        if value_span:
+                            release_date = value_span.get_text(strip=True)
+
+                # Look for contract value indicators
+                elif any(keyword in label_text.lower() for keyword in [
+                    "estimated", "budget", "value", "cost", "amount", "price"
+                ]):
+                    if idx + 1 < len(all_trs):
+                        next_tr = all_trs[idx + 1]
+                        value_span = next_tr.find("span", class_="BidDetail")
+                        if value_span:
+                            value_text = value_span.get_text(strip=True)
+                            # Extract numeric value from text like "$1,500,000" or "1500000"
+                            value_match = re.search(r'[\d,]+(?:\.\d{2})?', value_text.replace('$', '').replace(',', ''))
+                            if value_match:
+                                try:
+                                    estimated_value = int(float(value_match.group()))
+                                    print(f"   💵 Found estimated value: ${estimated_value:,} for {title}")
+                                except ValueError:
+                                    pass
+
+        # Also check the general page text for value patterns if not found in structured data
+        if not estimated_value:
+            page_text = detail_soup.get_text().lower()
+            value_patterns = [
+                r'estimated\s+(?:cost|value|amount)[:]?\s*\$?([\d,]+(?:\.\d{2})?)',
+                r'budget[:]?\s*\$?([\d,]+(?:\.\d{2})?)',
+                r'not\s+to\s+exceed\s*\$?([\d,]+(?:\.\d{2})?)',
+                r'\$\s*([\d,]+(?:\.\d{2})?)'
+            ]
+
+            for pattern in value_patterns:
+                match = re.search(pattern, page_text)
+                if match:
+                    try:
+                        clean_value = match.group(1).replace(',', '')
+                        estimated_value = int(float(clean_value))
+                        print(f"   💵 Found estimated value in text: ${estimated_value:,} for {title}")
+                        break
+                    except ValueError:
+                        continue
+    except Exception as e:
+        print(f"Failed to fetch details for {detail_url}: {e}")
+        return None
+    return {"Release Date": release_date, "Estimated Value": estimated_value}
 
 if __name__ == "__main__":
     df = scrape()
@@ -0,0 +1,23 @@
+import importlib
+
+# ----------------------------
+# Cities crawled as listing rows plus bid pages
+# ----------------------------
+# These cities' listing rows and bid pages can be fetched separately
+# (listing_rows, has_detail_page, enrich_row), so their bid pages can be
+# queued or prioritized. The scraper modules are named rather than imported,
+# so the web app can load the one scraper a bid page needs without pulling
+# in every other scraper and its dependencies.
+
+FAN_OUT_MODULES = {
+    "Boston": "scrapers.boston",
+    "Worcester": "scrapers.worcester",
+    "Quincy": "scrapers.quincy",
+}
+
+def fan_out_scraper(city):
+    """
+    The city's scraper module if it is a fan-out city, else None
+    """
+    name = FAN_OUT_MODULES.get(city)
+    return importlib.import_module(name) if name else None
@@ -0,0 +1,197 @@
+import requests
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# ----------------------------
+# Shared HTTP fetching with adaptive per-host politeness limits
+# ----------------------------
+# Every request to a host goes through that host's throttle, which caps how
+# many requests are in flight at once and spaces out request starts. The
+# limits adapt to how the host responds: while responses come back quickly
+# the throttle adds concurrency and request rate a step at a time; a 429/503
+# or a timeout halves both, and a Retry-After header pauses the host for as
+# long as it asks. Scrapers can then fetch concurrently at the fastest rate
+# each municipal server tolerates.
+
+# host -> (max concurrent requests, starting seconds between request starts)
+HOST_LIMITS = {
+    "www.boston.gov": (4, 1.0),
+}
+DEFAULT_LIMIT = (2, 1.5)
+
+# Bounds for the adapted spacing between request starts, in seconds
+MIN_INTERVAL = 0.25
+MAX_INTERVAL = 30.0
+
+# Requests per second added after each fast response, and the factor the rate
+# and concurrency are divided by on backoff
+RATE_STEP = 0.1
+BACKOFF_FACTOR = 2.0
+
+# A response slower than this multiple of the host's fastest one means it is
+# struggling, so the limits hold instead of growing
+SLOW_LATENCY_FACTOR = 3.0
+
+# Responses that ask us to slow down, the attempts per request, and the
+# longest Retry-After honored (in seconds)
+BACKOFF_STATUSES = {429, 503}
+MAX_ATTEMPTS = 3
+MAX_RETRY_AFTER = 120
+
+class HostThrottle:
+    """
+    Adaptive politeness limit for one host: a concurrency cap plus a spacing between request starts,
+    both adjusted after every response (additive increase, multiplicative decrease)
+    """
+    def __init__(self, max_concurrent, min_interval):
+        self.max_concurrent = max_concurrent
+        self.concurrency = 1.0
+        self.rate = 1 / min_interval
+        self.latency = None
+        self.fastest = None
+        self._in_flight = 0
+        self._ready = threading.Condition()
+        self._next_start = 0.0
+        self._backed_off_at = 0.0
+
+    def __enter__(self):
+        with self._ready:
+            while self._in_flight >= int(self.concurrency):
+                self._ready.wait()
+            self._in_flight += 1
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+        return self
+
+    def __exit__(self, *exc):
+        with self._ready:
+            self._in_flight -= 1
+            self._ready.notify_all()
+        return False
+
+    @property
+    def min_interval(self):
+        """
+        Current seconds between request starts
+        """
+        return 1 / self.rate
+
+    def succeeded(self, latency):
+        """
+        Record a good response: speed up a step unless the host is answering slowly
+        """
+        with self._ready:
+            self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+            self.fastest = latency if self.fastest is None else min(self.fastest, latency)
+            if self.latency > SLOW_LATENCY_FACTOR * self.fastest:
+                return
+            self.concurrency = min(self.concurrency + 1 / self.concurrency, self.max_concurrent)
+            self.rate = min(self.rate + RATE_STEP, 1 / MIN_INTERVAL)
+            self._ready.notify_all()
+
+    def back_off(self, retry_after=None):
+        """
+        Record a 429/503 or timeout: halve the concurrency and the request rate, and
+        hold every request until Retry-After has passed
+        """
+        with self._ready:
+            now = time.monotonic()
+            if retry_after:
+                self._next_start = max(self._next_start, now + retry_after)
+            # Requests already in flight when the host pushed back count as one signal
+            if now - self._backed_off_at < self.min_interval:
+                return
+            self._backed_off_at = now
+            self.concurrency = max(self.concurrency / BACKOFF_FACTOR, 1.0)
+            self.rate = max(self.rate / BACKOFF_FACTOR, 1 / MAX_INTERVAL)
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+# Optional cross-process limiter, called as limiter(host, min_interval) and
+# returning seconds to wait before the request (see job_queue.reserve_host_slot)
+_shared_limiter = None
+
+def set_shared_limiter(limiter):
+    """
+    Also space requests through a limiter shared with other processes (None to turn it off)
+    """
+    global _shared_limiter
+    _shared_limiter = limiter
+
+def throttle_for(url):
+    """
+    Get (or create) the throttle for a URL's host
+    """
+    host = urlparse(url).netloc.lower()
+    with _throttles_lock:
+        if host not in _throttles:
+            _throttles[host] = HostThrottle(*HOST_LIMITS.get(host, DEFAULT_LIMIT))
+        return _throttles[host]
+
+def retry_after_seconds(response):
+    """
+    Seconds asked for by a response's Retry-After header (delay or HTTP date), capped at MAX_RETRY_AFTER
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+def get(url, **kwargs):
+    """
+    requests.get under the host's adaptive politeness limit. A 429/503 or a timeout
+    slows the host down and is retried, up to MAX_ATTEMPTS in all; the last
+    attempt's response is returned (or its timeout raised).
+    """
+    return request("GET", url, **kwargs)
+
+def head(url, **kwargs):
+    """
+    requests.head under the same limit and retries as get()
+    """
+    return request("HEAD", url, **kwargs)
+
+def request(method, url, **kwargs):
+    """
+    requests.request under the host's adaptive politeness limit (see get())
+    """
+    kwargs.setdefault("timeout", 10)
+    host = urlparse(url).netloc.lower()
+    throttle = throttle_for(url)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        with throttle:
+            if _shared_limiter is not None:
+                wait = _shared_limiter(host, throttle.min_interval)
+                if wait > 0:
+                    time.sleep(wait)
+            started = time.monotonic()
+            try:
+                response = requests.request(method, url, **kwargs)
+            except requests.Timeout:
+                throttle.back_off()
+                print(f"   🐢 {host} timed out - slowing to {throttle.min_interval:.2f}s between requests")
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                continue
+        if response.status_code not in BACKOFF_STATUSES:
+            throttle.succeeded(time.monotonic() - started)
+            return response
+        retry_after = retry_after_seconds(response)
+        throttle.back_off(retry_after)
+        print(f"   🐢 {host} answered {response.status_code} - slowing to {throttle.min_interval:.2f}s "
+              f"between requests" + (f", pausing {retry_after:.0f}s" if retry_after else ""))
+    return response
@@ -1,18 +1,88 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
+from scrapers.parsing import parse_html, NEWTON_LISTING
 import pandas as pd
+import requests
+from scrapers import fetch
 import time
+import os
 
 # ----------------------------
-# Selenium Scraper for Town of Newton, MA
+# Scraper for Town of Newton, MA
 # ----------------------------
+# The bid listing is fetched with plain HTTP first. Selenium is only started
+# when the server-rendered HTML does not contain the listtable (e.g. the
+# site starts rendering it client-side), so normal runs don't need Chrome.
+
+LISTING_URL = "https://www.newtonma.gov/government/purchasing/current-bids"
+
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/125.0.0.0 Safari/537.36"
+)
+
+COLUMNS = [
+    "Title", "Department", "Industry", "Estimated Value",
+    "Release Date", "Due Date", "Instructions", "Bid Deposit",
+    "Addendum", "City", "Source Type", "Source URL", "status"
+]
 
 def scrape():
-    url = "https://www.newtonma.gov/government/purchasing/current-bids"
+    """
+    Scrape Newton's current bids.
+    NEWTON_FETCH_MODE controls how the listing is fetched:
+    - "auto" (default): plain HTTP, falling back to Selenium if the table is missing
+    - "http": plain HTTP only
+    - "browser": always use Selenium
+    """
+    mode = os.environ.get("NEWTON_FETCH_MODE", "auto").lower()
+
+    if mode != "browser":
+        page_src = fetch_listing_http()
+        df = parse_listing(page_src) if page_src else None
+        if df is not None:
+            print("✅ Newton data scraped with plain HTTP:")
+            print(df.head())
+            return df
+        if mode == "http":
+            print("❌ Could not find listtable on Newton page (HTTP only mode).")
+            return pd.DataFrame()
+        print("⚠️ listtable not in Newton server HTML, falling back to Selenium...")
+
+    page_src = fetch_listing_selenium()
+    df = parse_listing(page_src) if page_src else None
+    if df is None:
+        print("❌ Could not find listtable on Newton page.")
+        return pd.DataFrame()
+    print("✅ Newton data scraped with Selenium:")
+    print(df.head())
+    return df
+
+def iter_records(checkpoint=None):
+    """
+    Yield Newton's bids as records. The listing is a single page scraped in one
+    go, so there is nothing to checkpoint.
+    """
+    yield from scrape().to_dict("records")
+
+def fetch_listing_http():
+    """
+    Fetch the server-rendered listing page. Returns the HTML or None on failure.
+    """
+    try:
+        response = fetch.get(LISTING_URL, headers={"User-Agent": USER_AGENT}, timeout=15)
+        response.raise_for_status()
+        return response.text
+    except requests.RequestException as e:
+        print(f"⚠️ Error fetching Newton listing over HTTP: {e}")
+        return None
+
+def fetch_listing_selenium():
+    """
+    Render the listing page in headless Chrome and return the page source.
+    """
+    # Imported here so HTTP-only runs don't need Selenium/Chrome installed
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
 
     # Browser setup for both local and Heroku environments
     options = Options()
@@ -24,99 +94,83 @@ def scrape():
     options.add_argument("--disable-backgrounding-occluded-windows")
     options.add_argument("--disable-renderer-backgrounding")
     options.add_argument("--window-size=1920,1080")
-    options.add_argument(
-        "user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/125.0.0.0 Safari/537.36"
-    )
-    
+    options.add_argument(f"user-agent={USER_AGENT}")
+
     # Set Chrome binary path for Heroku (buildpack sets this environment variable)
-    import os
     chrome_bin = os.environ.get('GOOGLE_CHROME_BIN')
     if chrome_bin:
         options.binary_location = chrome_bin
 
     driver = webdriver.Chrome(options=options)
     try:
-        driver.get(url)
+        driver.get(LISTING_URL)
         # Allow time for page to render
         time.sleep(5)
-
-        # DEBUG: Verify presence of 'listtable' in rendered HTML
         page_src = driver.page_source
-        print("🔍 'listtable' in page source?", "listtable" in page_src)
-        start = page_src.find("listtable")
-        if start != -1:
-            snippet = page_src[start-100:start+500]
-            print("🔍 snippet around 'listtable':\n", snippet)
+        print("🔍 'listtable' in rendered page source?", "listtable" in page_src)
+        return page_src
+    finally:
+        driver.quit()
+
+def parse_listing(page_src):
+    """
+    Parse the listtable rows out of the listing HTML.
+    Returns a DataFrame, or None if the page has no listtable.
+    """
+    soup = parse_html(page_src, NEWTON_LISTING)
+    table = soup.find("table", class_="listtable")
+    if not table:
+        return None
+
+    # Parse rows
+    rows = []
+    tbody = table.find("tbody")
+    tr_elements = tbody.find_all("tr") if tbody else table.find_all("tr")[1:]
+    for tr in tr_elements:
+        title_cell   = tr.find("td", {"data-th": "Title"})
+        start_cell   = tr.find("td", {"data-th": "Starting"})
+        closing_cell = tr.find("td", {"data-th": "Closing"})
+        status_cell  = tr.find("td", {"data-th": "Status"})
+
+        if not title_cell or not start_cell or not closing_cell or not status_cell:
+            continue
+
+        raw_status = status_cell.get_text(strip=True).strip()
+        # Include Open and Pending (map Pending -> Upcoming)
+        if raw_status.lower() == "open":
+            status = "open"
+        elif raw_status.lower() == "pending":
+            status = "upcoming"
         else:
-            print("🔍 'listtable' not found in page source.")
+            continue  # skip closed or other statuses
 
-        soup = BeautifulSoup(page_src, "html.parser")
-        table = soup.find("table", class_="listtable")
-        if not table:
-            print("❌ Could not find listtable on Newton page.")
-            return pd.DataFrame()
+        # Title & URL
+        link = title_cell.find("a")
+        title = link.get_text(strip=True) if link else title_cell.get_text(strip=True)
+        href  = link["href"] if link and link.has_attr("href") else ""
+        source_url = f"https://www.newtonma.gov{href}" if href.startswith("/") else href
 
-        # Parse rows
-        rows = []
-        tbody = table.find("tbody")
-        tr_elements = tbody.find_all("tr") if tbody else table.find_all("tr")[1:]
-        for tr in tr_elements:
-            title_cell   = tr.find("td", {"data-th": "Title"})
-            start_cell   = tr.find("td", {"data-th": "Starting"})
-            closing_cell = tr.find("td", {"data-th": "Closing"})
-            status_cell  = tr.find("td", {"data-th": "Status"})
-
-            if not title_cell or not start_cell or not closing_cell or not status_cell:
-                continue
-
-            raw_status = status_cell.get_text(strip=True).strip()
-            # Include Open and Pending (map Pending -> Upcoming)
-            if raw_status.lower() == "open":
-                status = "open"
-            elif raw_status.lower() == "pending":
-                status = "upcoming"
-            else:
-                continue  # skip closed or other statuses
-
-            # Title & URL
-            link = title_cell.find("a")
-            title = link.get_text(strip=True) if link else title_cell.get_text(strip=True)
-            href  = link["href"] if link and link.has_attr("href") else ""
-            source_url = f"https://www.newtonma.gov{href}" if href.startswith("/") else href
-
-            # Dates
-            release_date = start_cell.get_text(strip=True)
-            due_date     = closing_cell.get_text(strip=True)
-
-            rows.append({
-                "Title": title,
-                "Department": None,
-                "Industry": None,
-                "Estimated Value": None,
-                "Release Date": release_date,
-                "Due Date": due_date,
-                "Instructions": None,
-                "Bid Deposit": None,
-                "Addendum": None,
-                "City": "Newton",
-                "Source Type": "Open Bids",
-                "Source URL": source_url,
-                "status": status
-            })
-
-        df = pd.DataFrame(rows, columns=[
-            "Title", "Department", "Industry", "Estimated Value",
-            "Release Date", "Due Date", "Instructions", "Bid Deposit",
-            "Addendum", "City", "Source Type", "Source URL", "status"
-        ])
-        print("✅ Newton data scraped with Selenium:")
-        print(df.head())
-        return df
+        # Dates
+        release_date = start_cell.get_text(strip=True)
+        due_date     = closing_cell.get_text(strip=True)
 
-    finally:
-        driver.quit()
+        rows.append({
+            "Title": title,
+            "Department": None,
+            "Industry": None,
+            "Estimated Value": None,
+            "Release Date": release_date,
+            "Due Date": due_date,
+            "Instructions": None,
+            "Bid Deposit": None,
+            "Addendum": None,
+            "City": "Newton",
+            "Source Type": "Open Bids",
+            "Source URL": source_url,
+            "status": status
+        })
+
+    return pd.DataFrame(rows, columns=COLUMNS)
 
 if __name__ == "__main__":
-    scrape()
\ No newline at end of file
+    scrape()
@@ -0,0 +1,44 @@
+from bs4 import BeautifulSoup, SoupStrainer, FeatureNotFound
+from urllib.parse import urljoin
+import json
+import re
+
+# ----------------------------
+# Shared HTML parsing for the scrapers
+# ----------------------------
+# Pages are parsed with lxml (much faster than html.parser). A scraper that
+# only reads part of a page declares that region as a SoupStrainer, so only
+# those subtrees are built instead of the whole document.
+
+# Region declarations used by the scrapers. While the page is parsed a class
+# attribute is still one string ("listtable responsive"), so classes are
+# matched as whole words with a pattern rather than by plain string equality.
+BOSTON_LISTING = SoupStrainer(["div", "nav", "ul"], class_=re.compile(r"\b(views-row|pager)\b"))
+CONCORD_LISTING = SoupStrainer("div", class_=re.compile(r"\blistItems\b"))
+NEWTON_LISTING = SoupStrainer("table", class_=re.compile(r"\blisttable\b"))
+SOMERVILLE_LISTING = SoupStrainer(["table", "a"])  # bid table + the .xlsx link
+WORCESTER_LISTING = SoupStrainer("table")
+
+def parse_html(markup, region=None):
+    """
+    Parse HTML with lxml, building only the given region (a SoupStrainer) if one is passed.
+    Falls back to html.parser if lxml isn't installed.
+    """
+    try:
+        return BeautifulSoup(markup, "lxml", parse_only=region)
+    except FeatureNotFound:
+        return BeautifulSoup(markup, "html.parser", parse_only=region)
+
+def document_links(links, page_url):
+    """
+    A bid's document attachments as stored in "Document_URLs": a JSON list of
+    {"name", "url"} with absolute URLs, or None if there are none.
+    links holds (href, link text) pairs found on the bid page at page_url,
+    which relative hrefs are resolved against.
+    """
+    documents = []
+    for href, link_text in links:
+        url = urljoin(page_url, href)
+        if url not in (document["url"] for document in documents):
+            documents.append({"name": link_text, "url": url})
+    return json.dumps(documents) if documents else None
@@ -1,9 +1,12 @@
 import requests
-from bs4 import BeautifulSoup
+from scrapers import fetch
+from scrapers.parsing import parse_html
 import pandas as pd
 from datetime import datetime
 import re
-import time
+
+BASE_URL = "https://www.quincyma.gov"
+MAIN_URL = f"{BASE_URL}/departments/purchasing/current_bids.php"
 
 def scrape():
     """
@@ -12,36 +15,72 @@ def scrape():
     2. Scrape each individual bid page for detailed information (with fallback)
     Returns DataFrame with comprehensive bid data
     """
-    base_url = "https://www.quincyma.gov"
-    main_url = f"{base_url}/departments/purchasing/current_bids.php"
+    rows = list(iter_records())
+    if not rows:
+        print("⚠️ No bid data found in Quincy table")
+        return pd.DataFrame()
     
+    df = pd.DataFrame(rows, columns=[
+        "Title", "Department", "Industry", "Estimated Value", "Release Date",
+        "Due Date", "Instructions", "Bid Deposit", "Addendum", "Comments",
+        "Standard_Forms", "Bid_Forms", "City", "Source Type", "Source URL", 
+        "Bid Number", "status"
+    ])
+    
+    print(f"✅ Quincy enhanced scraping complete: {len(df)} bids with detailed data")
+    return df
+
+def iter_records(checkpoint=None):
+    """
+    Yield each Quincy bid (table row merged with its detail page) as soon as it is scraped.
+    With a checkpoint (see checkpoints.py), bid pages parsed by an interrupted run are restored.
+    """
+    for i, row_data in enumerate(fetch_listing_rows(), 1):
+        # Step 2: Attempt to scrape individual bid page for detailed info
+        if has_detail_page(row_data):
+            title = row_data["Title"]
+            resumed = checkpoint is not None and checkpoint.remembered("detail", row_data["Source URL"]) is not None
+            print(f"   📄 Attempting to scrape individual bid {i}: {title}" + (" (from checkpoint)" if resumed else ""))
+            if enrich_row(row_data, checkpoint):
+                print(f"   ✅ Enhanced data retrieved for: {title}")
+            else:
+                print(f"   ⚠️ Could not access individual page, using table data for: {title}")
+        
+        yield row_data
+
+def fetch_listing_rows():
+    """
+    Step 1: basic bid rows from the main table (empty if the page can't be fetched)
+    """
     print("🔍 Scraping Quincy main bid table...")
     
-    # Step 1: Scrape main table
     try:
-        response = requests.get(main_url, timeout=10)
+        response = fetch.get(MAIN_URL)
         response.raise_for_status()
     except requests.RequestException as e:
         print(f"❌ Error fetching Quincy main page: {e}")
-        return pd.DataFrame()
+        return []
     
-    soup = BeautifulSoup(response.content, "html.parser")
+    soup = parse_html(response.content)
     
     # Find bid links using a more targeted approach
     bid_links = soup.find_all("a", href=re.compile(r"bid_detail_.*\.php"))
     
     if not bid_links:
         print("❌ No bid detail links found on Quincy page")
-        return pd.DataFrame()
+        return []
     
-    rows = []
-    page_text = soup.get_text()
-    lines = [line.strip() for line in page_text.split('\n') if line.strip()]
+    # One pass over the page splits its text into lines and notes the line each
+    # bid link starts on, and one over its tables notes each cell's row, so a
+    # bid's context is a lookup rather than a scan of the page
+    lines, title_lines = index_page_lines(soup, bid_links)
+    cell_positions = index_table_cells(soup)
     
     # Process each unique bid
+    rows = []
     processed_urls = set()  # Track processed URLs to avoid duplicates
     
-    for i, bid_link in enumerate(bid_links, 1):
+    for bid_link in bid_links:
         individual_bid_url = bid_link.get("href")
         
         # Skip if we've already processed this URL
@@ -54,21 +93,18 @@ def scrape():
         # Make URL absolute
         if individual_bid_url and not individual_bid_url.startswith("http"):
             if individual_bid_url.startswith("/"):
-                individual_bid_url = base_url + individual_bid_url
+                individual_bid_url = BASE_URL + individual_bid_url
             else:
-                individual_bid_url = f"{base_url}/{individual_bid_url}"
-        
-        # Extract dates from surrounding text
-        issue_date = None
-        due_date = None
+                individual_bid_url = f"{BASE_URL}/{individual_bid_url}"
         
-        # Find the context around this bid title in the page text
-        title_context = extract_bid_context(lines, title)
+        # Find the context around this bid: its table row if it has one,
+        # otherwise the indexed lines around the title in the page text
+        title_context = (extract_row_context(bid_link, cell_positions)
+                         or extract_bid_context(lines, title, title_lines))
         if title_context:
             issue_date, due_date = parse_bid_dates_from_context(title_context)
             
-            # Start with basic data from table
-            row_data = {
+            rows.append({
                 "Title": title,
                 "Department": extract_department(title),
                 "Industry": classify_industry(title),
@@ -83,40 +119,40 @@ def scrape():
                 "Bid_Forms": None,
                 "City": "Quincy",
                 "Source Type": "Current Bids",
-                "Source URL": individual_bid_url or main_url,
+                "Source URL": individual_bid_url or MAIN_URL,
                 "Bid Number": extract_bid_number(title),
                 "status": determine_status(due_date)
-            }
-            
-            # Step 2: Attempt to scrape individual bid page for detailed info
-            if individual_bid_url:
-                print(f"   📄 Attempting to scrape individual bid {i}: {title}")
-                enhanced_data = scrape_individual_bid(individual_bid_url)
-                if enhanced_data:
-                    # Update row_data with enhanced information
-                    row_data.update(enhanced_data)
-                    print(f"   ✅ Enhanced data retrieved for: {title}")
-                else:
-                    print(f"   ⚠️ Could not access individual page, using table data for: {title}")
-                
-                # Rate limiting: delay between requests
-                time.sleep(1.5)  # 1.5 second delay to be respectful
-            
-            rows.append(row_data)
-    
-    if not rows:
-        print("⚠️ No bid data found in Quincy table")
-        return pd.DataFrame()
-    
-    df = pd.DataFrame(rows, columns=[
-        "Title", "Department", "Industry", "Estimated Value", "Release Date",
-        "Due Date", "Instructions", "Bid Deposit", "Addendum", "Comments",
-        "Standard_Forms", "Bid_Forms", "City", "Source Type", "Source URL", 
-        "Bid Number", "status"
-    ])
-    
-    print(f"✅ Quincy enhanced scraping complete: {len(df)} bids with detailed data")
-    return df
+            })
+    return rows
+
+def listing_rows(checkpoint=None):
+    """
+    Step 1 on its own: the basic rows of the main table (a single page, so never checkpointed)
+    """
+    return fetch_listing_rows()
+
+def has_detail_page(row_data):
+    """
+    Whether a listing row links to its own bid page
+    """
+    return row_data["Source URL"] != MAIN_URL
+
+def enrich_row(row_data, checkpoint=None):
+    """
+    Merge the bid page's enhanced fields into a listing row, restored from the
+    checkpoint if an earlier run already parsed the page.
+    Returns True if the page's fields were merged, False if the table data is kept as-is.
+    """
+    bid_url = row_data["Source URL"]
+    enhanced_data = checkpoint.remembered("detail", bid_url) if checkpoint else None
+    if enhanced_data is None:
+        enhanced_data = scrape_individual_bid(bid_url)
+        if enhanced_data is not None and checkpoint:
+            checkpoint.remember("detail", bid_url, enhanced_data)
+    if enhanced_data:
+        row_data.update(enhanced_data)
+        return True
+    return False
 
 def scrape_individual_bid(bid_url):
     """
@@ -124,9 +160,9 @@ def scrape_individual_bid(bid_url):
     Returns dict with enhanced bid data or None if scraping fails
     """
     try:
-        response = requests.get(bid_url, timeout=10)
+        response = fetch.get(bid_url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
+        soup = parse_html(response.content)
         
         enhanced_data = {}
         
@@ -240,21 +276,81 @@ def parse_quincy_date_with_time(date_text):
         print(f"⚠️ Could not parse Quincy date/time: '{date_text}'")
         return parse_quincy_date(date_text)
 
-def extract_bid_context(lines, title):
+def normalize_line(text):
+    """
+    Normalize a line or title for index lookups (collapse whitespace, ignore case)
+    """
+    return " ".join(text.split()).casefold()
+
+def index_page_lines(soup, bid_links):
+    """
+    Split the page text into its non-blank lines (as soup.get_text() would) in
+    a single pass over the page's strings, noting the line each string starts
+    on. Returns the lines and the line of each bid link keyed on its normalized
+    title (the first link wins when titles repeat).
+    """
+    lines = []
+    current = []
+    string_lines = {}
+    for string in soup.strings:
+        for n, piece in enumerate(string.split("\n")):
+            if n:
+                line = "".join(current).strip()
+                if line:
+                    lines.append(line)
+                current = []
+            current.append(piece)
+            if piece.strip() and id(string) not in string_lines:
+                # The line being built is non-blank now, so it will land at this position
+                string_lines[id(string)] = len(lines)
+    line = "".join(current).strip()
+    if line:
+        lines.append(line)
+
+    title_lines = {}
+    for bid_link in bid_links:
+        first = next((string for string in bid_link.strings if string.strip()), None)
+        if first is not None and id(first) in string_lines:
+            title_lines.setdefault(normalize_line(bid_link.get_text(strip=True)), string_lines[id(first)])
+    return lines, title_lines
+
+def index_table_cells(soup):
+    """
+    Map every table cell (by id, since bs4 compares tags by content) to its
+    row's cells and its position in them, in one pass over the page's rows
+    """
+    positions = {}
+    for row in soup.find_all("tr"):
+        cells = row.find_all(["td", "th"], recursive=False)
+        for i, cell in enumerate(cells):
+            positions[id(cell)] = (cells, i)
+    return positions
+
+def extract_row_context(bid_link, cell_positions):
+    """
+    Extract the context for a bid from the table row holding its link:
+    the link's cell and the cells that follow it
+    """
+    cell = bid_link.find_parent(["td", "th"])
+    position = cell_positions.get(id(cell)) if cell else None
+    if position is None:
+        return []
+    cells, start = position
+    return [c.get_text(" ", strip=True) for c in cells[start:start + 4]]
+
+def extract_bid_context(lines, title, title_lines):
     """
     Extract the context lines around a bid title for date parsing
+    (title_lines from index_page_lines)
     """
-    context_lines = []
-    title_found = False
-    
-    for i, line in enumerate(lines):
-        if title in line:
-            title_found = True
-            # Get the current line and next few lines
-            context_lines.extend(lines[i:i+4])
-            break
-    
-    return context_lines if title_found else []
+    if not title:
+        return []
+    i = title_lines.get(normalize_line(title))
+    if i is None:
+        return []
+
+    # Get the current line and next few lines
+    return lines[i:i+4]
 
 def parse_bid_dates_from_context(context_lines):
     """
@@ -0,0 +1,118 @@
+import json
+import math
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import psycopg2
+
+from models import get_db_connection
+
+# ----------------------------
+# Small state store for scrapers, in PostgreSQL
+# ----------------------------
+# Lets a scraper remember things between runs (content hashes, sync cursors),
+# in the scraper_state table so every worker dyno sees the same state. Values
+# are stored as JSON; dates, times, decimals and non-finite floats are tagged
+# on the way in and restored on the way out, so state comes back with the
+# types it was saved with (tuples come back as lists). Missing or unreadable
+# state is treated as "no previous run".
+
+STATE_DDL = """
+    CREATE TABLE IF NOT EXISTS scraper_state (
+        name TEXT PRIMARY KEY,
+        state JSON NOT NULL,
+        saved_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+# JSON rather than JSONB, so objects keep their key order (column order of saved records)
+
+TYPE_KEY = "__type__"
+
+# Tagged types: name -> (type, to text, from text). datetime comes before date, its base class.
+TAGGED_TYPES = {
+    "datetime": (datetime, datetime.isoformat, datetime.fromisoformat),
+    "date": (date, date.isoformat, date.fromisoformat),
+    "time": (time, time.isoformat, time.fromisoformat),
+    "timedelta": (timedelta, lambda value: repr(value.total_seconds()), lambda text: timedelta(seconds=float(text))),
+    "decimal": (Decimal, str, Decimal),
+    "float": (float, repr, float),
+}
+
+def ensure_table(conn):
+    """
+    Create scraper_state if it doesn't exist yet
+    """
+    with conn.cursor() as cur:
+        cur.execute(STATE_DDL)
+    conn.commit()
+
+def encode(value):
+    """
+    A JSON-safe copy of value, with the TAGGED_TYPES values replaced by tagged objects
+    """
+    if isinstance(value, dict):
+        return {str(key): encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    if isinstance(value, float) and math.isfinite(value):
+        return value
+    for name, (value_type, to_text, _) in TAGGED_TYPES.items():
+        if isinstance(value, value_type):
+            return {TYPE_KEY: name, "value": to_text(value)}
+    return value
+
+def decode_tagged(obj):
+    """
+    json object_hook turning tagged objects back into their values
+    """
+    if len(obj) == 2 and obj.get(TYPE_KEY) in TAGGED_TYPES and "value" in obj:
+        return TAGGED_TYPES[obj[TYPE_KEY]][2](obj["value"])
+    return obj
+
+def load_state(name):
+    """
+    Load saved state, or None if there is none (or the database can't be reached)
+    """
+    try:
+        conn = get_db_connection()
+    except psycopg2.Error as e:
+        print(f"⚠️ Could not load scraper state {name}: {e}")
+        return None
+    try:
+        ensure_table(conn)
+        with conn.cursor() as cur:
+            cur.execute("SELECT state::text AS state FROM scraper_state WHERE name = %s", (name,))
+            row = cur.fetchone()
+        return json.loads(row["state"], object_hook=decode_tagged) if row else None
+    except (psycopg2.Error, ValueError) as e:
+        print(f"⚠️ Could not load scraper state {name}: {e}")
+        return None
+    finally:
+        conn.close()
+
+def save_state(name, data):
+    """
+    Save state, replacing what was saved under the name before.
+    State is only a cache, so a failed save is reported and the scrape carries on.
+    """
+    try:
+        conn = get_db_connection()
+    except psycopg2.Error as e:
+        print(f"⚠️ Could not save scraper state {name}: {e}")
+        return
+    try:
+        ensure_table(conn)
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO scraper_state (name, state) VALUES (%s, %s)
+                ON CONFLICT (name) DO UPDATE SET state = EXCLUDED.state, saved_at = now()
+                """,
+                (name, json.dumps(encode(data))),
+            )
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"⚠️ Could not save scraper state {name}: {e}")
+    finally:
+        conn.close()
@@ -1,9 +1,13 @@
 import requests
-from bs4 import BeautifulSoup
+from scrapers import fetch
+from bs4 import NavigableString, Tag
+from scrapers.parsing import document_links, parse_html, WORCESTER_LISTING
 import pandas as pd
 from datetime import datetime
 import re
-import time
+
+BASE_URL = "http://www.worcesterma.gov"
+MAIN_URL = f"{BASE_URL}/finance/purchasing-bids/bids/open-bids"
 
 def scrape():
     """
@@ -12,30 +16,56 @@ def scrape():
     2. Scrape each individual bid page for detailed information
     Returns DataFrame with comprehensive bid data
     """
-    base_url = "http://www.worcesterma.gov"
-    main_url = f"{base_url}/finance/purchasing-bids/bids/open-bids"
+    rows = list(iter_records())
+    if not rows:
+        print("⚠️ No bid data found in Worcester table")
+        return pd.DataFrame()
+    
+    df = pd.DataFrame(rows, columns=[
+        "Title", "Department", "Industry", "Estimated Value", "Release Date",
+        "Due Date", "Instructions", "Bid Deposit", "Addendum", "Comments",
+        "Standard_Forms", "Bid_Forms", "City", "Source Type", "Source URL", 
+        "Bid Number", "status"
+    ])
     
+    print(f"✅ Worcester enhanced scraping complete: {len(df)} bids with detailed data")
+    return df
+
+def iter_records(checkpoint=None):
+    """
+    Yield each Worcester bid (table row merged with its detail page) as soon as it is scraped.
+    With a checkpoint (see checkpoints.py), bid pages parsed by an interrupted run are restored.
+    """
+    for i, row_data in enumerate(fetch_listing_rows(), 1):
+        # Step 2: Scrape individual bid page for detailed info
+        if has_detail_page(row_data):
+            resumed = checkpoint is not None and checkpoint.remembered("detail", row_data["Source URL"]) is not None
+            print(f"   📄 Scraping individual bid {i}: {row_data['Bid Number']}" + (" (from checkpoint)" if resumed else ""))
+            enrich_row(row_data, checkpoint)
+        
+        yield row_data
+
+def fetch_listing_rows():
+    """
+    Step 1: basic bid rows from the main table (empty if the page can't be fetched)
+    """
     print("🔍 Scraping Worcester main bid table...")
     
-    # Step 1: Scrape main table
     try:
-        response = requests.get(main_url, timeout=10)
+        response = fetch.get(MAIN_URL)
         response.raise_for_status()
     except requests.RequestException as e:
         print(f"❌ Error fetching Worcester main page: {e}")
-        return pd.DataFrame()
+        return []
     
-    soup = BeautifulSoup(response.content, "html.parser")
+    soup = parse_html(response.content, WORCESTER_LISTING)
     table = soup.find("table")
     if not table:
         print("❌ No table found on Worcester bids page")
-        return pd.DataFrame()
+        return []
     
     rows = []
-    table_rows = table.find_all("tr")
-    
-    # Process each bid from the table
-    for i, tr in enumerate(table_rows[1:], 1):  # Skip header
+    for tr in table.find_all("tr")[1:]:  # Skip header
         cells = tr.find_all("td")
         if len(cells) >= 3:
             # Extract basic info from table
@@ -54,12 +84,11 @@ def scrape():
                 if href.startswith("http"):
                     individual_bid_url = href
                 elif href.startswith("/"):
-                    individual_bid_url = base_url + href
+                    individual_bid_url = BASE_URL + href
                 else:
-                    individual_bid_url = f"{base_url}/{href}"
+                    individual_bid_url = f"{BASE_URL}/{href}"
             
-            # Start with basic data from table
-            row_data = {
+            rows.append({
                 "Title": title,
                 "Department": extract_department(title),
                 "Industry": None,
@@ -74,37 +103,40 @@ def scrape():
                 "Bid_Forms": None,
                 "City": "Worcester",
                 "Source Type": "Open Bids",
-                "Source URL": individual_bid_url or main_url,
+                "Source URL": individual_bid_url or MAIN_URL,
                 "Bid Number": bid_number,
                 "status": determine_status(close_date)
-            }
-            
-            # Step 2: Scrape individual bid page for detailed info
-            if individual_bid_url:
-                print(f"   📄 Scraping individual bid {i}: {bid_number}")
-                enhanced_data = scrape_individual_bid(individual_bid_url)
-                if enhanced_data:
-                    # Update row_data with enhanced information
-                    row_data.update(enhanced_data)
-                
-                # Rate limiting: delay between requests
-                time.sleep(1.5)  # 1.5 second delay to be respectful
-            
-            rows.append(row_data)
-    
-    if not rows:
-        print("⚠️ No bid data found in Worcester table")
-        return pd.DataFrame()
-    
-    df = pd.DataFrame(rows, columns=[
-        "Title", "Department", "Industry", "Estimated Value", "Release Date",
-        "Due Date", "Instructions", "Bid Deposit", "Addendum", "Comments",
-        "Standard_Forms", "Bid_Forms", "City", "Source Type", "Source URL", 
-        "Bid Number", "status"
-    ])
-    
-    print(f"✅ Worcester enhanced scraping complete: {len(df)} bids with detailed data")
-    return df
+            })
+    return rows
+
+def listing_rows(checkpoint=None):
+    """
+    Step 1 on its own: the basic rows of the main table (a single page, so never checkpointed)
+    """
+    return fetch_listing_rows()
+
+def has_detail_page(row_data):
+    """
+    Whether a listing row links to its own bid page
+    """
+    return row_data["Source URL"] != MAIN_URL
+
+def enrich_row(row_data, checkpoint=None):
+    """
+    Merge the bid page's enhanced fields into a listing row, restored from the
+    checkpoint if an earlier run already parsed the page.
+    Returns True if the page's fields were merged, False if the table data is kept as-is.
+    """
+    bid_url = row_data["Source URL"]
+    enhanced_data = checkpoint.remembered("detail", bid_url) if checkpoint else None
+    if enhanced_data is None:
+        enhanced_data = scrape_individual_bid(bid_url)
+        if enhanced_data is not None and checkpoint:
+            checkpoint.remember("detail", bid_url, enhanced_data)
+    if enhanced_data:
+        row_data.update(enhanced_data)
+        return True
+    return False
 
 def scrape_individual_bid(bid_url):
     """
@@ -112,112 +144,200 @@ def scrape_individual_bid(bid_url):
     Returns dict with enhanced bid data or None if scraping fails
     """
     try:
-        response = requests.get(bid_url, timeout=10)
+        response = fetch.get(bid_url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        enhanced_data = {}
-        
-        # Extract Industry
-        industry_element = soup.find(string=re.compile(r"Industry|Category"))
-        if industry_element:
-            # Look for the industry value near the label
-            parent = industry_element.parent
-            if parent:
-                industry_text = parent.get_text()
-                # Extract industry from text like "Industry: Environmental Services"
-                industry_match = re.search(r"(?:Industry|Category):\s*(.+)", industry_text)
-                if industry_match:
-                    enhanced_data["Industry"] = industry_match.group(1).strip()
-        
-        # Extract Open Date - look for structured field-bid-posting-open-date
-        open_date_found = False
-        
-        # Primary method: Look for the structured open date field
-        open_date_field = soup.find("div", class_=re.compile(r"field-bid-posting-open-date"))
-        if open_date_field:
-            time_element = open_date_field.find("time")
-            if time_element:
-                date_text = time_element.get_text(strip=True)
-                date_match = re.search(r"(\d{2}/\d{2}/\d{4})", date_text)
-                if date_match:
-                    enhanced_data["Release Date"] = standardize_date(date_match.group(1))
-                    open_date_found = True
-        
-        # Fallback: Look for bold text containing "Open Date:"
-        if not open_date_found:
-            bold_elements = soup.find_all(['b', 'strong'])
-            for bold in bold_elements:
-                if bold and 'open date' in bold.get_text().lower():
-                    # Find the next sibling or nearby text that contains the date
-                    next_sibling = bold.next_sibling
-                    if next_sibling:
-                        # Check if next sibling is text and contains date
-                        if hasattr(next_sibling, 'strip'):
-                            date_text = next_sibling.strip()
-                            date_match = re.search(r"(\d{2}/\d{2}/\d{4})", date_text)
-                            if date_match:
-                                enhanced_data["Release Date"] = standardize_date(date_match.group(1))
-                                open_date_found = True
-                                break
-                        # Also check parent element text
-                        parent_text = bold.parent.get_text() if bold.parent else ""
-                        date_match = re.search(r"open date:\s*(\d{2}/\d{2}/\d{4})", parent_text, re.IGNORECASE)
-                        if date_match:
-                            enhanced_data["Release Date"] = standardize_date(date_match.group(1))
-                            open_date_found = True
-                            break
-        
-        # Second fallback: look for any text containing "Open Date"
-        if not open_date_found:
-            open_date_element = soup.find(string=re.compile(r"Open Date|Issue Date|Posted", re.IGNORECASE))
-            if open_date_element:
-                parent = open_date_element.parent
-                if parent:
-                    date_text = parent.get_text()
-                    date_match = re.search(r"(\d{2}/\d{2}/\d{4})", date_text)
-                    if date_match:
-                        enhanced_data["Release Date"] = standardize_date(date_match.group(1))
-        
-        # Extract Comments/Description
-        comments_element = soup.find(string=re.compile(r"Comments|Description|Details"))
-        if comments_element:
-            parent = comments_element.parent
-            if parent:
-                # Get the text content and clean it up
-                comments_text = parent.get_text(strip=True)
-                # Remove the label part
-                comments_text = re.sub(r"^(Comments|Description|Details):\s*", "", comments_text)
-                if comments_text and len(comments_text) > 10:  # Only if substantial content
-                    enhanced_data["Comments"] = comments_text[:500]  # Limit length
-        
-        # Extract Standard Forms
-        standard_forms = []
-        for form_text in ["CORI", "EPP", "MWBE", "REAP", "Wage Theft"]:
-            if soup.find(string=re.compile(form_text, re.IGNORECASE)):
-                standard_forms.append(form_text)
-        if standard_forms:
-            enhanced_data["Standard_Forms"] = ", ".join(standard_forms)
-        
-        # Extract Bid-Specific Forms
-        bid_forms = []
-        # Look for links to documents/forms
-        links = soup.find_all("a", href=True)
-        for link in links:
-            href = link["href"]
-            link_text = link.get_text(strip=True)
-            if any(ext in href.lower() for ext in [".pdf", ".doc", ".xls"]):
-                if any(word in link_text.lower() for word in ["form", "spec", "drawing", "addendum"]):
-                    bid_forms.append(link_text)
-        if bid_forms:
-            enhanced_data["Bid_Forms"] = ", ".join(bid_forms[:5])  # Limit to 5 forms
-        
-        return enhanced_data
+        soup = parse_html(response.content)
+        return parse_bid_page(soup, bid_url)
         
     except Exception as e:
         print(f"   ⚠️ Failed to scrape individual bid page {bid_url}: {e}")
         return None  # Return None so we keep basic table data
 
+# Standard forms reported for Worcester bids
+WORCESTER_STANDARD_FORMS = ["CORI", "EPP", "MWBE", "REAP", "Wage Theft"]
+
+# Any label a text node can carry, lowercased. Most text nodes match none of
+# these, so this one search lets the walk skip them.
+WORCESTER_LABEL_WORDS = re.compile(
+    "industry|category|open date|issue date|posted|comments|description|details|"
+    + "|".join(form.lower() for form in WORCESTER_STANDARD_FORMS)
+)
+INDUSTRY_LABEL = re.compile(r"Industry|Category")
+COMMENTS_LABEL = re.compile(r"Comments|Description|Details")
+OPEN_DATE_LABEL = re.compile(r"open date|issue date|posted")
+DATE_PATTERN = re.compile(r"(\d{2}/\d{2}/\d{4})")
+STRUCTURED_FIELD_PREFIX = "field-bid-posting-"
+
+def scan_bid_page(soup):
+    """
+    Walk a Worcester bid page once, collecting everything parse_bid_page needs:
+    - fields: the first element for each structured field-bid-posting-* class, by field name
+    - bolds: <b>/<strong> elements in page order
+    - industry / open_date / comments: the first text node carrying each label
+    - forms: the standard forms mentioned anywhere on the page
+    - links: (href, text) pairs
+    """
+    page = {
+        "fields": {},
+        "bolds": [],
+        "industry": None,
+        "open_date": None,
+        "comments": None,
+        "forms": set(),
+        "links": []
+    }
+    
+    for element in soup.descendants:
+        if isinstance(element, NavigableString):
+            lowered = element.lower()
+            if not WORCESTER_LABEL_WORDS.search(lowered):
+                continue
+            if page["industry"] is None and INDUSTRY_LABEL.search(element):
+                page["industry"] = element
+            if page["open_date"] is None and OPEN_DATE_LABEL.search(lowered):
+                page["open_date"] = element
+            if page["comments"] is None and COMMENTS_LABEL.search(element):
+                page["comments"] = element
+            for form_text in WORCESTER_STANDARD_FORMS:
+                if form_text.lower() in lowered:
+                    page["forms"].add(form_text)
+            continue
+        
+        if not isinstance(element, Tag):
+            continue
+        if element.name == "div":
+            for css_class in element.get("class", []):
+                if STRUCTURED_FIELD_PREFIX + "open-date" in css_class:
+                    page["fields"].setdefault("open-date", element)
+                elif STRUCTURED_FIELD_PREFIX in css_class:
+                    field_name = css_class.split(STRUCTURED_FIELD_PREFIX, 1)[1]
+                    page["fields"].setdefault(field_name, element)
+        elif element.name in ("b", "strong"):
+            page["bolds"].append(element)
+        elif element.name == "a" and element.has_attr("href"):
+            page["links"].append((element["href"], element.get_text(strip=True)))
+    
+    return page
+
+def parse_bid_page(soup, page_url):
+    """
+    Extract the enhanced fields from a parsed Worcester bid page.
+    The tree is walked once (see scan_bid_page) and every field is read from that walk.
+    page_url is the page's address, which its document links are resolved against.
+    """
+    page = scan_bid_page(soup)
+    enhanced_data = {}
+    
+    # Extract Industry: structured field first, then the "Industry:" label text
+    industry_text = structured_field_text(page, "industry", "category")
+    if industry_text:
+        enhanced_data["Industry"] = industry_text
+    if "Industry" not in enhanced_data and page["industry"] is not None:
+        # Look for the industry value near the label
+        parent = page["industry"].parent
+        if parent:
+            industry_text = parent.get_text()
+            # Extract industry from text like "Industry: Environmental Services"
+            industry_match = re.search(r"(?:Industry|Category):\s*(.+)", industry_text)
+            if industry_match:
+                enhanced_data["Industry"] = industry_match.group(1).strip()
+    
+    # Extract Open Date
+    release_date = extract_open_date(page)
+    if release_date:
+        enhanced_data["Release Date"] = release_date
+    
+    # Extract Comments/Description: structured field first, then the label text
+    comments_text = structured_field_text(page, "comments", "description")
+    if comments_text and len(comments_text) > 10:
+        enhanced_data["Comments"] = comments_text[:500]
+    elif page["comments"] is not None:
+        parent = page["comments"].parent
+        if parent:
+            # Get the text content and clean it up
+            comments_text = parent.get_text(strip=True)
+            # Remove the label part
+            comments_text = re.sub(r"^(Comments|Description|Details):\s*", "", comments_text)
+            if comments_text and len(comments_text) > 10:  # Only if substantial content
+                enhanced_data["Comments"] = comments_text[:500]  # Limit length
+    
+    # Extract Standard Forms
+    standard_forms = [form_text for form_text in WORCESTER_STANDARD_FORMS if form_text in page["forms"]]
+    if standard_forms:
+        enhanced_data["Standard_Forms"] = ", ".join(standard_forms)
+    
+    # Extract Bid-Specific Forms from links to documents/forms
+    bid_documents = []
+    for href, link_text in page["links"]:
+        if any(ext in href.lower() for ext in [".pdf", ".doc", ".xls"]):
+            if any(word in link_text.lower() for word in ["form", "spec", "drawing", "addendum"]):
+                bid_documents.append((href, link_text))
+    bid_forms = [link_text for _, link_text in bid_documents]
+    if bid_forms:
+        enhanced_data["Bid_Forms"] = ", ".join(bid_forms[:5])  # Limit to 5 forms
+    
+    # Links to the documents themselves, downloaded by documents.py
+    documents = document_links(bid_documents, page_url)
+    if documents:
+        enhanced_data["Document_URLs"] = documents
+    
+    return enhanced_data
+
+def structured_field_text(page, *field_names):
+    """
+    Text of the first structured field-bid-posting-<name> field found, without its label
+    """
+    for field_name in field_names:
+        field = page["fields"].get(field_name)
+        if field:
+            items = field.find(class_="field-items") or field
+            text = items.get_text(strip=True)
+            if text:
+                return text
+    return None
+
+def extract_open_date(page):
+    """
+    Find the bid's open date from a scanned page, trying in order:
+    the structured field-bid-posting-open-date field, a bold "Open Date:" label,
+    then any text mentioning Open Date / Issue Date / Posted
+    """
+    # Primary method: the structured open date field
+    open_date_field = page["fields"].get("open-date")
+    if open_date_field:
+        time_element = open_date_field.find("time")
+        if time_element:
+            date_match = DATE_PATTERN.search(time_element.get_text(strip=True))
+            if date_match:
+                return standardize_date(date_match.group(1))
+    
+    # Fallback: bold text containing "Open Date:"
+    for bold in page["bolds"]:
+        if 'open date' in bold.get_text().lower():
+            # Find the next sibling or nearby text that contains the date
+            next_sibling = bold.next_sibling
+            if next_sibling:
+                # Check if next sibling is text and contains date
+                if isinstance(next_sibling, NavigableString):
+                    date_match = DATE_PATTERN.search(next_sibling.strip())
+                    if date_match:
+                        return standardize_date(date_match.group(1))
+                # Also check parent element text
+                parent_text = bold.parent.get_text() if bold.parent else ""
+                date_match = re.search(r"open date:\s*(\d{2}/\d{2}/\d{4})", parent_text, re.IGNORECASE)
+                if date_match:
+                    return standardize_date(date_match.group(1))
+    
+    # Second fallback: any text containing "Open Date"
+    if page["open_date"] is not None:
+        parent = page["open_date"].parent
+        if parent:
+            date_match = DATE_PATTERN.search(parent.get_text())
+            if date_match:
+                return standardize_date(date_match.group(1))
+    
+    return None
+
 def extract_department(title):
     """
     Extract department from title if present (e.g., "Project Name / DPW" -> "DPW")
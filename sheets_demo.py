@@ -0,0 +1,153 @@
+"""
+Run the diff-based Google Sheets export in sheets_sync.py over successive
+crawls of synthetic contracts, against an in-memory worksheet (no Google
+credentials needed).
+
+    python sheets_demo.py                              # 5,000 contracts
+    python sheets_demo.py --contracts 20000 --churn 0.05
+
+The stand-in worksheet behaves like gspread's (get_all_values trims blank
+rows and columns) and counts the batchUpdate requests and cells it is sent.
+The demo exports a first crawl to an empty sheet, then the same crawl again,
+then a crawl where --churn of the contracts changed, closed or were newly
+posted, then a Boston-only crawl scoped to Boston's rows. After each run it
+checks the sheet holds exactly the expected rows, and prints the cells
+written against what clearing and re-uploading the sheet would send.
+"""
+
+import argparse
+import random
+import re
+import sys
+
+import pandas as pd
+
+import sheets_sync
+
+CITIES = ["Boston", "Cambridge", "Concord", "Newton", "Quincy", "Somerville", "Worcester"]
+COLUMNS = ["Title", "Department", "City", "Estimated Value", "Release Date", "Due Date", "Source URL", "status"]
+
+
+class FakeWorksheet:
+    """In-memory stand-in for a gspread worksheet, counting what it is sent."""
+
+    def __init__(self, rows=1000, cols=26):
+        self.grid = []
+        self.row_count = rows
+        self.col_count = cols
+        self.requests = 0
+        self.cells = 0
+
+    def get_all_values(self):
+        # Like gspread, trailing blank cells and rows are left out
+        rows = []
+        for row in self.grid:
+            filled = [i for i, value in enumerate(row) if value]
+            rows.append(row[:filled[-1] + 1] if filled else [])
+        while rows and not rows[-1]:
+            rows.pop()
+        width = max([len(row) for row in rows] + [0])
+        return [row + [""] * (width - len(row)) for row in rows]
+
+    def add_rows(self, count):
+        self.row_count += count
+
+    def add_cols(self, count):
+        self.col_count += count
+
+    def batch_update(self, data, value_input_option=None):
+        self.requests += 1
+        for update in data:
+            first_row = int(re.match(r"[A-Z]+(\d+)", update["range"]).group(1)) - 1
+            for offset, values in enumerate(update["values"]):
+                while len(self.grid) <= first_row + offset:
+                    self.grid.append([])
+                row = self.grid[first_row + offset]
+                row.extend([""] * (len(values) - len(row)))
+                row[:len(values)] = values
+                self.cells += len(values)
+
+
+def contract(i, rng, city=None):
+    return {
+        "Title": f"Bid {i}: supply and services", "Department": rng.choice(["DPW", "Schools", "Police", None]),
+        "City": city or rng.choice(CITIES),
+        "Estimated Value": rng.choice([None, float(rng.randint(1, 500) * 1000)]),
+        "Release Date": "2026-10-01", "Due Date": f"2026-11-{rng.randint(1, 28):02d}",
+        "Source URL": f"https://example.com/bids/{i}", "status": "open",
+    }
+
+
+def next_crawl(records, churn, rng, next_id):
+    """The previous crawl with churn of its contracts changed, closed, or newly posted."""
+    count = int(len(records) * churn)
+    records = [dict(record) for record in records]
+    for record in rng.sample(records, count):
+        record["Due Date"] = f"2026-12-{rng.randint(1, 28):02d}"
+    closed = {id(record) for record in rng.sample(records, count)}
+    records = [record for record in records if id(record) not in closed]
+    records += [contract(next_id + i, rng) for i in range(count)]
+    return records
+
+
+def sheet_rows(df):
+    return sorted([sheets_sync.cell_value(value) for value in row] for row in df.itertuples(index=False, name=None))
+
+
+def check(worksheet, expected):
+    """Problems with the sheet's contents against the expected rows."""
+    values = worksheet.get_all_values()
+    problems = []
+    if not values or values[0] != COLUMNS:
+        problems.append(f"header {values[:1]}")
+    found = sorted(values[1:])
+    if found != expected:
+        missing = len([row for row in expected if row not in found])
+        problems.append(f"{len(found)} rows, expected {len(expected)} ({missing} missing)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the diff-based Sheets export against an in-memory worksheet.")
+    parser.add_argument("--contracts", type=int, default=5000, help="contracts in the first crawl")
+    parser.add_argument("--churn", type=float, default=0.02, help="share of contracts changed, closed and posted per crawl")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    first = [contract(i, rng) for i in range(args.contracts)]
+    second = next_crawl(first, args.churn, rng, args.contracts)
+    boston = [record for record in next_crawl(second, args.churn, rng, args.contracts * 2) if record["City"] == "Boston"]
+    boston += [contract(args.contracts * 3 + i, rng, "Boston") for i in range(5)]
+    others = [record for record in second if record["City"] != "Boston"]
+
+    runs = [
+        ("First export", first, None, first),
+        ("Same crawl again", first, None, first),
+        (f"{args.churn:.0%} churn", second, None, second),
+        ("Boston only, scoped", boston, ("City", ["Boston"]), others + boston),
+    ]
+
+    worksheet = FakeWorksheet()
+    problems = []
+    print(f"📊 {args.contracts:,} contracts, {len(COLUMNS)} columns")
+    print(f"   {'':<20} {'changed':>8} {'new':>6} {'removed':>8} {'requests':>9} {'cells':>9} {'re-upload':>10}")
+    for label, records, scope, expected in runs:
+        requests, cells = worksheet.requests, worksheet.cells
+        df = pd.DataFrame(records, columns=COLUMNS)
+        summary = sheets_sync.sync_worksheet(worksheet, df, scope=scope)
+        run_problems = check(worksheet, sheet_rows(pd.DataFrame(expected, columns=COLUMNS)))
+        problems += [f"{label}: {problem}" for problem in run_problems]
+        print(f"   {label:<20} {summary['changed']:>8,} {summary['new']:>6,} {summary['removed']:>8,} "
+              f"{worksheet.requests - requests:>9,} {worksheet.cells - cells:>9,} "
+              f"{(len(expected) + 1) * len(COLUMNS):>10,}" + (" ⚠️" if run_problems else ""))
+
+    print(f"\n📄 Sheet contents after every run: {'ok' if not problems else f'{len(problems)} problems'}")
+    for problem in problems:
+        print(f"   ⚠️ {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Diff-based export of the contracts table to a Google Sheets worksheet.
+
+Instead of clearing the sheet and re-uploading every cell, sync_worksheet reads
+the sheet once, works out which rows changed, were added or were removed, and
+writes only those rows with a few batched values.batchUpdate calls. The sheet
+is never left empty mid-write.
+
+The worksheet only needs gspread's get_all_values / batch_update / add_rows /
+add_cols methods and row_count / col_count attributes, so a local fake can
+stand in for it.
+"""
+
+import math
+
+# Columns identifying a contract row across runs
+KEY_COLUMNS = ["City", "Source URL", "Title"]
+
+# Ranges sent per values.batchUpdate request
+RANGES_PER_REQUEST = 200
+
+
+def cell_value(value):
+    """Render a DataFrame value the way it reads back from the sheet."""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    text = str(value)
+    return "" if text in ("nan", "NaT", "None") else text
+
+
+def column_letter(column):
+    """1-based column number -> A1 column letters."""
+    letters = ""
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def row_keys(rows, key_indexes):
+    """
+    Key for each row. Repeated keys get an occurrence number so every key is unique.
+    """
+    seen = {}
+    keys = []
+    for row in rows:
+        key = tuple(row[i] if i < len(row) else "" for i in key_indexes)
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key + (seen[key],))
+    return keys
+
+
+def plan_layout(current_keys, target_keys):
+    """
+    Decide which key goes in each sheet row, moving as few rows as possible.
+    Rows whose key is still present stay where they are; new rows fill the
+    slots of removed ones first, then go at the end; remaining gaps are closed
+    by moving rows up from the bottom.
+    """
+    target_set = set(target_keys)
+    current_set = set(current_keys)
+    layout = [key if key in target_set else None for key in current_keys]
+    new_keys = [key for key in target_keys if key not in current_set]
+
+    new_iter = iter(new_keys)
+    for i, key in enumerate(layout):
+        if key is None:
+            layout[i] = next(new_iter, None)
+    layout.extend(new_iter)
+
+    # Close any gaps left over (more rows removed than added)
+    i = 0
+    while i < len(layout):
+        if layout[i] is None:
+            last = layout.pop()
+            if i < len(layout):
+                layout[i] = last  # may itself be a gap; re-checked next pass
+            continue
+        i += 1
+    return layout
+
+
+def sync_worksheet(worksheet, df, key_columns=KEY_COLUMNS, scope=None):
+    """
+    Make the worksheet match df (header in row 1) with the fewest cell writes.
+    scope=(column, values) limits the sync to rows whose column is one of
+    values: other rows already in the sheet are kept as they are. (If the
+    sheet's header differs from df's, the sheet is rewritten from df alone.)
+    Returns counts of changed, new and removed rows plus the requests sent.
+    """
+    header = [str(column) for column in df.columns]
+    target_rows = [[cell_value(value) for value in row] for row in df.itertuples(index=False, name=None)]
+    width = len(header)
+
+    current = worksheet.get_all_values()
+    current_header = current[0] if current else []
+    current_rows = [row + [""] * (width - len(row)) for row in current[1:]]
+    current_width = max([len(current_header)] + [len(row) for row in current[1:]])
+
+    if scope is not None and current_header == header and scope[0] in header:
+        # Rows outside the scope stay in the target, so they are left untouched
+        scope_index = header.index(scope[0])
+        scope_values = {cell_value(value) for value in scope[1]}
+        kept_rows = [row for row in current_rows if row[scope_index] not in scope_values]
+        target_rows = kept_rows + [row for row in target_rows if row[scope_index] in scope_values]
+
+    key_indexes = [header.index(column) for column in key_columns if column in header]
+    if current_header == header and key_indexes:
+        current_keys = row_keys(current_rows, key_indexes)
+        target_keys = row_keys(target_rows, key_indexes)
+        layout = plan_layout(current_keys, target_keys)
+    else:
+        # Different columns: every row is rewritten in DataFrame order
+        current_keys = []
+        target_keys = list(range(len(target_rows)))
+        layout = target_keys
+
+    target_by_key = dict(zip(target_keys, target_rows))
+    current_set = set(current_keys)
+    target_set = set(target_keys)
+
+    # Desired grid (header + rows), padded with blank rows to clear leftovers
+    desired = [header] + [target_by_key[key] for key in layout]
+    total_rows = max(len(desired), len(current))
+    total_width = max(width, current_width)
+    blank = [""] * total_width
+
+    updates = []
+    run_start = None
+    run_values = []
+    for i in range(total_rows):
+        wanted = (desired[i] if i < len(desired) else []) + [""] * total_width
+        wanted = wanted[:total_width]
+        existing = (current[i] if i < len(current) else []) + blank
+        existing = existing[:total_width]
+        if wanted != existing:
+            if run_start is None:
+                run_start = i
+            run_values.append(wanted)
+            continue
+        if run_start is not None:
+            updates.append(a1_update(run_start, run_values))
+            run_start, run_values = None, []
+    if run_start is not None:
+        updates.append(a1_update(run_start, run_values))
+
+    if len(desired) > worksheet.row_count:
+        worksheet.add_rows(len(desired) - worksheet.row_count)
+    if total_width > worksheet.col_count:
+        worksheet.add_cols(total_width - worksheet.col_count)
+
+    requests_sent = 0
+    for start in range(0, len(updates), RANGES_PER_REQUEST):
+        worksheet.batch_update(updates[start:start + RANGES_PER_REQUEST], value_input_option="RAW")
+        requests_sent += 1
+
+    current_by_key = dict(zip(current_keys, current_rows))
+    changed_count = sum(
+        1 for key in target_set & current_set
+        if target_by_key[key] != current_by_key[key][:width]
+    )
+    return {
+        "changed": changed_count,
+        "new": len(target_set - current_set),
+        "removed": len(current_by_key) - len(target_set & current_set) if current_keys else len(current_rows),
+        "ranges": len(updates),
+        "requests": requests_sent,
+    }
+
+
+def a1_update(start_index, values):
+    """batch_update entry for a block of rows starting at 0-based grid row start_index."""
+    first_row = start_index + 1
+    last_row = start_index + len(values)
+    last_column = column_letter(len(values[0]))
+    return {"range": f"A{first_row}:{last_column}{last_row}", "values": values}
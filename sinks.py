@@ -0,0 +1,618 @@
+"""
+Output sinks for the orchestrator's contracts dataset.
+
+Each sink writes the dataset somewhere (PostgreSQL, Google Sheets, CSV,
+Parquet). Sinks receive the data as a stream of normalized batches:
+start() once, write_batch() per batch, finish() at the end. A SinkWriter
+feeds one sink from its own thread through a small bounded queue, with a
+timeout and error isolation per sink, so a slow or failing sink neither
+delays nor breaks the others.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.types import Text
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds a sink may block on a single batch (or on finishing) before it's reported as timed out
+DEFAULT_SINK_TIMEOUT = 600
+
+# Batches queued per sink before the pipeline waits for it
+SINK_QUEUE_BATCHES = 4
+
+# Outcome of each city's most recent scrape; last_scraped_at only moves on a good scrape
+CITY_REFRESH_STATUS_DDL = """
+    CREATE TABLE IF NOT EXISTS city_refresh_status (
+        city TEXT PRIMARY KEY,
+        last_scraped_at TIMESTAMPTZ,
+        rows INTEGER,
+        last_attempt_at TIMESTAMPTZ NOT NULL,
+        last_status TEXT NOT NULL,
+        last_error TEXT
+    )
+"""
+
+# Stable id of a contract, the primary key of contract_opportunities: md5 of the
+# city and bid number, or of the city and source URL for bids without a number.
+# Bids that share a source URL (one listing page for the whole city) add their
+# title. Computed over a whole city's rows, since it needs the shared-URL count.
+CONTRACT_ID_SQL = """
+    md5(concat_ws(chr(31), "City",
+        CASE
+            WHEN coalesce("Bid Number", '') <> '' THEN 'bid:' || "Bid Number"
+            WHEN count(*) OVER (PARTITION BY "City", "Source URL") > 1
+                THEN 'url:' || coalesce("Source URL", '') || chr(31) || coalesce("Title", '')
+            ELSE 'url:' || coalesce("Source URL", '')
+        END))
+"""
+
+# contract_opportunities is partitioned by Status: open and upcoming contracts
+# (and any without a status) in the small contract_opportunities_current
+# partition, closed ones in contract_opportunities_archive, which is itself
+# partitioned by due month. Queries filtering on OPEN_STATUS_SQL only read the
+# current partition.
+OPEN_STATUS_SQL = """("Status" IN ('Open', 'Upcoming') OR "Status" IS NULL)"""
+
+# "Estimated Value" as a number (NULL unless it reads as one once "$", commas
+# and spaces are dropped), stored in the generated "Estimated Value_Amount"
+# column so value ranges can be queried and indexed
+ESTIMATED_AMOUNT_SQL = r"""
+    CASE WHEN regexp_replace("Estimated Value", '[$,\s]', '', 'g') ~ '^\d+(\.\d+)?$'
+        THEN regexp_replace("Estimated Value", '[$,\s]', '', 'g')::numeric END
+"""
+
+# First day of a contract's due month (the archive's partition key), or NULL
+# for contracts without a due date, which go to the archive's undated partition
+DUE_MONTH_SQL = r"""
+    CASE WHEN "Due Date_Display" ~ '^\d{4}-(0[1-9]|1[0-2])' THEN to_date(left("Due Date_Display", 7), 'YYYY-MM') END
+"""
+
+
+def get_database_url():
+    """Database URL from DATABASE_URL (fixed up for SQLAlchemy) or the local development database."""
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        # Production: Fix Heroku postgres URL for SQLAlchemy
+        if database_url.startswith("postgres://"):
+            database_url = database_url.replace("postgres://", "postgresql://", 1)
+        return database_url
+
+    # Development: Use local database
+    db_user = "scraper"
+    db_password = "scraperpass"
+    db_host = "localhost"
+    db_port = "5432"
+    db_name = "contracts"
+    return f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+
+def refreshed_cities(scraper_report):
+    """Cities whose scrape finished cleanly with at least one row; only these replace their stored rows."""
+    return [entry["city"] for entry in scraper_report if entry["status"] == "ok" and entry["rows"]]
+
+
+class Sink:
+    """Base class for an output sink."""
+
+    name = "sink"
+    # Whether the sink holds the system of record: once these sinks have the
+    # crawl, its checkpoints are no longer needed (see pipeline.run_pipeline)
+    of_record = False
+
+    def __init__(self, timeout=DEFAULT_SINK_TIMEOUT):
+        self.timeout = timeout
+
+    def start(self):
+        """Prepare for a run (open files, create staging tables, ...)."""
+
+    def write_batch(self, df):
+        """Write one normalized batch."""
+        raise NotImplementedError
+
+    def finish(self, scraper_report=None):
+        """
+        Complete the run. scraper_report (one entry per scraped city, see
+        pipeline.run_scraper) scopes the refresh to the cities that scraped
+        cleanly; None means the batches are the whole dataset.
+        Returns a short summary string (or None).
+        """
+
+
+class PostgresSink(Sink):
+    """
+    Load batches into a per-run staging table as they arrive. At the end each
+    refreshed city's rows in contract_opportunities are replaced from staging
+    in one transaction, so readers never see a half-loaded table and a city
+    whose scrape failed or came back empty keeps its last good rows. Rows are
+    keyed by their stable "Contract ID" (see CONTRACT_ID_SQL). A city's open
+    contracts that are no longer listed are marked Closed rather than deleted,
+    which moves them into the archive partitions (see OPEN_STATUS_SQL). Each
+    city's outcome is recorded in city_refresh_status.
+    """
+
+    name = "postgres"
+    of_record = True
+
+    def __init__(self, table="contract_opportunities", **kwargs):
+        super().__init__(**kwargs)
+        self.table = table
+        self.staging_table = None
+        self.columns = []
+        self.engine = None
+        self.rows = 0
+
+    def start(self):
+        self.engine = create_engine(get_database_url())
+        # Unique per run so concurrent runs (e.g. different --cities) don't share staging
+        self.staging_table = f"{self.table}_staging_{uuid.uuid4().hex[:8]}"
+        self.columns = []
+        self.rows = 0
+
+    def write_batch(self, df):
+        df.to_sql(self.staging_table, self.engine, if_exists="append", index=False,
+                  dtype={col: Text() for col in df.columns})
+        self.columns = self.columns or list(df.columns)
+        self.rows += len(df)
+
+    def finish(self, scraper_report=None):
+        try:
+            if scraper_report is None:
+                return self.replace_table()
+            return self.merge_cities(scraper_report)
+        finally:
+            with self.engine.begin() as conn:
+                conn.execute(text(f'DROP TABLE IF EXISTS "{self.staging_table}"'))
+            self.engine.dispose()
+
+    def replace_table(self):
+        """Replace the whole table (archive included) with staging."""
+        if not self.rows:
+            return f"no rows - {self.table} left unchanged"
+        with self.engine.begin() as conn:
+            conn.execute(text(f'DROP TABLE IF EXISTS "{self.table}"'))
+            self.ensure_table(conn)
+            self.ensure_archive_months(conn, [self.staging_table])
+            rows = self.insert_from_staging(conn)
+        return f"{rows} rows written to {self.table}"
+
+    def merge_cities(self, scraper_report):
+        """Replace the refreshed cities' rows from staging and record every city's refresh status."""
+        refreshed = refreshed_cities(scraper_report)
+        replaced = {}
+        archived = 0
+        if refreshed:
+            # Schema changes (which lock out readers) get their own short transaction,
+            # made only when something is missing, before the merge below
+            with self.engine.begin() as conn:
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"schema:{self.table}"})
+                self.ensure_table(conn)
+                self.ensure_archive_months(conn, [self.staging_table, f"{self.table}_current"], refreshed)
+        with self.engine.begin() as conn:
+            if refreshed:
+                # Serialize merges from concurrent runs; readers are not blocked
+                conn.execute(text(f'LOCK TABLE "{self.table}" IN SHARE ROW EXCLUSIVE MODE'))
+                for city in refreshed:
+                    staged_ids = f'SELECT {CONTRACT_ID_SQL} FROM "{self.staging_table}" WHERE "City" = :city'
+                    # Changing the status moves the row into its archive partition
+                    archived += conn.execute(text(
+                        f'UPDATE "{self.table}" SET "Status" = \'Closed\' '
+                        f'WHERE "City" = :city AND {OPEN_STATUS_SQL} AND "Contract ID" NOT IN ({staged_ids})'
+                    ), {"city": city}).rowcount
+                    conn.execute(text(
+                        f'DELETE FROM "{self.table}" WHERE "City" = :city AND "Contract ID" IN ({staged_ids})'
+                    ), {"city": city})
+                    replaced[city] = self.insert_from_staging(conn, city)
+            record_refresh_status(conn, scraper_report, refreshed)
+
+        kept = [entry["city"] for entry in scraper_report if entry["city"] not in replaced]
+        summary = ", ".join(f"{city} {rows}" for city, rows in replaced.items()) or "no cities refreshed"
+        if archived:
+            summary += f"; {archived} delisted contracts archived"
+        if kept:
+            summary += f"; kept previous rows for {', '.join(kept)}"
+        return summary
+
+    def ensure_table(self, conn):
+        """
+        Create the partitioned table, or bring an older one up to date: an
+        unpartitioned table is copied into a new partitioned one, then missing
+        columns (including "Sources", filled in by dedupe.py) and the feed
+        index are added. Only what the catalog shows missing is changed, as
+        even a no-op ALTER TABLE takes an ACCESS EXCLUSIVE lock.
+        """
+        kind = conn.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": f'"{self.table}"'}
+        ).scalar()
+        if kind is None:
+            self.create_partitioned_table(conn)
+        elif kind != "p":
+            self.partition_existing_table(conn)
+        existing = set(conn.execute(
+            text("SELECT attname FROM pg_attribute WHERE attrelid = to_regclass(:table) "
+                 "AND attnum > 0 AND NOT attisdropped"),
+            {"table": f'"{self.table}"'},
+        ).scalars())
+        missing = [col for col in dict.fromkeys(["Sources"] + self.columns) if col not in existing]
+        if missing:
+            conn.execute(text(
+                f'ALTER TABLE "{self.table}" ' + ", ".join(f'ADD COLUMN "{col}" TEXT' for col in missing)
+            ))
+        if "Estimated Value_Amount" not in existing:
+            conn.execute(text(
+                f'ALTER TABLE "{self.table}" ADD COLUMN "Estimated Value_Amount" NUMERIC '
+                f'GENERATED ALWAYS AS ({ESTIMATED_AMOUNT_SQL}) STORED'
+            ))
+        # Serves /api/user/feed: preferred cities and industries, then the value range
+        if not conn.execute(text("SELECT to_regclass(:name)"), {"name": f'"{self.table}_current_feed"'}).scalar():
+            conn.execute(text(
+                f'CREATE INDEX "{self.table}_current_feed" ON "{self.table}_current" '
+                f'("City", "Industry", "Estimated Value_Amount")'
+            ))
+
+    def create_partitioned_table(self, conn):
+        """
+        Create the table with its current partition and its archive, which gets
+        an undated partition here and a partition per due month as needed
+        (see ensure_archive_months). Each leaf partition is keyed by "Contract ID".
+        """
+        conn.execute(text(
+            f'CREATE TABLE "{self.table}" ("Contract ID" TEXT NOT NULL, "Sources" TEXT, "Due Month" DATE, '
+            f'LIKE "{self.staging_table}") PARTITION BY LIST ("Status")'
+        ))
+        conn.execute(text(
+            f'CREATE TABLE "{self.table}_current" PARTITION OF "{self.table}" (PRIMARY KEY ("Contract ID")) '
+            f"FOR VALUES IN ('Open', 'Upcoming', NULL)"
+        ))
+        conn.execute(text(
+            f'CREATE TABLE "{self.table}_archive" PARTITION OF "{self.table}" '
+            f"FOR VALUES IN ('Closed') PARTITION BY RANGE (\"Due Month\")"
+        ))
+        conn.execute(text(
+            f'CREATE TABLE "{self.table}_archive_undated" PARTITION OF "{self.table}_archive" '
+            f'(PRIMARY KEY ("Contract ID")) DEFAULT'
+        ))
+
+    def partition_existing_table(self, conn):
+        """
+        Move the rows of an unpartitioned table (from before the archive) into a
+        new partitioned one, giving rows without a contract id theirs.
+        """
+        old_table = f"{self.table}_unpartitioned"
+        conn.execute(text(f'ALTER TABLE "{self.table}" RENAME TO "{old_table}"'))
+        old_columns = conn.execute(
+            text("SELECT column_name FROM information_schema.columns WHERE table_name = :table "
+                 "ORDER BY ordinal_position"),
+            {"table": old_table},
+        ).scalars().all()
+        self.create_partitioned_table(conn)
+        columns = [col for col in old_columns if col not in ("Contract ID", "Sources")]
+        for col in ["Sources"] + columns:
+            conn.execute(text(f'ALTER TABLE "{self.table}" ADD COLUMN IF NOT EXISTS "{col}" TEXT'))
+        self.ensure_archive_months(conn, [old_table])
+
+        column_list = ", ".join(f'"{col}"' for col in columns)
+        old_id = '"Contract ID"' if "Contract ID" in old_columns else "NULL"
+        old_sources = '"Sources"' if "Sources" in old_columns else "NULL"
+        conn.execute(text(
+            f'INSERT INTO "{self.table}" ("Contract ID", "Sources", "Due Month", {column_list}) '
+            f'SELECT DISTINCT ON (id) id, sources, {DUE_MONTH_SQL}, {column_list} FROM ('
+            f'    SELECT coalesce({old_id}, {CONTRACT_ID_SQL}) AS id, {old_sources} AS sources, ctid AS stored, '
+            f'    {column_list} FROM "{old_table}"'
+            f') AS stored_rows ORDER BY id, stored'
+        ))
+        conn.execute(text(f'DROP TABLE "{old_table}"'))
+
+    def ensure_archive_months(self, conn, sources, cities=None):
+        """
+        Create the archive partition of every due month found in the given
+        tables (the given cities' rows, or all), so a row closed now or later
+        never lands in the undated partition by mistake. Only missing
+        partitions are created, so a run adding no new month takes no extra locks.
+        """
+        where = 'WHERE "City" = ANY(:cities)' if cities is not None else ""
+        months = conn.execute(
+            text(" UNION ".join(f'SELECT {DUE_MONTH_SQL} AS month FROM "{source}" {where}' for source in sources)),
+            {"cities": list(cities) if cities is not None else None},
+        ).scalars().all()
+        for month in sorted(month for month in months if month is not None):
+            partition = f"{self.table}_archive_{month:%Y_%m}"
+            if conn.execute(text("SELECT to_regclass(:name)"), {"name": f'"{partition}"'}).scalar():
+                continue
+            next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+            conn.execute(text(
+                f'CREATE TABLE "{partition}" PARTITION OF "{self.table}_archive" (PRIMARY KEY ("Contract ID")) '
+                f"FOR VALUES FROM ('{month}') TO ('{next_month}')"
+            ))
+
+    def insert_from_staging(self, conn, city=None):
+        """
+        Copy staged rows (one city's, or all) into the table with their contract ids
+        and due months. Rows sharing an id are the same bid listed twice; the first
+        one scraped is kept. Returns the number of rows inserted.
+        """
+        column_list = ", ".join(f'"{col}"' for col in self.columns)
+        where = 'WHERE "City" = :city' if city is not None else ""
+        result = conn.execute(
+            text(f'INSERT INTO "{self.table}" ("Contract ID", "Due Month", {column_list}) '
+                 f'SELECT DISTINCT ON (id) id, {DUE_MONTH_SQL}, {column_list} FROM ('
+                 f'    SELECT {CONTRACT_ID_SQL} AS id, ctid AS staged, {column_list} '
+                 f'    FROM "{self.staging_table}" {where}'
+                 f') AS staged_rows ORDER BY id, staged'),
+            {"city": city},
+        )
+        return result.rowcount
+
+class GoogleSheetsSink(Sink):
+    """
+    Export to the "Contract Opportunities" spreadsheet (diff sync unless SHEETS_EXPORT_MODE=replace).
+    The sheet mirrors the whole dataset, so batches are collected and synced once at the end.
+    """
+
+    name = "sheets"
+
+    def __init__(self, spreadsheet_name="Contract Opportunities", **kwargs):
+        super().__init__(**kwargs)
+        self.spreadsheet_name = spreadsheet_name
+        self.batches = []
+
+    def credentials(self):
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+        google_creds_json = os.getenv('GOOGLE_SHEETS_CREDENTIALS_JSON')
+        if google_creds_json:
+            # Production: credentials from the environment, loaded in memory
+            return ServiceAccountCredentials.from_json_keyfile_dict(json.loads(google_creds_json), scope)
+        # Development: Use local credentials file
+        creds_path = os.path.join(BASE_DIR, "google_sheets_credentials.json")
+        return ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
+
+    def start(self):
+        self.batches = []
+
+    def write_batch(self, df):
+        self.batches.append(df)
+
+    def finish(self, scraper_report=None):
+        import gspread
+        import pandas as pd
+
+        if not self.batches:
+            return "no rows - sheet left unchanged"
+        df = pd.concat(self.batches, ignore_index=True)
+        self.batches = []
+        scope = None
+        if scraper_report is not None:
+            # Only refreshed cities' rows are synced; the sheet keeps everyone else's
+            refreshed = refreshed_cities(scraper_report)
+            if not refreshed:
+                return "no cities refreshed - sheet left unchanged"
+            df = df[df["City"].isin(refreshed)]
+            scope = ("City", refreshed)
+
+        client = gspread.authorize(self.credentials())
+        worksheet = client.open(self.spreadsheet_name).sheet1
+
+        # SHEETS_EXPORT_MODE=replace clears and re-uploads the whole sheet;
+        # the default "diff" mode only writes rows that changed
+        if os.getenv('SHEETS_EXPORT_MODE', 'diff') == 'replace':
+            from gspread_dataframe import set_with_dataframe
+
+            if scope is not None:
+                # Re-upload the other cities' rows from the sheet alongside the refreshed ones
+                records = worksheet.get_all_records()
+                kept = pd.DataFrame([row for row in records if row.get("City") not in scope[1]])
+                df = pd.concat([kept, df], ignore_index=True)
+            worksheet.clear()
+            set_with_dataframe(worksheet, df)
+            return f"{len(df)} rows uploaded"
+
+        from sheets_sync import sync_worksheet
+
+        summary = sync_worksheet(worksheet, df, scope=scope)
+        return (f"{summary['changed']} changed, {summary['new']} new, {summary['removed']} removed "
+                f"({summary['requests']} batch update requests)")
+
+
+class CsvSink(Sink):
+    """Append each batch to a CSV file."""
+
+    name = "csv"
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.rows = 0
+
+    def start(self):
+        self.rows = 0
+
+    def write_batch(self, df):
+        # The first batch truncates the file and writes the header
+        df.to_csv(self.path, index=False, mode="a" if self.rows else "w", header=not self.rows)
+        self.rows += len(df)
+
+    def finish(self, scraper_report=None):
+        return f"{self.rows} rows written to {self.path}"
+
+
+class ParquetSink(Sink):
+    """Write each batch as a row group of a Parquet file (needs pyarrow installed)."""
+
+    name = "parquet"
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.writer = None
+        self.rows = 0
+
+    def start(self):
+        self.writer = None
+        self.rows = 0
+
+    def write_batch(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Every column is text, so the schema is fixed by the first batch's columns
+        schema = pa.schema([(col, pa.string()) for col in df.columns])
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, schema)
+        self.writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+        self.rows += len(df)
+
+    def finish(self, scraper_report=None):
+        if self.writer is not None:
+            self.writer.close()
+        return f"{self.rows} rows written to {self.path}"
+
+
+class SinkWriter:
+    """
+    Feed one sink from its own thread. submit() queues a batch and close()
+    finishes the sink and returns its report entry:
+    {"sink", "status" (ok/failed/timeout), "seconds", "rows", "detail"}.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.batches = queue.Queue(maxsize=SINK_QUEUE_BATCHES)
+        self.status = "ok"
+        self.detail = None
+        self.rows = 0
+        self.busy_seconds = 0.0
+        self.scraper_report = None
+        # Daemon thread so a sink stuck past its timeout can't keep the worker alive
+        self.thread = threading.Thread(target=self._run, name=f"sink-{sink.name}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, df):
+        """Queue a batch, giving up on the sink if it stays blocked for longer than its timeout."""
+        if self.status != "ok":
+            return
+        try:
+            self.batches.put(df, timeout=self.sink.timeout)
+        except queue.Full:
+            self.status = "timeout"
+            self.detail = f"blocked for more than {self.sink.timeout:.0f}s"
+
+    def close(self, scraper_report=None):
+        """Finish the sink (waiting at most its timeout) and return its report entry."""
+        self.scraper_report = scraper_report
+        if self.status == "ok":
+            try:
+                self.batches.put(None, timeout=self.sink.timeout)
+            except queue.Full:
+                self.status = "timeout"
+                self.detail = f"blocked for more than {self.sink.timeout:.0f}s"
+        else:
+            # Release a failed sink's thread from draining
+            try:
+                self.batches.put_nowait(None)
+            except queue.Full:
+                pass
+        self.thread.join(self.sink.timeout if self.status == "ok" else 0)
+        if self.thread.is_alive() and self.status == "ok":
+            self.status = "timeout"
+            self.detail = f"still finishing after {self.sink.timeout:.0f}s"
+        return {"sink": self.sink.name, "status": self.status, "seconds": round(self.busy_seconds, 2),
+                "rows": self.rows, "detail": self.detail}
+
+    def _run(self):
+        ended = False
+        try:
+            self._timed(self.sink.start)
+            while True:
+                df = self.batches.get()
+                if df is None:
+                    ended = True
+                    break
+                self._timed(self.sink.write_batch, df)
+                self.rows += len(df)
+            detail = self._timed(self.sink.finish, self.scraper_report)
+            if self.status == "ok":
+                self.detail = detail
+        except Exception as e:
+            if self.status == "ok":
+                self.status = "failed"
+                self.detail = str(e)
+            # Keep draining so the pipeline never blocks on a dead sink (unless
+            # finish() failed, when the end marker has already been taken)
+            while not ended and self.batches.get() is not None:
+                pass
+
+    def _timed(self, method, *args):
+        started = time.monotonic()
+        try:
+            return method(*args)
+        finally:
+            self.busy_seconds += time.monotonic() - started
+
+
+def record_refresh_status(conn, scraper_report, refreshed):
+    """Upsert each scraped city's outcome into city_refresh_status."""
+    conn.execute(text(CITY_REFRESH_STATUS_DDL))
+    for entry in scraper_report:
+        ok = entry["city"] in refreshed
+        if ok:
+            status, error = "ok", None
+        elif entry["status"] == "ok":
+            status, error = "empty", "scrape returned no rows"
+        else:
+            status, error = entry["status"], entry["detail"]
+        conn.execute(
+            text("""
+                INSERT INTO city_refresh_status (city, last_scraped_at, rows, last_attempt_at, last_status, last_error)
+                VALUES (:city, CASE WHEN :ok THEN now() END, CASE WHEN :ok THEN :rows END, now(), :status, :error)
+                ON CONFLICT (city) DO UPDATE SET
+                    last_scraped_at = COALESCE(EXCLUDED.last_scraped_at, city_refresh_status.last_scraped_at),
+                    rows = COALESCE(EXCLUDED.rows, city_refresh_status.rows),
+                    last_attempt_at = EXCLUDED.last_attempt_at,
+                    last_status = EXCLUDED.last_status,
+                    last_error = EXCLUDED.last_error
+            """),
+            {"city": entry["city"], "ok": ok, "rows": entry["rows"], "status": status, "error": error},
+        )
+
+
+def configured_sinks():
+    """
+    Sinks listed in OUTPUT_SINKS (comma-separated, default "postgres,sheets").
+    CSV_OUTPUT_PATH / PARQUET_OUTPUT_PATH set the file sinks' paths and
+    SINK_TIMEOUT_SECONDS the per-sink timeout.
+    """
+    timeout = float(os.getenv('SINK_TIMEOUT_SECONDS', DEFAULT_SINK_TIMEOUT))
+    names = [name.strip().lower() for name in os.getenv('OUTPUT_SINKS', 'postgres,sheets').split(',') if name.strip()]
+
+    sinks = []
+    for name in names:
+        if name == "postgres":
+            sinks.append(PostgresSink(timeout=timeout))
+        elif name == "sheets":
+            sinks.append(GoogleSheetsSink(timeout=timeout))
+        elif name == "csv":
+            sinks.append(CsvSink(os.getenv('CSV_OUTPUT_PATH', 'contract_opportunities.csv'), timeout=timeout))
+        elif name == "parquet":
+            sinks.append(ParquetSink(os.getenv('PARQUET_OUTPUT_PATH', 'contract_opportunities.parquet'), timeout=timeout))
+        else:
+            print(f"⚠️ Unknown output sink '{name}' - skipping")
+    return sinks
+
+
+def print_sink_report(report):
+    """Print the sink section of the run report."""
+    print("\n📊 Output sinks:")
+    for entry in report:
+        icon = "✅" if entry["status"] == "ok" else "⚠️"
+        print(f"   {icon} {entry['sink']:<10} {entry['status']:<8} {entry['seconds']:>8.2f}s  {entry['detail'] or ''}")